@@ -0,0 +1,113 @@
+import os
+import re
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.settings import settings
+from app.services.memory.consolidation import get_consolidation_engine
+from app.services.memory.memory_engine import MemoryEngine
+from app.services.memory.quota import get_quota_manager
+from app.services.memory.snapshot import DTYPES, export_snapshot, import_snapshot
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+memory_engine = MemoryEngine()
+quota_manager = get_quota_manager()
+
+SNAPSHOT_DIR = os.path.join(settings.DATA_DIR, "snapshots")
+
+
+def _snapshot_path(name: str) -> str:
+    # Snapshots live under DATA_DIR/snapshots; names cannot escape it
+    if not re.fullmatch(r"[A-Za-z0-9._-]+", name) or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid snapshot name")
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+# ------------------------------------------------------
+# 1. Run memory consolidation (or preview it with dry_run)
+# ------------------------------------------------------
+@router.post("/consolidate")
+async def consolidate(
+    dry_run: bool = True,
+    user_id: Optional[List[str]] = Query(None),
+    max_users: Optional[int] = None,
+    max_clusters: Optional[int] = None,
+):
+    engine = get_consolidation_engine()
+    if engine.running:
+        raise HTTPException(status_code=409, detail="Consolidation already running")
+
+    return await engine.run(
+        dry_run=dry_run,
+        user_ids=user_id,
+        max_users=max_users,
+        max_clusters=max_clusters,
+    )
+
+
+# ------------------------------------------------------
+# 2. Consolidation progress (cursor + last run summary)
+# ------------------------------------------------------
+@router.get("/consolidate/status")
+def consolidation_status():
+    engine = get_consolidation_engine()
+    return {"running": engine.running, **engine.load_state()}
+
+
+# ------------------------------------------------------
+# 3. Memory usage per user vs quota (paged by user_id)
+# ------------------------------------------------------
+@router.get("/usage")
+async def memory_usage(user_id: Optional[str] = None, after: Optional[str] = None, limit: int = 50):
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = await memory_engine.list_user_ids(after=after, limit=limit)
+
+    evicted = await quota_manager.audit.eviction_counts(user_ids)
+
+    users = []
+    for uid in user_ids:
+        counts = await quota_manager.usage(uid)
+        users.append({
+            "user_id": uid,
+            "total": sum(counts.values()),
+            "by_type": dict(counts),
+            "over_quota": quota_manager.over_quota(counts),
+            "evicted": evicted.get(uid, 0),
+        })
+
+    return {
+        "quota": {
+            "per_user": settings.MEMORY_QUOTA_PER_USER,
+            "per_type": settings.MEMORY_QUOTA_PER_TYPE,
+        },
+        "users": users,
+        "next_after": user_ids[-1] if user_id is None and len(user_ids) == limit else None,
+    }
+
+
+# ------------------------------------------------------
+# 4. Snapshot export / import (DATA_DIR/snapshots/<name>)
+# ------------------------------------------------------
+@router.post("/snapshot/{name}/export")
+async def snapshot_export(name: str, dtype: str = "float16", page_size: int = 1000):
+    if dtype not in DTYPES:
+        raise HTTPException(status_code=400, detail=f"dtype must be one of {DTYPES}")
+    path = _snapshot_path(name)
+    if os.path.exists(path):
+        raise HTTPException(status_code=409, detail="Snapshot already exists")
+    return await export_snapshot(path, dtype=dtype, page_size=page_size)
+
+
+@router.post("/snapshot/{name}/import")
+async def snapshot_import(name: str, batch_size: int = 1000):
+    path = _snapshot_path(name)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    try:
+        return await import_snapshot(path, memory_engine=memory_engine, batch_size=batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
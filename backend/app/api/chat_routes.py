@@ -21,8 +21,8 @@ class ChatRequest(BaseModel):
 # Normal Chat Response
 # -------------------------------
 @router.post("/chat")
-def chat(request: ChatRequest):
-    reply = chat_service.process(
+async def chat(request: ChatRequest):
+    reply = await chat_service.process(
         user_id=request.user_id,
         session_id=request.session_id,
         message=request.message,
@@ -1,4 +1,9 @@
+import base64
+import json
+from typing import Optional, Tuple
+
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.services.memory.memory_engine import MemoryEngine
 from app.core.re_ranking import re_rank
 
@@ -6,22 +11,60 @@ router = APIRouter(tags=["Memory Inspection"])
 
 memory_engine = MemoryEngine()
 
+
+# Keyset cursor: (created_at, id) of the last memory on the previous page
+def _encode_cursor(after: Tuple[float, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"t": after[0], "id": after[1]}).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(data["t"]), str(data["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 # ------------------------------------------------------
-# 1. Get ALL memories for a user (unordered)
+# 1. Get a user's memories, one page at a time, oldest first
+#    (pass next_cursor back as ?cursor= for the next page)
 # ------------------------------------------------------
 @router.get("/memory/{user_id}")
-def get_all_memories(user_id: str, limit: int = 100):
-    memories = memory_engine.recall(user_id, limit)
-    return {"count": len(memories), "memories": memories}
+async def get_all_memories(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    after = _decode_cursor(cursor) if cursor else None
+    page = await memory_engine.recall_page(user_id, limit=limit, after=after)
+    next_cursor = page["next_cursor"]
+    return {
+        "count": len(page["memories"]),
+        "memories": page["memories"],
+        "next_cursor": _encode_cursor(next_cursor) if next_cursor is not None else None,
+    }
+
+
+# ------------------------------------------------------
+# 1b. Stream ALL memories for a user as NDJSON
+# ------------------------------------------------------
+@router.get("/memory/{user_id}/stream")
+async def stream_all_memories(user_id: str, page_size: int = Query(500, ge=1, le=5000)):
+
+    async def rows():
+        async for mem in memory_engine.iter_memories(user_id, page_size=page_size):
+            yield json.dumps(mem) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
 
 
 # ------------------------------------------------------
 # 2. Search memory & return ranked results
 # ------------------------------------------------------
 @router.get("/memory/{user_id}/search")
-def search_memory(user_id: str, query: str = Query(..., min_length=2), limit: int = 10):
-    raw_results = memory_engine.search_memory(user_id, query, k=limit)
-    ranked = re_rank(raw_results)
+async def search_memory(user_id: str, query: str = Query(..., min_length=2), limit: int = 10):
+    raw_results = await memory_engine.search_memory(user_id, query, k=limit)
+    ranked = re_rank(raw_results, top_n=limit)
     return {
         "query": query,
         "raw_count": len(raw_results),
@@ -34,9 +77,9 @@ def search_memory(user_id: str, query: str = Query(..., min_length=2), limit: in
 # 3. Delete a memory by ID
 # ------------------------------------------------------
 @router.delete("/memory/{memory_id}")
-def delete_memory(memory_id: str):
+async def delete_memory(memory_id: str, user_id: Optional[str] = None):
     try:
-        memory_engine.delete_memory(memory_id)
+        await memory_engine.delete_memory(memory_id, user_id=user_id)
         return {"status": "success", "deleted_id": memory_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+
+from app.core.service_loader import (
+    get_cross_encoder,
+    get_embedding_batcher,
+    get_embedding_cache,
+    get_search_cache,
+)
+from app.core.settings import settings
+from app.services.memory.memory_writer import write_stats
+from app.services.write_behind import get_write_behind_queue
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    write_behind = get_write_behind_queue()
+    return {
+        "embedding_batcher": get_embedding_batcher().stats(),
+        "embedding_cache": get_embedding_cache().stats() if settings.EMBED_CACHE_ENABLED else None,
+        "write_behind": {**write_behind.stats, "queued": write_behind.qsize()},
+        "memory_writes": dict(write_stats),
+        "search_cache": get_search_cache().stats() if settings.SEARCH_CACHE_ENABLED else None,
+        "cross_encoder": get_cross_encoder().stats() if settings.CROSS_ENCODER_ENABLED else None,
+    }
@@ -0,0 +1,53 @@
+"""
+Consolidate old, low-importance memories into "compressed" memories.
+
+Usage (from backend/):
+    python -m app.cli.consolidate --dry-run
+    python -m app.cli.consolidate --max-users 50 --max-clusters 100
+    python -m app.cli.consolidate --user alice --user bob
+
+Without --user, each run continues after the last user finished by the
+previous run (state in DATA_DIR/consolidation_state.json).
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.core.db import close_connections
+from app.core.service_loader import get_search_cache
+from app.core.settings import settings
+from app.services.llm.http_client import close_http_clients
+from app.services.memory.consolidation import get_consolidation_engine
+
+
+async def consolidate(args):
+    try:
+        report = await get_consolidation_engine().run(
+            dry_run=args.dry_run,
+            user_ids=args.user,
+            max_users=args.max_users,
+            max_clusters=args.max_clusters,
+        )
+    finally:
+        await close_http_clients()
+        await close_connections()
+        if settings.SEARCH_CACHE_ENABLED:
+            get_search_cache().close()
+
+    print(json.dumps(report, indent=2, default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--user", action="append", help="Only these users (repeatable)")
+    parser.add_argument("--max-users", type=int)
+    parser.add_argument("--max-clusters", type=int)
+    args = parser.parse_args()
+
+    asyncio.run(consolidate(args))
+
+
+if __name__ == "__main__":
+    main()
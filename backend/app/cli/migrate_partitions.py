@@ -0,0 +1,105 @@
+"""
+Split the global 'memories' collection into partitioned collections.
+
+Usage (from backend/):
+    python -m app.cli.migrate_partitions --mode per_user --dry-run
+    python -m app.cli.migrate_partitions --mode hashed --buckets 64
+    python -m app.cli.migrate_partitions --mode per_user --delete-source
+
+Writes use upsert, so an interrupted run can simply be re-run.
+Set MEMORY_PARTITION_MODE (and MEMORY_PARTITION_BUCKETS) to the same
+values afterwards so the app reads from the new collections.
+"""
+
+import argparse
+import time
+from collections import Counter, defaultdict
+
+from app.core.service_loader import (
+    MEMORY_COLLECTION,
+    PARTITION_MODES,
+    get_chroma_client,
+    get_collection,
+    get_search_cache,
+    memory_collection_name,
+)
+
+
+def migrate(mode: str, buckets: int, page_size: int, dry_run: bool, delete_source: bool):
+    source = get_collection(MEMORY_COLLECTION)
+    total = source.count()
+    print(f"Source '{MEMORY_COLLECTION}': {total} memories → mode={mode}")
+
+    start = time.perf_counter()
+    moved = 0
+    per_target = Counter()
+    offset = 0
+
+    while offset < total:
+        page = source.get(
+            limit=page_size,
+            offset=offset,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        ids = page.get("ids") or []
+        if not ids:
+            break
+
+        # Group the page by target collection
+        groups = defaultdict(lambda: {"ids": [], "documents": [], "metadatas": [], "embeddings": []})
+        for i, mid in enumerate(ids):
+            meta = page["metadatas"][i] or {}
+            name = memory_collection_name(meta.get("user_id", ""), mode=mode, buckets=buckets)
+            group = groups[name]
+            group["ids"].append(mid)
+            group["documents"].append(page["documents"][i])
+            group["metadatas"].append(meta)
+            group["embeddings"].append(page["embeddings"][i])
+
+        for name, group in groups.items():
+            per_target[name] += len(group["ids"])
+            if not dry_run:
+                get_collection(name).upsert(**group)
+
+        moved += len(ids)
+        offset += len(ids)
+        rate = moved / max(time.perf_counter() - start, 1e-9)
+        print(f"  {moved}/{total} memories ({rate:.0f}/s)")
+
+    print(f"{len(per_target)} target collections, largest={max(per_target.values(), default=0)}")
+
+    if dry_run:
+        print("Dry run: nothing written.")
+        return
+
+    # Verify before touching the source
+    missing = [
+        name for name, count in per_target.items()
+        if get_collection(name).count() < count
+    ]
+    if missing:
+        print(f"Verification failed for {len(missing)} collections; source kept.")
+        return
+
+    if delete_source:
+        get_collection.cache_clear()
+        get_chroma_client().delete_collection(MEMORY_COLLECTION)
+        get_search_cache().bump_all()  # running servers drop results from the old layout
+        get_search_cache().close()
+        print(f"Deleted source collection '{MEMORY_COLLECTION}'.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=[m for m in PARTITION_MODES if m != "global"], required=True)
+    parser.add_argument("--buckets", type=int, default=None)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--delete-source", action="store_true")
+    args = parser.parse_args()
+
+    migrate(args.mode, args.buckets, args.page_size, args.dry_run, args.delete_source)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Rebuild the FTS5 lexical index from every memory collection
+(and every NumPy index when MEMORY_INDEX_BACKEND=numpy).
+
+Needed once for memories written before hybrid retrieval existed;
+MemoryEngine keeps the index in sync afterwards.
+
+Usage (from backend/):
+    python -m app.cli.rebuild_lexical_index
+    python -m app.cli.rebuild_lexical_index --page-size 1000
+"""
+
+import argparse
+import time
+
+from app.core.service_loader import (
+    get_collection,
+    get_lexical_index,
+    get_search_cache,
+    list_memory_collection_names,
+)
+from app.core.settings import settings
+
+
+def _index_source(index, label, source, page_size):
+    total = source.count()
+    offset = 0
+    added = 0
+
+    while offset < total:
+        page = source.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+        ids = page.get("ids") or []
+        if not ids:
+            break
+
+        index.add_many([
+            (mid, (meta or {}).get("user_id", ""), doc, float((meta or {}).get("created_at") or 0))
+            for mid, doc, meta in zip(ids, page["documents"], page["metadatas"])
+        ])
+        added += len(ids)
+        offset += len(ids)
+
+    print(f"  {label}: {added} memories")
+    return added
+
+
+def rebuild(page_size: int):
+    index = get_lexical_index()
+    index.clear()
+
+    start = time.perf_counter()
+    total = 0
+
+    for name in list_memory_collection_names():
+        total += _index_source(index, name, get_collection(name), page_size)
+
+    if settings.MEMORY_INDEX_BACKEND == "numpy":
+        from app.services.memory.numpy_index import iter_numpy_indexes
+
+        for numpy_index in iter_numpy_indexes():
+            total += _index_source(index, f"numpy:{numpy_index.user_id}", numpy_index, page_size)
+
+    get_search_cache().bump_all()  # running servers drop results fused with the old index
+    get_search_cache().close()
+    print(f"Indexed {total} memories in {time.perf_counter() - start:.1f}s "
+          f"(index now holds {index.count()})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    rebuild(args.page_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Export / import the whole memory store as a compact snapshot:
+vectors.npy (float16 or float32) + zstd-compressed JSONL metadata
+(gzip if the zstandard package is not installed) + manifest.json.
+
+Usage (from backend/):
+    python -m app.cli.snapshot export data/snapshots/2024-06-01
+    python -m app.cli.snapshot export backup/ --dtype float32 --compression gzip
+    python -m app.cli.snapshot import data/snapshots/2024-06-01 --batch-size 2000
+
+Both directions stream one page / batch at a time and print throughput.
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.core.db import close_connections
+from app.core.service_loader import get_search_cache
+from app.core.settings import settings
+from app.services.memory.snapshot import DTYPES, export_snapshot, import_snapshot
+
+
+async def run(args):
+    try:
+        if args.command == "export":
+            report = await export_snapshot(
+                args.directory,
+                dtype=args.dtype,
+                page_size=args.page_size,
+                compression=args.compression,
+            )
+        else:
+            report = await import_snapshot(
+                args.directory,
+                batch_size=args.batch_size,
+                allow_model_mismatch=args.allow_model_mismatch,
+            )
+    finally:
+        await close_connections()
+        if settings.SEARCH_CACHE_ENABLED:
+            get_search_cache().close()
+
+    print(json.dumps(report, indent=2, default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Write a snapshot of every memory")
+    exp.add_argument("directory")
+    exp.add_argument("--dtype", choices=DTYPES, default="float16")
+    exp.add_argument("--page-size", type=int, default=1000)
+    exp.add_argument("--compression", choices=["zstd", "gzip"])
+
+    imp = sub.add_parser("import", help="Bulk-load a snapshot (no re-embedding)")
+    imp.add_argument("directory")
+    imp.add_argument("--batch-size", type=int, default=1000)
+    imp.add_argument("--allow-model-mismatch", action="store_true")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
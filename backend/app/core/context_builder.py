@@ -1,59 +1,245 @@
+import asyncio
 import json
+import logging
+import time
+
+import numpy as np
+
+from app.core.mmr import mmr_select
 from app.core.re_ranking import re_rank
+from app.core.service_loader import get_cross_encoder
 from app.core.session_store import SessionStore
-from app.core.user_profile_store import UserProfileStore
+from app.core.user_profile_store import UserProfileStore, profile_items
+from app.core.settings import settings
+from app.core.turn_context import TurnContext
+from app.utils.token_counter import count_tokens, token_counter_id, truncate_lines
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTIONS = '''You are a concise, factual AI assistant. 
+            Always give short, meaningful answers. 
+            Do not ask unnecessary questions. 
+            Do not repeat information unless the user requests it. 
+            Do not create stories or add emotional filler. 
+            Maximum 2–3 sentences per answer unless the user explicitly asks for a long explanation.'''
+
+BLOCK_SEPARATOR = "\n\n---\n\n"
+
+# LLMService.build_prompt wraps the whole context in "User question: ...\n"
+PROMPT_WRAPPER_TOKENS = 8
+
 
 class ContextBuilder:
 
-    def __init__(self, memory_engine, max_context_tokens=1000):
+    def __init__(self, memory_engine, max_context_tokens=None):
         self.memory_engine = memory_engine
         self.session_store = SessionStore()
         self.profile_store = UserProfileStore()
-        self.max_context_tokens = max_context_tokens
+        self.max_context_tokens = max_context_tokens or settings.PROMPT_TOKEN_BUDGET
+        self._prefix_tokens = {}
 
     # ---------------------------------------------------------
     # Build context for LLM (main function)
     # ---------------------------------------------------------
-    def build_context(self, user_id: str, session_id: str, query: str):
+    async def build_context(self, turn: TurnContext):
+        """
+        Profile, memories and history are independent reads, so they
+        run concurrently. Per-part durations (ms) are recorded in
+        turn.timings, and the query vector is left on turn.embedding.
+
+        The whole prompt is kept within max_context_tokens, counted with
+        the serving model's tokenizer: instructions and the query are
+        fixed cost, the rest is split between profile / memories /
+        history by the PROMPT_SHARE_* settings (see _section_budgets).
+        """
+        user_id, session_id, query = turn.user_id, turn.session_id, turn.message
+        timings = turn.timings
+
+        start = time.perf_counter()
+        profile, ranked, history = await asyncio.gather(
+            self._timed("profile_ms", timings, self._load_profile(user_id)),
+            self._timed("memories_ms", timings, self._retrieve_memories(turn)),
+            self._timed("history_ms", timings, self.session_store.load(user_id, session_id, limit=5)),
+        )
+        timings["context_ms"] = (time.perf_counter() - start) * 1000
+
+        logger.debug(
+            "ContextBuilder timings for %s: %s",
+            user_id, {k: round(v, 1) for k, v in timings.items()},
+        )
+
         context_blocks = []
+        query_block = f"USER QUERY:\n{query}"
+        separator_tokens = count_tokens(BLOCK_SEPARATOR)
 
-        # 1. Load user profile
-        profile = self.profile_store.load_profile(user_id)
-        if profile:
-            context_blocks.append(f'''You are a concise, factual AI assistant. 
-            Always give short, meaningful answers. 
-            Do not ask unnecessary questions. 
-            Do not repeat information unless the user requests it. 
-            Do not create stories or add emotional filler. 
-            Maximum 2–3 sentences per answer unless the user explicitly asks for a long explanation.\n\n
-                                  {self.format_profile(profile)}''')
+        # Fixed cost: instructions, query (+ separators), LLMService wrapper
+        fixed = (
+            count_tokens(INSTRUCTIONS) + count_tokens(query_block)
+            + 3 * separator_tokens + PROMPT_WRAPPER_TOKENS
+        )
+        remaining = max(0, self.max_context_tokens - fixed)
+        budgets = self._section_budgets(remaining)
+        used = {}
 
-        # 2. Retrieve long-term memories
-        memories = self.memory_engine.search_memory(user_id, query, k=20)
-        ranked = re_rank(memories)
+        # 1. User profile (lines past its budget are dropped)
+        if profile:
+            profile_text = self._profile_text(profile, turn.embedding)
+            if count_tokens(profile_text) > budgets["profile"]:
+                profile_text = truncate_lines(profile_text, budgets["profile"])
+            used["profile"] = count_tokens(profile_text)
+            context_blocks.append(f"{INSTRUCTIONS}\n\n{profile_text}")
+        else:
+            used["profile"] = 0
 
-        # 3. Select only best-scored memories
-        selected_mems = self.select_memories(ranked)
+        # 2. Select only best-scored memories
+        memory_budget = budgets["memories"] + budgets["profile"] - used["profile"]
+        selected_mems = self.select_memories(ranked, memory_budget)
+        used["memories"] = sum(self._memory_tokens(m) for m in selected_mems)
 
         if selected_mems:
             context_blocks.append(self.format_memories(selected_mems))
 
-        # 4. Load conversation history
-        history = self.session_store.load(user_id, session_id, limit=5)
+        # 3. Conversation history (newest messages kept)
+        history_budget = remaining - used["profile"] - used["memories"]
+        history = self.select_history(history, history_budget)
+        used["history"] = sum(self._history_tokens(msg) for msg in history)
+
         if history:
             context_blocks.append(self.format_history(history))
 
-        # 5. Final query
-        context_blocks.append(f"USER QUERY:\n{query}")
+        # 4. Final query
+        context_blocks.append(query_block)
+
+        logger.debug(
+            "ContextBuilder tokens for %s: fixed=%d %s budget=%d",
+            user_id, fixed, used, self.max_context_tokens,
+        )
+        return BLOCK_SEPARATOR.join(context_blocks)
+
+    @staticmethod
+    def _section_budgets(remaining: int) -> dict:
+        """
+        Split the non-fixed budget by the configured shares (normalized,
+        so they need not sum to 1). build_context hands whatever a
+        section leaves unused on to the next one.
+        """
+        shares = {
+            "profile": settings.PROMPT_SHARE_PROFILE,
+            "memories": settings.PROMPT_SHARE_MEMORIES,
+            "history": settings.PROMPT_SHARE_HISTORY,
+        }
+        total = sum(shares.values()) or 1.0
+        return {name: int(remaining * share / total) for name, share in shares.items()}
+
+    async def _retrieve_memories(self, turn: TurnContext):
+        # Embed the message once; the memory write reuses this vector
+        if turn.embedding is None:
+            turn.embedding = await self.memory_engine.embed(turn.message)
+
+        memories = await self.memory_engine.search_memory(
+            turn.user_id, turn.message, k=settings.MEMORY_SEARCH_K, query_embedding=turn.embedding,
+            include_embeddings=settings.MMR_ENABLED,
+        )
+        ranked = re_rank(memories)
 
-        return "\n\n---\n\n".join(context_blocks)
+        if settings.CROSS_ENCODER_ENABLED:
+            ranked = await self._timed(
+                "cross_encoder_ms", turn.timings, get_cross_encoder().rerank(turn.message, ranked)
+            )
+        return ranked
+
+    # ---------------------------------------------------------
+    # Profile (cached render, optional relevance filter)
+    # ---------------------------------------------------------
+    async def _load_profile(self, user_id):
+        """
+        Cached profile entry; with PROFILE_RELEVANCE_ENABLED also the
+        unit vectors of its list items (large profiles only).
+        """
+        entry = await self.profile_store.load_cached(user_id)
+        if entry is None or not settings.PROFILE_RELEVANCE_ENABLED or "vectors" in entry:
+            return entry
+
+        items = profile_items(entry["profile"])
+        vectors = None
+        if len(items) > settings.PROFILE_RELEVANCE_MIN_ITEMS:
+            vectors = await self._item_vectors(user_id, items)
+        entry["items"], entry["vectors"] = items, vectors
+        return entry
+
+    async def _item_vectors(self, user_id, items):
+        """Stored item embeddings; items without one are embedded and stored."""
+        stored = await self.profile_store.load_item_embeddings(user_id)
+        missing = [item for item in items if item not in stored]
+        if missing:
+            embeddings = await self.memory_engine.embed_many([text for _, text in missing])
+            await self.profile_store.save_item_embeddings(user_id, missing, embeddings)
+            stored.update((item, np.asarray(emb, dtype=np.float32)) for item, emb in zip(missing, embeddings))
+
+        try:
+            vectors = np.stack([stored[item] for item in items]).astype(np.float32)
+        except ValueError:  # stored by a model with another dimension
+            logger.warning("ContextBuilder: mixed profile embedding sizes for %s, re-embedding", user_id)
+            embeddings = await self.memory_engine.embed_many([text for _, text in items])
+            await self.profile_store.save_item_embeddings(user_id, items, embeddings)
+            vectors = np.asarray(embeddings, dtype=np.float32)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _profile_text(self, entry, query_embedding):
+        """
+        Full compact render (cached in the entry until the profile is
+        saved), or only the PROFILE_RELEVANCE_TOP_K list items closest
+        to the query when item vectors are available.
+        """
+        vectors = entry.get("vectors")
+        if vectors is None or query_embedding is None or vectors.shape[1] != len(query_embedding):
+            if "rendered" not in entry:
+                entry["rendered"] = self.format_profile(entry["profile"])
+            return entry["rendered"]
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        top = np.argsort(-(vectors @ query))[:settings.PROFILE_RELEVANCE_TOP_K]
+        return self.format_profile(entry["profile"], [entry["items"][i] for i in sorted(top)])
+
+    @staticmethod
+    async def _timed(name: str, timings: dict, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            timings[name] = (time.perf_counter() - start) * 1000
 
     # ---------------------------------------------------------
     # Formatters
     # ---------------------------------------------------------
-    def format_profile(self, profile):
-        clean = json.dumps(profile, indent=2)
-        return f"USER PROFILE:\n{clean}"
+    def format_profile(self, profile, items=None):
+        """
+        Compact profile block: one "field: value" line per scalar field,
+        one "- entry" line per list entry. `items` ((field, text) pairs)
+        restricts the list entries shown.
+        """
+        selected = None
+        if items is not None:
+            selected = {}
+            for field, text in items:
+                selected.setdefault(field, []).append(text)
+
+        lines = ["USER PROFILE:"]
+        for field, value in profile.items():
+            if isinstance(value, list):
+                entries = [str(v) for v in value if v not in (None, "")]
+                if selected is not None:
+                    entries = selected.get(field, [])
+                if entries:
+                    lines.append(f"{field}:")
+                    lines.extend(f"- {text}" for text in entries)
+            elif value not in (None, "", {}):
+                text = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+                lines.append(f"{field}: {text}")
+        return "\n".join(lines)
 
     def format_memories(self, memories):
         lines = []
@@ -64,26 +250,90 @@ class ContextBuilder:
     def format_history(self, history):
         chat_lines = []
         for msg in history:
-            role = msg["role"].upper()
-            chat_lines.append(f"{role}: {msg['text']}")
+            chat_lines.append(self._history_line(msg))
         return "RECENT CONVERSATION:\n" + "\n".join(chat_lines)
 
+    @staticmethod
+    def _history_line(msg):
+        return f"{msg['role'].upper()}: {msg['text']}"
+
+    # ---------------------------------------------------------
+    # Token costs
+    # ---------------------------------------------------------
+    def _memory_tokens(self, mem):
+        """
+        Cost of one formatted memory line. The text's count is stored in
+        metadata at write time; it is tokenized here only when the stored
+        count is missing or was made by another counter (an estimate
+        written while the tokenizer was loading, or an older tokenizer).
+        """
+        meta = mem["metadata"]
+        counter = token_counter_id()
+        text_tokens = meta.get("token_count")
+        if text_tokens is None or meta.get("token_counter") != counter:
+            text_tokens = count_tokens(mem["text"])
+
+        memory_type = meta.get("memory_type")
+        prefix = self._prefix_tokens.get((counter, memory_type))
+        if prefix is None:
+            prefix = count_tokens(f"- ({memory_type}) ") + 1  # + newline
+            self._prefix_tokens[(counter, memory_type)] = prefix
+        return int(text_tokens) + prefix
+
+    @staticmethod
+    def _history_tokens(msg):
+        return count_tokens(ContextBuilder._history_line(msg)) + 1
+
+    # ---------------------------------------------------------
+    # History selection with token budgeting
+    # ---------------------------------------------------------
+    def select_history(self, history, max_tokens):
+        """Keep the most recent messages that fit max_tokens (in order)."""
+        if not history:
+            return []
+        budget = max_tokens - count_tokens("RECENT CONVERSATION:\n")
+
+        kept = []
+        for msg in reversed(history):
+            cost = self._history_tokens(msg)
+            if cost > budget:
+                break
+            kept.append(msg)
+            budget -= cost
+        kept.reverse()
+        return kept
+
     # ---------------------------------------------------------
     # Memory selection with token budgeting
     # ---------------------------------------------------------
-    def select_memories(self, ranked_memories):
+    def select_memories(self, ranked_memories, max_tokens=None):
         """
-        Select memories based on ranking and token budget.
+        Select memories based on ranking and token budget
+        (max_tokens, default max_context_tokens).
         Personal info, goals, tasks get highest priority.
+        With MMR_ENABLED, near-duplicates are skipped in favour of
+        diverse memories (see mmr_select).
         """
+        if max_tokens is None:
+            max_tokens = self.max_context_tokens
+        if ranked_memories:
+            max_tokens -= count_tokens("RELEVANT MEMORIES:\n")
+
+        if settings.MMR_ENABLED:
+            # After a cross-encoder pass the list order is the relevance signal
+            return mmr_select(
+                ranked_memories,
+                max_tokens,
+                lambda_=settings.MMR_LAMBDA,
+                token_count=self._memory_tokens,
+                relevance_key=None if settings.CROSS_ENCODER_ENABLED else "final_score",
+            )
 
         selected = []
         used_tokens = 0
-        max_tokens = self.max_context_tokens
 
         for mem in ranked_memories:
-            text = mem["text"]
-            token_estimate = len(text.split())
+            token_estimate = self._memory_tokens(mem)
 
             if used_tokens + token_estimate > max_tokens:
                 break
@@ -0,0 +1,40 @@
+# app/core/db.py
+
+import asyncio
+from typing import Dict
+
+import aiosqlite
+
+# ---------------------------------------------------------
+# App-scoped aiosqlite connections (one per database file).
+#
+# aiosqlite runs each connection on its own thread, so opening
+# a connection per query would also spawn a thread per query.
+# ---------------------------------------------------------
+_connections: Dict[str, aiosqlite.Connection] = {}
+_lock = asyncio.Lock()
+
+
+async def get_connection(db_path: str) -> aiosqlite.Connection:
+    """Return the shared connection for db_path, opening it if needed."""
+    conn = _connections.get(db_path)
+    if conn is not None:
+        return conn
+
+    async with _lock:
+        conn = _connections.get(db_path)
+        if conn is None:
+            conn = await aiosqlite.connect(db_path)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            _connections[db_path] = conn
+    return conn
+
+
+async def close_connections() -> None:
+    """Close every shared connection (called on app shutdown)."""
+    async with _lock:
+        conns = list(_connections.values())
+        _connections.clear()
+
+    for conn in conns:
+        await conn.close()
@@ -0,0 +1,78 @@
+# app/core/memory_audit_store.py
+
+import sqlite3
+import time
+from app.core.db import get_connection
+from app.core.settings import settings
+import os
+
+DB_PATH = settings.MEMORY_AUDIT_DB_PATH
+
+os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+
+
+class MemoryAuditStore:
+    """Append-only log of memories evicted by quota enforcement."""
+
+    def __init__(self):
+        self.db_path = DB_PATH
+        self._create_table()
+
+    def _create_table(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory_evictions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                memory_id TEXT,
+                memory_type TEXT,
+                retention_score REAL,
+                reason TEXT,
+                text_preview TEXT,
+                evicted_at INTEGER
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memory_evictions_user
+            ON memory_evictions (user_id)
+        """)
+        conn.commit()
+        conn.close()
+
+    # ----------------------------------------------------------
+    # Record a batch of evictions
+    # ----------------------------------------------------------
+    async def log_evictions(self, user_id: str, rows):
+        """rows: (memory_id, memory_type, retention_score, reason, text)"""
+        now = int(time.time())
+
+        conn = await get_connection(self.db_path)
+        await conn.executemany("""
+            INSERT INTO memory_evictions
+                (user_id, memory_id, memory_type, retention_score, reason, text_preview, evicted_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (user_id, mid, mtype, score, reason, (text or "")[:200], now)
+            for mid, mtype, score, reason, text in rows
+        ])
+
+        await conn.commit()
+
+    # ----------------------------------------------------------
+    # Eviction totals per user
+    # ----------------------------------------------------------
+    async def eviction_counts(self, user_ids):
+        if not user_ids:
+            return {}
+
+        conn = await get_connection(self.db_path)
+        placeholders = ",".join("?" for _ in user_ids)
+        async with conn.execute(f"""
+            SELECT user_id, COUNT(*)
+            FROM memory_evictions
+            WHERE user_id IN ({placeholders})
+            GROUP BY user_id
+        """, list(user_ids)) as cur:
+            rows = await cur.fetchall()
+
+        return {user_id: count for user_id, count in rows}
@@ -0,0 +1,71 @@
+# app/core/mmr.py
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _token_estimate(mem):
+    return len(mem["text"].split())
+
+
+def mmr_select(ranked_memories, max_tokens, lambda_=0.7, token_count=_token_estimate,
+               relevance_key="final_score"):
+    """
+    Maximal Marginal Relevance selection within a token budget.
+
+    Each step picks the memory maximizing
+        lambda_ * relevance - (1 - lambda_) * max cosine similarity
+                                              to the already selected
+    among those that still fit the budget. Relevance is
+    mem[relevance_key] (re_rank's final_score) scaled to 0..1, or
+    linear in list position when relevance_key is None. Similarity
+    uses each memory's stored "embedding" (memories without one count
+    as dissimilar to all).
+
+    Returns the selection in pick order (most valuable first).
+    """
+    if not ranked_memories:
+        return []
+
+    n = len(ranked_memories)
+    if relevance_key is None:
+        scores = np.arange(n, 0, -1, dtype=np.float64)
+    else:
+        scores = np.asarray([m.get(relevance_key, 0.0) for m in ranked_memories], dtype=np.float64)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones(n)
+
+    # Unit vectors (zero rows for memories without an embedding)
+    dim = next((len(m["embedding"]) for m in ranked_memories if m.get("embedding") is not None), 0)
+    vectors = np.zeros((n, dim), dtype=np.float32)
+    for i, mem in enumerate(ranked_memories):
+        if mem.get("embedding") is not None:
+            vectors[i] = mem["embedding"]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = vectors @ vectors.T
+
+    costs = np.asarray([token_count(m) for m in ranked_memories])
+    available = np.ones(n, dtype=bool)
+    max_sim = np.zeros(n)
+    budget = max_tokens
+    selected = []
+
+    while True:
+        fits = available & (costs <= budget)
+        if not fits.any():
+            break
+
+        mmr = lambda_ * relevance - (1 - lambda_) * max_sim
+        best = int(np.argmax(np.where(fits, mmr, -np.inf)))
+
+        selected.append(ranked_memories[best])
+        available[best] = False
+        budget -= costs[best]
+        max_sim = np.maximum(max_sim, similarity[best])
+
+    logger.debug("MMR: selected %d of %d memories", len(selected), n)
+    return selected
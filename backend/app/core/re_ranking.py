@@ -4,6 +4,10 @@ import time
 import math
 import logging
 
+import numpy as np
+
+from app.core.settings import settings
+
 logger = logging.getLogger(__name__)
 
 def cosine_to_similarity(distance):# convert cosine distance to similarity (0 to 1)
@@ -14,7 +18,7 @@ def cosine_to_similarity(distance):# convert cosine distance to similarity (0 to
 # 2. Recency score with robust error handling
 # ---------------------------------------------------------
 
-def recency_score(timestamp, half_life_hours=720):
+def recency_score(timestamp, half_life_hours=None):
     """
     Compute recency using exponential decay.
     More robust:
@@ -24,6 +28,7 @@ def recency_score(timestamp, half_life_hours=720):
     """
 
     now = time.time()
+    half_life_hours = half_life_hours or settings.RERANK_HALF_LIFE_HOURS
 
     if timestamp is None:
         return 0.0
@@ -62,24 +67,60 @@ MEMORY_TYPE_WEIGHTS = {
 
 
 # ---------------------------------------------------------
-# 4. Main re-ranking function
+# 4. Importance + query-independent retention score
 # ---------------------------------------------------------
 
-def re_rank(memories):
+def importance_score(meta):
+    """LLM-assigned importance clamped to 0..1 (0.4 if invalid)."""
+    importance_raw = meta.get("importance", 0.4)
+    try:
+        importance = float(importance_raw)
+        return max(0.0, min(1.0, importance))
+    except Exception:
+        logger.warning(f"Invalid importance value: {importance_raw}")
+        return 0.4
+
+
+def retention_score(meta):
     """
-    Rank memories using stable scoring:
-    - semantic similarity
-    - recency
-    - LLM-assigned importance
-    - memory type weight
+    How much a memory is worth keeping, independent of any query:
+    the recency, importance and type terms of re_rank() with the same
+    weights (semantic similarity left out), rescaled to 0..1.
+    Lowest scores are evicted first when a user is over quota.
     """
+    type_score = MEMORY_TYPE_WEIGHTS.get(meta.get("memory_type", "fact"), 0.50)
+    w_recency = settings.RERANK_WEIGHT_RECENCY
+    w_importance = settings.RERANK_WEIGHT_IMPORTANCE
+    w_type = settings.RERANK_WEIGHT_TYPE
+    score = (
+        recency_score(meta.get("created_at")) * w_recency +
+        importance_score(meta) * w_importance +
+        type_score * w_type
+    )
+    return score / ((w_recency + w_importance + w_type) or 1.0)
 
-    if not isinstance(memories, list):
-        logger.error("re_rank(): expected list, received:", type(memories))
-        return []
 
-    ranked = []
+# ---------------------------------------------------------
+# 5. Column extraction (one pass over the candidate dicts)
+# ---------------------------------------------------------
+
+def _as_float(value, default):
+    if type(value) is float:  # fast path: what Chroma returns
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _columns(memories):
+    """Unique, valid candidates plus their score inputs as lists."""
+    kept = []
     seen_ids = set()  # prevent duplicates
+    distances = []
+    created = []
+    importances = []
+    type_scores = []
 
     for mem in memories:
         if not isinstance(mem, dict):
@@ -92,43 +133,141 @@ def re_rank(memories):
         seen_ids.add(mem_id)
 
         meta = mem.get("metadata", {}) or {}
+        kept.append(mem)
+        distances.append(_as_float(mem.get("distance"), math.nan))
+        created.append(_as_float(meta.get("created_at"), math.nan))
+        importances.append(_as_float(meta.get("importance", 0.4), math.nan))
+        type_scores.append(MEMORY_TYPE_WEIGHTS.get(meta.get("memory_type", "fact"), 0.50))
+
+    return kept, distances, created, importances, type_scores
+
 
-        # Extract metadata with full validation
-        mem_type = meta.get("memory_type", "fact")
-        type_score = MEMORY_TYPE_WEIGHTS.get(mem_type, 0.50)
-
-        # Importance
-        importance_raw = meta.get("importance", 0.4)
-        try:
-            importance = float(importance_raw)
-            importance = max(0.0, min(1.0, importance))
-        except Exception:
-            logger.warning(f"Invalid importance value: {importance_raw}")
-            importance = 0.4
-
-        created_at = meta.get("created_at")
-
-        # Calculate component scores
-        semantic = cosine_to_similarity(mem.get("distance"))
-        recent = recency_score(created_at)
-
-        # Weighted score composition
-        final_score = (
-            semantic * 0.50 +
-            recent * 0.20 +
-            importance * 0.20 +
-            type_score * 0.10
+def _recency_array(created, now, half_life_hours):
+    """Vectorized recency_score(): same decay and edge cases, one `now`."""
+    age_hours = np.maximum(0.0, (now - created) / 3600)
+    with np.errstate(invalid="ignore"):
+        score = np.clip(0.5 ** (age_hours / half_life_hours), 0.0, 1.0)
+
+    score = np.where(created > now, 0.9, score)          # slightly future
+    score = np.where(created > now + 5, 0.5, score)      # misconfigured clock
+    return np.where(np.isnan(created), 0.0, score)       # missing / invalid
+
+
+def _scores_scalar(distances, created, importances, type_scores, now, half_life_hours):
+    """Plain-Python twin of the vectorized scoring (same edge cases)."""
+    rows = []
+    for dist, ts, imp, type_score in zip(distances, created, importances, type_scores):
+        semantic = 0.0 if math.isnan(dist) else max(0.0, min(1.0, 1 - dist))
+
+        if math.isnan(ts):
+            recent = 0.0
+        elif ts > now + 5:
+            recent = 0.5
+        elif ts > now:
+            recent = 0.9
+        else:
+            recent = max(0.0, min(1.0, 0.5 ** (max(0.0, (now - ts) / 3600) / half_life_hours)))
+
+        importance = 0.4 if math.isnan(imp) else max(0.0, min(1.0, imp))
+        final = (
+            semantic * settings.RERANK_WEIGHT_SEMANTIC +
+            recent * settings.RERANK_WEIGHT_RECENCY +
+            importance * settings.RERANK_WEIGHT_IMPORTANCE +
+            type_score * settings.RERANK_WEIGHT_TYPE
         )
+        rows.append((semantic, recent, importance, type_score, final))
+    return rows
+
+
+# Below this many candidates NumPy's per-call overhead costs more than
+# a plain loop (the usual MEMORY_SEARCH_K=20 takes the scalar path)
+VECTORIZE_MIN_CANDIDATES = 64
+
+
+# ---------------------------------------------------------
+# 6. Main re-ranking function
+# ---------------------------------------------------------
+
+def re_rank(memories, top_n=None):
+    """
+    Rank memories using stable scoring:
+    - semantic similarity
+    - recency
+    - LLM-assigned importance
+    - memory type weight
+
+    Columnar: inputs are pulled into arrays, all scores are computed
+    in one vectorized pass with a single `now`, the top_n (default:
+    all) are picked with argpartition, and only those are copied into
+    result dicts. Small candidate lists (< VECTORIZE_MIN_CANDIDATES)
+    are scored with a plain loop instead. Weights and half-life come
+    from settings.
+    """
+
+    if not isinstance(memories, list):
+        logger.error(f"re_rank(): expected list, received: {type(memories)}")
+        return []
+
+    kept, distances, created, importances, type_scores = _columns(memories)
+    if not kept:
+        return []
+
+    now = time.time()
+    n = len(kept)
+
+    if n < VECTORIZE_MIN_CANDIDATES:
+        rows = _scores_scalar(distances, created, importances, type_scores, now, settings.RERANK_HALF_LIFE_HOURS)
+        order = sorted(range(n), key=lambda i: -rows[i][4])  # stable: ties keep input order
+        return [
+            {
+                **kept[i],
+                "_rank_semantic": rows[i][0],
+                "_rank_recency": rows[i][1],
+                "_rank_importance": rows[i][2],
+                "_rank_type": rows[i][3],
+                "final_score": rows[i][4],
+            }
+            for i in order[:top_n]
+        ]
+
+    distances, created, importances, type_scores = (
+        np.asarray(col, dtype=np.float64) for col in (distances, created, importances, type_scores)
+    )
+
+    semantic = np.nan_to_num(np.clip(1 - distances, 0.0, 1.0), nan=0.0)
+    recent = _recency_array(created, now, settings.RERANK_HALF_LIFE_HOURS)
+    importance = np.where(np.isnan(importances), 0.4, np.clip(importances, 0.0, 1.0))
+
+    # Weighted score composition
+    final = (
+        semantic * settings.RERANK_WEIGHT_SEMANTIC +
+        recent * settings.RERANK_WEIGHT_RECENCY +
+        importance * settings.RERANK_WEIGHT_IMPORTANCE +
+        type_scores * settings.RERANK_WEIGHT_TYPE
+    )
+
+    if top_n is not None and top_n < n:
+        top = np.argpartition(-final, max(top_n - 1, 0))[:top_n]
+    else:
+        top = np.arange(n)
+
+    # Highest score first; ties keep input order (like a stable sort)
+    top = top[np.lexsort((top, -final[top]))]
+
+    # Plain Python floats for the selected rows only
+    top = top.tolist()
+    semantic, recent, importance, type_scores, final = (
+        col[top].tolist() for col in (semantic, recent, importance, type_scores, final)
+    )
 
-        ranked.append({
-            **mem,
-            "_rank_semantic": semantic,
-            "_rank_recency": recent,
-            "_rank_importance": importance,
-            "_rank_type": type_score,
-            "final_score": final_score,
-        })
-
-    # Sort by final score
-    ranked.sort(key=lambda x: x["final_score"], reverse=True)
-    return ranked
\ No newline at end of file
+    return [
+        {
+            **kept[i],
+            "_rank_semantic": semantic[j],
+            "_rank_recency": recent[j],
+            "_rank_importance": importance[j],
+            "_rank_type": type_scores[j],
+            "final_score": final[j],
+        }
+        for j, i in enumerate(top)
+    ]
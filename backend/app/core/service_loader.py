@@ -1,5 +1,12 @@
+import hashlib
 import chromadb
-from app.utils.model_loder import get_model
+from app.utils.model_loder import embedding_model_id, get_model
+from app.services.embedding.batcher import EmbeddingBatcher
+from app.services.embedding.cache import CachedEmbedder, EmbeddingCache
+from app.services.embedding.cross_encoder import CrossEncoderReranker
+from app.services.embedding.process_pool import EmbeddingProcessPool
+from app.services.memory.lexical_index import LexicalIndex
+from app.services.memory.search_cache import SearchResultCache
 from functools import lru_cache
 from app.core.settings import settings
 import os
@@ -12,20 +19,153 @@ def get_chroma_client():
     """Return a SINGLE persistent Chroma client."""
     return chromadb.PersistentClient(path=CHROMA_DIR)
 
-@lru_cache
-def get_memory_collection():
-    """Return the 'memories' collection, creating it if needed."""
-    client = get_chroma_client()
+# ---------------------------------------------------------
+# Memory collections (optionally partitioned per user / hash bucket)
+# ---------------------------------------------------------
+MEMORY_COLLECTION = "memories"
+PARTITION_MODES = ("global", "per_user", "hashed")
+
+
+def memory_collection_name(user_id: str, mode: str = None, buckets: int = None) -> str:
+    """Name of the collection holding user_id's memories."""
+    mode = mode or settings.MEMORY_PARTITION_MODE
+    buckets = buckets or settings.MEMORY_PARTITION_BUCKETS
+
+    if mode == "global":
+        return MEMORY_COLLECTION
+
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+    if mode == "per_user":
+        return f"{MEMORY_COLLECTION}_u_{digest[:24]}"
+    if mode == "hashed":
+        return f"{MEMORY_COLLECTION}_b_{int(digest, 16) % buckets:04d}"
+
+    raise ValueError(f"Unknown MEMORY_PARTITION_MODE '{mode}', expected one of {PARTITION_MODES}")
+
+
+@lru_cache(maxsize=settings.MEMORY_COLLECTION_CACHE_SIZE)
+def get_collection(name: str):
+    """Return a memory collection handle (cached), creating it if needed."""
+    # get_or_create: concurrent first search / first write of a user both succeed
+    return get_chroma_client().get_or_create_collection(
+        name=name,
+        metadata={"hnsw:space": "cosine"}
+    )
+
 
+@lru_cache(maxsize=settings.MEMORY_COLLECTION_CACHE_SIZE)
+def _existing_collection(name: str):
+    # Raises when missing; lru_cache does not cache exceptions
+    return get_chroma_client().get_collection(name=name)
+
+
+def find_collection(name: str):
+    """Existing collection handle, or None: reads never create collections."""
     try:
-        return client.get_collection(name="memories")
+        return _existing_collection(name)
     except Exception:
-        return client.create_collection(
-            name="memories",
-            metadata={"hnsw:space": "cosine"}
-        )
+        return None
+
+
+def get_memory_collection():
+    """Return the global 'memories' collection, creating it if needed."""
+    return get_collection(MEMORY_COLLECTION)
+
+
+def get_user_collection(user_id: str):
+    """Return the collection for user_id under the current partition mode."""
+    return get_collection(memory_collection_name(user_id))
+
+
+def find_user_collection(user_id: str):
+    """user_id's collection if it exists, else None (for read paths)."""
+    return find_collection(memory_collection_name(user_id))
+
+
+def list_memory_collection_names():
+    """Names of every memory collection that currently exists."""
+    names = []
+    for col in get_chroma_client().list_collections():
+        name = col if isinstance(col, str) else col.name
+        if name == MEMORY_COLLECTION or name.startswith(f"{MEMORY_COLLECTION}_"):
+            names.append(name)
+    return sorted(names)
+
+@lru_cache
+def get_lexical_index() -> LexicalIndex:
+    """Return the SINGLE FTS5 lexical index over memory text."""
+    return LexicalIndex(os.path.join(settings.DATA_DIR, "lexical_index.db"))
+
+@lru_cache
+def get_search_cache() -> SearchResultCache:
+    """Return the SINGLE search result cache (shared by every MemoryEngine)."""
+    return SearchResultCache(
+        max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+        stamp_dir=os.path.join(settings.DATA_DIR, "search_cache_stamps"),
+        stamp_check_seconds=settings.SEARCH_CACHE_STAMP_CHECK_SECONDS,
+        max_versions=settings.SEARCH_CACHE_MAX_TRACKED_USERS,
+    )
 
 @lru_cache
 def get_embedding_model():
-    """Return a SINGLE embedding model instance."""
+    """
+    Return a SINGLE embedding model instance, or a pool of worker
+    processes (each with its own model) if EMBEDDING_WORKERS > 0.
+    Both expose the same encode() call.
+    """
+    if settings.EMBEDDING_WORKERS > 0:
+        pool = EmbeddingProcessPool(
+            workers=settings.EMBEDDING_WORKERS,
+            threads_per_worker=settings.EMBEDDING_WORKER_THREADS,
+        )
+        pool.warm_up()
+        return pool
     return get_model()
+
+@lru_cache
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Return the SINGLE micro-batching embedder over the model."""
+    model = get_embedding_model()
+
+    def encode(texts):
+        return model.encode(texts, batch_size=len(texts), convert_to_tensor=False)
+
+    return EmbeddingBatcher(
+        encode_fn=encode,
+        max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+        max_wait_ms=settings.EMBED_BATCH_WAIT_MS,
+        # Keep every worker process busy
+        max_inflight=max(settings.EMBED_MAX_INFLIGHT_BATCHES, settings.EMBEDDING_WORKERS),
+    )
+
+@lru_cache
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the SINGLE embedding cache for the configured model."""
+    persist_path = None
+    if settings.EMBED_CACHE_PERSIST:
+        persist_path = os.path.join(settings.DATA_DIR, "embedding_cache.db")
+
+    return EmbeddingCache(
+        model_id=embedding_model_id(),
+        max_entries=settings.EMBED_CACHE_MAX_ENTRIES,
+        persist_path=persist_path,
+    )
+
+@lru_cache
+def get_cross_encoder() -> CrossEncoderReranker:
+    """Return the SINGLE cross-encoder re-ranker (model loads on first use)."""
+    return CrossEncoderReranker(
+        model_name=settings.CROSS_ENCODER_MODEL,
+        top_n=settings.CROSS_ENCODER_TOP_N,
+        budget_ms=settings.CROSS_ENCODER_BUDGET_MS,
+        cache_size=settings.CROSS_ENCODER_CACHE_SIZE,
+    )
+
+@lru_cache
+def get_embedder():
+    """Return the embedder used by MemoryEngine (cache → batcher → model)."""
+    batcher = get_embedding_batcher()
+    if not settings.EMBED_CACHE_ENABLED:
+        return batcher
+    return CachedEmbedder(batcher, get_embedding_cache())
@@ -1,5 +1,6 @@
 import sqlite3
 import time
+from app.core.db import get_connection
 from app.core.settings import settings
 import os
 
@@ -33,34 +34,44 @@ class SessionStore:
         conn.commit()
         conn.close()
 
-    def save(self, user_id, session_id, role, text):
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        cur = conn.cursor()
+    async def save(self, user_id, session_id, role, text):
+        conn = await get_connection(self.db_path)
 
-        cur.execute("""
+        await conn.execute("""
             INSERT INTO session_messages (user_id, session_id, role, text, timestamp)
             VALUES (?, ?, ?, ?, ?)
         """, (user_id, session_id, role, text, int(time.time())))
 
-        conn.commit()
-        conn.close()
+        await conn.commit()
 
-    def load(self, user_id, session_id, limit=20):
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        cur = conn.cursor()
+    async def load(self, user_id, session_id, limit=20):
+        conn = await get_connection(self.db_path)
 
-        cur.execute("""
+        async with conn.execute("""
             SELECT role, text, timestamp
             FROM session_messages
             WHERE user_id = ? AND session_id = ?
             ORDER BY timestamp DESC
             LIMIT ?
-        """, (user_id, session_id, limit))
-
-        rows = cur.fetchall()
-        conn.close()
+        """, (user_id, session_id, limit)) as cur:
+            rows = await cur.fetchall()
 
         return [
             {"role": role, "text": text, "timestamp": ts}
             for role, text, ts in rows
         ]
+
+    async def list_user_ids(self, after=None, limit=100):
+        """Distinct user_ids in sorted order, starting after `after`."""
+        conn = await get_connection(self.db_path)
+
+        async with conn.execute("""
+            SELECT DISTINCT user_id
+            FROM session_messages
+            WHERE user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+        """, (after or "", limit)) as cur:
+            rows = await cur.fetchall()
+
+        return [row[0] for row in rows]
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -15,9 +17,149 @@ class Settings(BaseSettings):
     # Actual database file locations
     SESSION_DB_PATH: str = "data/memory_store/memory_session.db"
     PROFILE_DB_PATH: str = "data/profile_store/user_profile.db"
+    MEMORY_AUDIT_DB_PATH: str = "data/memory_store/memory_audit.db"
 
     OPENAI_API_KEY: str | None = None
 
+    # LLM (Ollama) HTTP connection pool
+    LLM_BASE_URL: str = "http://localhost:11434"
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_READ_TIMEOUT: float = 120.0
+    LLM_WRITE_TIMEOUT: float = 10.0
+    LLM_POOL_TIMEOUT: float = 10.0
+
+    # Write-behind worker (profile extraction + memory writes)
+    WRITE_BEHIND_QUEUE_SIZE: int = 1000
+    WRITE_BEHIND_WORKERS: int = 2
+    WRITE_BEHIND_MAX_RETRIES: int = 3
+    WRITE_BEHIND_RETRY_BACKOFF: float = 0.5
+    WRITE_BEHIND_DRAIN_TIMEOUT: float = 30.0
+
+    # Memory store writes (chunk size of batched Chroma adds)
+    MEMORY_ADD_BATCH_SIZE: int = 1000
+
+    # Vector storage partitioning: global | per_user | hashed
+    MEMORY_PARTITION_MODE: str = "global"
+    MEMORY_PARTITION_BUCKETS: int = 64
+    MEMORY_COLLECTION_CACHE_SIZE: int = 1024
+
+    # Memory index backend: chroma | numpy (exact search for small users,
+    # promoted to Chroma once a user holds more than the threshold)
+    MEMORY_INDEX_BACKEND: str = "chroma"
+    MEMORY_NUMPY_PROMOTE_THRESHOLD: int = 2000
+
+    # Hybrid retrieval: FTS5/BM25 lexical index fused with vector
+    # results by reciprocal-rank fusion (RRF)
+    LEXICAL_INDEX_ENABLED: bool = True
+    LEXICAL_SEARCH_K: int = 20
+    RRF_K: int = 60
+
+    # Candidates fetched per turn for context building
+    MEMORY_SEARCH_K: int = 20
+
+    # re_rank score weights and recency half-life
+    RERANK_WEIGHT_SEMANTIC: float = 0.50
+    RERANK_WEIGHT_RECENCY: float = 0.20
+    RERANK_WEIGHT_IMPORTANCE: float = 0.20
+    RERANK_WEIGHT_TYPE: float = 0.10
+    RERANK_HALF_LIFE_HOURS: float = 720.0
+
+    # Maximal Marginal Relevance when selecting memories for the prompt
+    # (lambda 1.0 = pure relevance, lower = more diversity)
+    MMR_ENABLED: bool = False
+    MMR_LAMBDA: float = 0.7
+
+    # Optional cross-encoder second-stage re-rank of the top N memories
+    # (falls back to re_rank order when the latency budget runs out)
+    CROSS_ENCODER_ENABLED: bool = False
+    CROSS_ENCODER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    CROSS_ENCODER_TOP_N: int = 20
+    CROSS_ENCODER_BUDGET_MS: float = 150.0
+    CROSS_ENCODER_CACHE_SIZE: int = 10000
+
+    # Whole-prompt token budget, counted with the serving model's tokenizer
+    # (Hugging Face repo id). Profile / memories / history split what is
+    # left after the instructions and query; unused share rolls over to
+    # the next section.
+    PROMPT_TOKENIZER: str = "unsloth/Llama-3.2-3B-Instruct"
+    PROMPT_TOKEN_BUDGET: int = 2000
+    PROMPT_SHARE_PROFILE: float = 0.25
+    PROMPT_SHARE_MEMORIES: float = 0.45
+    PROMPT_SHARE_HISTORY: float = 0.30
+
+    # Profile block: rendered once per profile version (per-user cache).
+    # With PROFILE_RELEVANCE_ENABLED, profiles with more than
+    # PROFILE_RELEVANCE_MIN_ITEMS list entries are cut to the
+    # PROFILE_RELEVANCE_TOP_K entries closest to the query (item
+    # embeddings are stored in the profile DB).
+    PROFILE_CACHE_MAX_ENTRIES: int = 1024
+    PROFILE_RELEVANCE_ENABLED: bool = False
+    PROFILE_RELEVANCE_MIN_ITEMS: int = 20
+    PROFILE_RELEVANCE_TOP_K: int = 15
+
+    # search_memory result cache (per-user versions, LRU-bounded).
+    # Writes from other processes (CLIs, other workers) are noticed via
+    # per-process stamp files, checked at most every
+    # SEARCH_CACHE_STAMP_CHECK_SECONDS; the TTL bounds staleness regardless.
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_ENTRIES: int = 2048
+    SEARCH_CACHE_TTL_SECONDS: float = 300.0
+    SEARCH_CACHE_STAMP_CHECK_SECONDS: float = 1.0
+    SEARCH_CACHE_MAX_TRACKED_USERS: int = 100000
+
+    # Write-time semantic dedup: a new memory within this cosine distance
+    # of an existing one (same user + type) is merged into it instead
+    MEMORY_DEDUP_ENABLED: bool = True
+    MEMORY_DEDUP_MAX_DISTANCE: float = 0.08
+    MEMORY_DEDUP_IMPORTANCE_BOOST: float = 0.05
+
+    # Memory consolidation (old, low-importance clusters → one
+    # "compressed" memory). Interval 0 = only run via CLI / admin API
+    CONSOLIDATION_INTERVAL_MINUTES: int = 0
+    CONSOLIDATION_MIN_AGE_DAYS: float = 30.0
+    CONSOLIDATION_MAX_IMPORTANCE: float = 0.5
+    CONSOLIDATION_CLUSTER_MAX_DISTANCE: float = 0.35
+    CONSOLIDATION_MIN_CLUSTER_SIZE: int = 3
+    CONSOLIDATION_MAX_CLUSTER_SIZE: int = 20
+    CONSOLIDATION_MAX_USERS_PER_RUN: int = 100
+    CONSOLIDATION_MAX_CLUSTERS_PER_RUN: int = 200
+    # Concurrent summarize calls: leaves the rest of the LLM
+    # connection pool (LLM_MAX_CONNECTIONS) to chat traffic
+    CONSOLIDATION_SUMMARY_CONCURRENCY: int = 3
+
+    # Per-user memory quotas (0 = unlimited). Per-type quotas map a
+    # memory_type to its cap, e.g. {"short_term": 200, "fact": 1000}.
+    # Over quota, the lowest-retention memories are evicted in batches
+    # down to quota - MEMORY_EVICTION_BATCH_SIZE. Off by default:
+    # eviction deletes memories irreversibly, so operators opt in.
+    # Insert counts are kept for at most MEMORY_QUOTA_TRACKED_USERS users.
+    MEMORY_QUOTA_PER_USER: int = 0
+    MEMORY_QUOTA_PER_TYPE: Dict[str, int] = {}
+    MEMORY_EVICTION_BATCH_SIZE: int = 100
+    MEMORY_QUOTA_TRACKED_USERS: int = 10000
+
+    # Embedding model
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # torch | onnx | onnx-int8
+    EMBEDDING_ONNX_INT8_FILE: str = "onnx/model_quint8_avx2.onnx"
+
+    # Embedding worker processes (0 = encode inside the API process)
+    EMBEDDING_WORKERS: int = 0
+    EMBEDDING_WORKER_THREADS: int = 1
+
+    # Embedding cache (LRU in memory + optional SQLite tier in DATA_DIR)
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_MAX_ENTRIES: int = 10000
+    EMBED_CACHE_PERSIST: bool = False
+
+    # Embedding micro-batching
+    EMBED_MAX_BATCH_SIZE: int = 32
+    EMBED_BATCH_WAIT_MS: float = 5.0
+    EMBED_MAX_INFLIGHT_BATCHES: int = 1
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,19 @@
+# app/core/turn_context.py
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class TurnContext:
+    """
+    Per-turn state carried through the chat pipeline.
+
+    `embedding` is the vector of `message`; it is computed once
+    (during retrieval) and reused by the memory write.
+    """
+    user_id: str
+    session_id: str
+    message: str
+    embedding: Optional[List[float]] = None
+    timings: Dict[str, float] = field(default_factory=dict)
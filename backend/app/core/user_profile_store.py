@@ -3,6 +3,12 @@
 import json
 import sqlite3
 import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.db import get_connection
 from app.core.settings import settings
 import os
 
@@ -10,32 +16,59 @@ DB_PATH = settings.PROFILE_DB_PATH
 
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+# Per-user cache of loaded profiles and values derived from them
+# (rendered text, item vectors). Module-level because routes, the
+# profile extractor and ContextBuilder each own a store instance;
+# save_profile drops the user's entry.
+_profile_cache: "OrderedDict[str, dict]" = OrderedDict()
+_profile_saves: Dict[str, int] = {}
+
+
+def profile_items(profile: dict) -> List[Tuple[str, str]]:
+    """(field, text) for every list entry of the profile, in order."""
+    items = []
+    for field, value in profile.items():
+        if isinstance(value, list):
+            items.extend((field, str(v)) for v in value if v not in (None, ""))
+    return items
+
 
 
 class UserProfileStore:
     def __init__(self):
         self.db_path = DB_PATH
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self._create_table()
 
     def _create_table(self):
-        self.conn.execute("""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS user_profile (
                 user_id TEXT PRIMARY KEY,
                 profile_json TEXT,
                 updated_at INTEGER
             )
         """)
-        self.conn.commit()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS profile_item_embeddings (
+                user_id TEXT,
+                field TEXT,
+                text TEXT,
+                embedding BLOB,
+                PRIMARY KEY (user_id, field, text)
+            )
+        """)
+        conn.commit()
+        conn.close()
 
     # ----------------------------------------------------------
     # Save or update user profile
     # ----------------------------------------------------------
-    def save_profile(self, user_id: str, profile: dict):
+    async def save_profile(self, user_id: str, profile: dict):
         now = int(time.time())
         profile_json = json.dumps(profile)
 
-        self.conn.execute("""
+        conn = await get_connection(self.db_path)
+        await conn.execute("""
             INSERT INTO user_profile (user_id, profile_json, updated_at)
             VALUES (?, ?, ?)
             ON CONFLICT(user_id)
@@ -43,27 +76,94 @@ class UserProfileStore:
                           updated_at=excluded.updated_at
         """, (user_id, profile_json, now))
 
-        self.conn.commit()
+        # Drop vectors of items the profile no longer has
+        keep = {f"{field}\x00{text}" for field, text in profile_items(profile)}
+        async with conn.execute(
+            "SELECT field, text FROM profile_item_embeddings WHERE user_id=?", (user_id,)
+        ) as cur:
+            stale = [(user_id, f, t) for f, t in await cur.fetchall() if f"{f}\x00{t}" not in keep]
+        if stale:
+            await conn.executemany(
+                "DELETE FROM profile_item_embeddings WHERE user_id=? AND field=? AND text=?", stale
+            )
+
+        await conn.commit()
+        _profile_saves[user_id] = _profile_saves.get(user_id, 0) + 1
+        _profile_cache.pop(user_id, None)
 
     # ----------------------------------------------------------
     # Load profile
     # ----------------------------------------------------------
-    def load_profile(self, user_id: str):
-        cur = self.conn.execute(
+    async def load_profile(self, user_id: str):
+        conn = await get_connection(self.db_path)
+        async with conn.execute(
             "SELECT profile_json FROM user_profile WHERE user_id=?",
             (user_id,)
-        )
-        row = cur.fetchone()
+        ) as cur:
+            row = await cur.fetchone()
 
         if not row:
             return None
 
         return json.loads(row[0])
 
+    # ----------------------------------------------------------
+    # Cached profile (valid until the next save_profile)
+    # ----------------------------------------------------------
+    async def load_cached(self, user_id: str) -> Optional[dict]:
+        """
+        {"profile": ...} for the user, or None without a profile.
+        Callers may memoize values derived from the profile in the
+        returned dict; they are dropped with it on save_profile.
+        """
+        entry = _profile_cache.get(user_id)
+        if entry is not None:
+            _profile_cache.move_to_end(user_id)
+            return entry
+
+        saves = _profile_saves.get(user_id, 0)
+        profile = await self.load_profile(user_id)
+        if not profile:
+            return None
+
+        entry = {"profile": profile}
+        if _profile_saves.get(user_id, 0) != saves:
+            return entry  # saved while loading: don't cache a stale read
+        _profile_cache[user_id] = entry
+        while len(_profile_cache) > settings.PROFILE_CACHE_MAX_ENTRIES:
+            _profile_cache.popitem(last=False)
+        return entry
+
+    # ----------------------------------------------------------
+    # Stored embeddings of profile items
+    # ----------------------------------------------------------
+    async def load_item_embeddings(self, user_id: str) -> Dict[Tuple[str, str], np.ndarray]:
+        conn = await get_connection(self.db_path)
+        async with conn.execute(
+            "SELECT field, text, embedding FROM profile_item_embeddings WHERE user_id=?",
+            (user_id,)
+        ) as cur:
+            rows = await cur.fetchall()
+        return {(f, t): np.frombuffer(blob, dtype=np.float32) for f, t, blob in rows}
+
+    async def save_item_embeddings(self, user_id: str, items: List[Tuple[str, str]], embeddings):
+        conn = await get_connection(self.db_path)
+        await conn.executemany(
+            """
+            INSERT OR REPLACE INTO profile_item_embeddings (user_id, field, text, embedding)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (user_id, field, text, np.asarray(emb, dtype=np.float32).tobytes())
+                for (field, text), emb in zip(items, embeddings)
+            ],
+        )
+        await conn.commit()
+
     # ----------------------------------------------------------
     # Update only one field
     # ----------------------------------------------------------
-    def update_field(self, user_id: str, field: str, value):
-        profile = self.load_profile(user_id) or {}
+    async def update_field(self, user_id: str, field: str, value):
+        profile = await self.load_profile(user_id) or {}
         profile[field] = value
-        self.save_profile(user_id, profile)
+        await self.save_profile(user_id, profile)
@@ -1,15 +1,24 @@
+import asyncio
 import os
 from fastapi import FastAPI
 
 from app.core.config import create_app
 from app.core.settings import settings
-from app.utils.model_loder import get_model
+from app.core.service_loader import get_cross_encoder, get_embedding_model, get_search_cache
+from app.services.embedding.process_pool import EmbeddingProcessPool
+from app.core.db import close_connections
+from app.services.llm.http_client import close_http_clients
+from app.services.write_behind import get_write_behind_queue
+from app.services.memory.consolidation import get_consolidation_engine
+from app.utils.token_counter import get_tokenizer
 
 # Routers
 from app.api.chat_routes import router as chat_router
 from app.api.health import router as health_router
 from app.api.profile_routes import router as profile_router
 from app.api.memory_routes import router as memory_router
+from app.api.metrics_routes import router as metrics_router
+from app.api.admin_routes import router as admin_router
 
 # Create the FastAPI app only once
 app: FastAPI = create_app()
@@ -19,6 +28,8 @@ app.include_router(chat_router)
 app.include_router(health_router)
 app.include_router(profile_router)
 app.include_router(memory_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 
 # STARTUP EVENT
@@ -28,7 +39,12 @@ async def startup_event():
     os.makedirs(settings.PROFILE_STORE_DIR, exist_ok=True)
     print("Directories ensured.")
     print("Backend starting...")
-    get_model()             # Load your ML model
+    get_embedding_model()   # Load your ML model (or start the worker pool)
+    if settings.CROSS_ENCODER_ENABLED:
+        get_cross_encoder().warm_up()   # keep model loading out of the first turn's budget
+    await asyncio.to_thread(get_tokenizer)   # prompt budgeting never loads it on the event loop
+    await get_write_behind_queue().start()
+    get_consolidation_engine().start_schedule(settings.CONSOLIDATION_INTERVAL_MINUTES)
     print(f"App Name: {settings.APP_NAME}")
     print(f"Version: {settings.APP_VERSION}")
 
@@ -36,3 +52,13 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     print("Backend shutting down...")
+    await get_consolidation_engine().stop_schedule()
+    # Finish queued profile/memory writes before closing their resources
+    await get_write_behind_queue().drain(timeout=settings.WRITE_BEHIND_DRAIN_TIMEOUT)
+    model = get_embedding_model()
+    if isinstance(model, EmbeddingProcessPool):
+        model.shutdown()
+    await close_http_clients()   # Release pooled LLM connections
+    await close_connections()    # Close shared SQLite connections
+    if settings.SEARCH_CACHE_ENABLED:
+        get_search_cache().close()   # Retire this process's invalidation stamp
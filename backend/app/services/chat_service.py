@@ -2,10 +2,13 @@
 
 from app.core.session_store import SessionStore
 from app.core.context_builder import ContextBuilder
+from app.core.turn_context import TurnContext
 from app.services.memory.memory_engine import MemoryEngine
 from app.services.llm.llm_service import LLMService
 from app.services.memory.memory_writer import MemoryWriter
 from app.services.profile_extractor import ProfileExtractor
+from app.services.message_analyzer import MessageAnalyzer
+from app.services.write_behind import get_write_behind_queue
 
 
 class ChatService:
@@ -16,6 +19,7 @@ class ChatService:
         self.memory_engine = MemoryEngine()
         self.session_store = SessionStore()
         self.profile_extractor = ProfileExtractor()
+        self.message_analyzer = MessageAnalyzer(self.llm)
 
         # AI memory system
         self.memory_writer = MemoryWriter(
@@ -26,33 +30,29 @@ class ChatService:
         # NEW ContextBuilder requires memory_engine
         self.context_builder = ContextBuilder(self.memory_engine)
 
+        # Profile/memory writes run off the reply path
+        self.write_behind = get_write_behind_queue()
+
     # ----------------------------------------------------
-    # SYNC CHAT
+    # NON-STREAMING CHAT
     # ----------------------------------------------------
-    def process(self, user_id: str, session_id: str, message: str):
+    async def process(self, user_id: str, session_id: str, message: str):
+        turn = TurnContext(user_id, session_id, message)
 
         # 1. Save message to session history
-        self.session_store.save(user_id, session_id, "user", message)
-
-        # 2. Profile extraction (always before memory storage)
-        self.profile_extractor.extract_and_update(user_id, message)
+        await self.session_store.save(user_id, session_id, "user", message)
 
-        # 3. Memory Writer: decide + execute
-        decision = self.memory_writer.decide(user_id, session_id, "user", message)
-        self.memory_writer.execute(decision, user_id, session_id, message)
+        # 2. Build final context for LLM
+        context_prompt = await self.context_builder.build_context(turn)
 
-        # 4. Build final context for LLM
-        context_prompt = self.context_builder.build_context(
-            user_id=user_id,
-            session_id=session_id,
-            query=message
-        )
+        # 3. Generate reply from model
+        reply = await self.llm.generate_reply([], context_prompt)
 
-        # 5. Generate reply from model
-        reply = self.llm.generate_reply([], context_prompt)
+        # 4. Save assistant response
+        await self.session_store.save(user_id, session_id, "assistant", reply)
 
-        # 6. Save assistant response
-        self.session_store.save(user_id, session_id, "assistant", reply)
+        # 5. Profile extraction + memory write (background)
+        await self._queue_analysis(turn)
 
         return reply
 
@@ -60,29 +60,52 @@ class ChatService:
     # STREAMING CHAT
     # ----------------------------------------------------
     async def stream_process(self, user_id: str, session_id: str, message: str):
+        turn = TurnContext(user_id, session_id, message)
 
-        # 2. Profile extraction
-        self.profile_extractor.extract_and_update(user_id, message)
+        # 1. Build context
+        context_prompt = await self.context_builder.build_context(turn)
 
-        # 3. Memory writer logic
-        decision = self.memory_writer.decide(user_id, session_id, "user", message)
-        self.memory_writer.execute(decision, user_id, session_id, message)
+        # 2. Save user message
+        await self.session_store.save(user_id, session_id, "user", message)
+
+        # 3. Stream reply
+        full_reply = ""
+        try:
+            async for chunk in self.llm.stream_reply([], context_prompt):
+                full_reply += chunk
+                yield chunk
+
+            # 4. Save final assistant message
+            await self.session_store.save(user_id, session_id, "assistant", full_reply)
+        finally:
+            # 5. Profile extraction + memory write (background),
+            #    queued even if the client disconnects mid-stream
+            await self._queue_analysis(turn)
 
-        # 4. Build context
-        context_prompt = self.context_builder.build_context(
-            user_id=user_id,
-            session_id=session_id,
-            query=message
+    # ----------------------------------------------------
+    # Profile + memory update (one LLM call per message)
+    # ----------------------------------------------------
+    async def _queue_analysis(self, turn: TurnContext):
+        # Noise ("ok", "hi", ...) is never stored, so skip the job entirely
+        if self.memory_writer.is_noise(turn.message):
+            return
+
+        await self.write_behind.submit(
+            f"analyze:{turn.user_id}",
+            lambda: self._analyze_and_store(turn),
         )
 
-        # 1. Save user message
-        self.session_store.save(user_id, session_id, "user", message)
+    async def _analyze_and_store(self, turn: TurnContext):
+        user_id, session_id, message = turn.user_id, turn.session_id, turn.message
+        analysis = await self.message_analyzer.analyze(message)
 
-        # 5. Stream reply
-        full_reply = ""
-        async for chunk in self.llm.stream_reply([], context_prompt):
-            full_reply += chunk
-            yield chunk
+        # Profile extraction (always before memory storage)
+        await self.profile_extractor.update_from_analysis(user_id, analysis)
 
-        # 6. Save final assistant message
-        self.session_store.save(user_id, session_id, "assistant", full_reply)
+        # Memory Writer: decide + execute
+        decision = await self.memory_writer.decide(
+            user_id, session_id, "user", message, analysis=analysis
+        )
+        return await self.memory_writer.execute(
+            decision, user_id, session_id, message, embedding=turn.embedding
+        )
@@ -0,0 +1,173 @@
+# app/services/embedding/batcher.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Sync function: list of texts -> array-like of shape (n, dim)
+EncodeFn = Callable[[List[str]], Sequence[Any]]
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching scheduler in front of the embedding model.
+
+    Concurrent embed() calls are collected for up to `max_wait_ms`
+    (or until `max_batch_size` texts are pending) and encoded with
+    a single encode_fn call in a worker thread. Each caller gets
+    back its own vector.
+    """
+
+    # Upper bounds of the batch-size histogram buckets
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_inflight: int = 1,
+    ) -> None:
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_inflight = max(1, max_inflight)
+
+        self._pending: List[tuple] = []  # (text, future, enqueued_at)
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._histogram = {bucket: 0 for bucket in self.BATCH_SIZE_BUCKETS}
+        self._histogram_overflow = 0
+        self._waits_ms = deque(maxlen=2048)
+        self._encode_ms = deque(maxlen=2048)
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    async def embed(self, text: str) -> List[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        loop = asyncio.get_running_loop()
+        now = time.perf_counter()
+        futures = []
+        for text in texts:
+            fut = loop.create_future()
+            self._pending.append((text, fut, now))
+            futures.append(fut)
+
+        if len(self._pending) >= self.max_batch_size or self.max_wait == 0:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return list(await asyncio.gather(*futures))
+
+    # ---------------------------------------------------------
+    # Batch dispatch
+    # ---------------------------------------------------------
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[tuple]) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            for _text, _fut, enqueued_at in batch:
+                self._waits_ms.append((start - enqueued_at) * 1000)
+
+            texts = [text for text, _fut, _t in batch]
+            try:
+                vectors = await asyncio.to_thread(self.encode_fn, texts)
+            except Exception as e:
+                self._errors += 1
+                logger.error("EmbeddingBatcher: encode failed for %d texts → %s", len(texts), e)
+                for _text, fut, _t in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                return
+
+            self._encode_ms.append((time.perf_counter() - start) * 1000)
+            self._record_batch(len(batch))
+
+            if len(vectors) != len(batch):
+                # Never leave a caller waiting forever on a short result
+                self._errors += 1
+                error = RuntimeError(f"encode returned {len(vectors)} vectors for {len(batch)} texts")
+                logger.error("EmbeddingBatcher: %s", error)
+                for _text, fut, _t in batch:
+                    if not fut.done():
+                        fut.set_exception(error)
+                return
+
+            for (_text, fut, _t), vec in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vec.tolist() if hasattr(vec, "tolist") else list(vec))
+
+    # ---------------------------------------------------------
+    # Metrics
+    # ---------------------------------------------------------
+    def _record_batch(self, size: int) -> None:
+        self._batches += 1
+        self._items += size
+        for bucket in self.BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self._histogram[bucket] += 1
+                return
+        self._histogram_overflow += 1
+
+    @staticmethod
+    def _percentile(samples, pct: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct))
+        return round(ordered[index], 3)
+
+    def stats(self) -> Dict[str, Any]:
+        histogram = {f"<={bucket}": count for bucket, count in self._histogram.items()}
+        histogram[f">{self.BATCH_SIZE_BUCKETS[-1]}"] = self._histogram_overflow
+
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "errors": self._errors,
+            "avg_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+            "batch_size_histogram": histogram,
+            "queue_wait_ms_p50": self._percentile(self._waits_ms, 0.50),
+            "queue_wait_ms_p95": self._percentile(self._waits_ms, 0.95),
+            "queue_wait_ms_max": round(max(self._waits_ms), 3) if self._waits_ms else 0.0,
+            "encode_ms_p50": self._percentile(self._encode_ms, 0.50),
+            "encode_ms_p95": self._percentile(self._encode_ms, 0.95),
+            "pending": len(self._pending),
+            "config": {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_inflight": self.max_inflight,
+            },
+        }
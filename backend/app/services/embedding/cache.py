@@ -0,0 +1,216 @@
+# app/services/embedding/cache.py
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Key = sha256(model id + normalized text), so a different
+    embedding model never sees vectors produced by another one.
+
+    - In-memory LRU tier (bounded by max_entries)
+    - Optional persistent SQLite tier (rows of other models are
+      purged on open)
+    - Hit/miss statistics
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_entries: int = 10000,
+        persist_path: Optional[str] = None,
+    ) -> None:
+        self.model_id = model_id
+        self.max_entries = max(1, max_entries)
+        self.persist_path = persist_path
+
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        if persist_path:
+            self._open_disk_tier(persist_path)
+
+    # ---------------------------------------------------------
+    # Keys
+    # ---------------------------------------------------------
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = unicodedata.normalize("NFC", text)
+        return " ".join(text.split())
+
+    def key(self, text: str) -> str:
+        raw = f"{self.model_id}\x00{self.normalize(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------
+    # Memory tier
+    # ---------------------------------------------------------
+    def get_memory(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is None:
+                return None
+            self._memory.move_to_end(key)
+            self._memory_hits += 1
+        return vec.tolist()
+
+    def put_memory(self, key: str, vector: Sequence[float]) -> None:
+        packed = array("f", vector)
+        with self._lock:
+            self._memory[key] = packed
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # ---------------------------------------------------------
+    # Disk tier (sync; call through asyncio.to_thread)
+    # ---------------------------------------------------------
+    def _open_disk_tier(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                model_id TEXT,
+                vector BLOB
+            )
+        """)
+
+        # Embedding model changed → old vectors are useless
+        deleted = self._conn.execute(
+            "DELETE FROM embedding_cache WHERE model_id != ?", (self.model_id,)
+        ).rowcount
+        self._conn.commit()
+        if deleted:
+            logger.info("EmbeddingCache: purged %d vectors of a previous model", deleted)
+
+    def get_disk_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if self._conn is None or not keys:
+            return {}
+
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+            self._disk_hits += len(found)
+        return found
+
+    def put_disk_many(self, items: Dict[str, Sequence[float]]) -> None:
+        if self._conn is None or not items:
+            return
+
+        rows = [
+            (key, self.model_id, array("f", vec).tobytes())
+            for key, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, model_id, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ---------------------------------------------------------
+    # Stats
+    # ---------------------------------------------------------
+    def record_misses(self, count: int) -> None:
+        with self._lock:
+            self._misses += count
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self._memory_hits + self._disk_hits
+        total = hits + self._misses
+        return {
+            "model_id": self.model_id,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "persistent": self._conn is not None,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+class CachedEmbedder:
+    """
+    Same interface as EmbeddingBatcher (embed / embed_many),
+    answering from EmbeddingCache first and encoding only misses.
+    """
+
+    def __init__(self, embedder, cache: EmbeddingCache) -> None:
+        self.embedder = embedder
+        self.cache = cache
+
+    async def embed(self, text: str) -> List[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        keys = [self.cache.key(t) for t in texts]
+        results: List[Optional[List[float]]] = [self.cache.get_memory(k) for k in keys]
+
+        missing = [i for i, vec in enumerate(results) if vec is None]
+
+        # Disk tier
+        if missing and self.cache.persist_path:
+            found = await asyncio.to_thread(
+                self.cache.get_disk_many, list({keys[i] for i in missing})
+            )
+            for i in missing:
+                vec = found.get(keys[i])
+                if vec is not None:
+                    results[i] = vec
+                    self.cache.put_memory(keys[i], vec)
+            missing = [i for i in missing if results[i] is None]
+
+        if not missing:
+            return results
+
+        # Encode each distinct missing text once
+        self.cache.record_misses(len(missing))
+        unique: Dict[str, str] = {}
+        for i in missing:
+            unique.setdefault(keys[i], texts[i])
+
+        vectors = await self.embedder.embed_many(list(unique.values()))
+        encoded = dict(zip(unique.keys(), vectors))
+
+        for key, vec in encoded.items():
+            self.cache.put_memory(key, vec)
+        if self.cache.persist_path:
+            await asyncio.to_thread(self.cache.put_disk_many, encoded)
+
+        for i in missing:
+            results[i] = encoded[keys[i]]
+        return results
@@ -0,0 +1,205 @@
+# app/services/embedding/cross_encoder.py
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.services.embedding.cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage re-ranker: scores the top_n (query, memory) pairs of
+    the first-stage (re_rank) order with a small CPU cross-encoder in
+    one batch and reorders them by that score.
+
+    - Pair scores cached by (query hash, memory id, updated_at), so an
+      edited memory is re-scored
+    - Latency budget: if scoring does not finish within budget_ms the
+      first-stage order is returned unchanged (the batch still completes
+      in the background and fills the cache for the next turn)
+    - Scoring runs on its own single thread, one batch at a time: while
+      a batch is in flight, turns needing new scores keep the
+      first-stage order instead of queueing more work, so missed budgets
+      never pile up on the shared default executor
+    - Added latency / cache / timeout statistics
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        top_n: int = 20,
+        budget_ms: float = 150.0,
+        cache_size: int = 10000,
+        max_length: int = 256,
+    ) -> None:
+        self.model_name = model_name
+        self.top_n = max(1, top_n)
+        self.budget = budget_ms / 1000
+        self.cache_size = max(1, cache_size)
+        self.max_length = max_length
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cross-encoder")
+        self._pending: Optional[asyncio.Future] = None
+
+        self._calls = 0
+        self._pairs_scored = 0
+        self._cache_hits = 0
+        self._timeouts = 0
+        self._busy_skips = 0
+        self._errors = 0
+        self._added_ms = deque(maxlen=2048)
+
+    # ---------------------------------------------------------
+    # Model (loaded on first use or by warm_up)
+    # ---------------------------------------------------------
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                self._model = CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+                logger.info("CrossEncoderReranker: loaded %s", self.model_name)
+            return self._model
+
+    def warm_up(self) -> None:
+        self._get_model().predict([("warm up", "warm up")])
+
+    # ---------------------------------------------------------
+    # Pair score cache
+    # ---------------------------------------------------------
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        text = EmbeddingCache.normalize(query).lower()
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def _pair_key(query_hash: str, mem: Dict[str, Any]) -> tuple:
+        meta = mem.get("metadata") or {}
+        return query_hash, mem.get("id"), meta.get("updated_at")
+
+    def _cache_get(self, key: tuple) -> Optional[float]:
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put_many(self, items: Dict[tuple, float]) -> None:
+        with self._cache_lock:
+            for key, score in items.items():
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _score(self, query: str, keys: List[tuple], texts: List[str]) -> None:
+        """Runs in a worker thread: one batched predict, results go to the cache."""
+        scores = self._get_model().predict(
+            [(query, text) for text in texts], batch_size=len(texts), show_progress_bar=False
+        )
+        self._cache_put_many({key: float(score) for key, score in zip(keys, scores)})
+        self._pairs_scored += len(texts)
+
+    # ---------------------------------------------------------
+    # Re-rank
+    # ---------------------------------------------------------
+    async def rerank(self, query: str, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Reorder the first top_n of `ranked` by cross-encoder score
+        ("cross_score" is added to them); the rest keep their order.
+        """
+        if not ranked:
+            return ranked
+
+        start = time.perf_counter()
+        self._calls += 1
+
+        head, tail = ranked[:self.top_n], ranked[self.top_n:]
+        query_hash = self._query_hash(query)
+        keys = [self._pair_key(query_hash, mem) for mem in head]
+
+        scores = [self._cache_get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        self._cache_hits += len(head) - len(missing)
+
+        if missing:
+            if self._pending is not None and not self._pending.done():
+                # Previous batch (likely a budget miss) still scoring
+                self._busy_skips += 1
+                self._added_ms.append((time.perf_counter() - start) * 1000)
+                return ranked
+
+            job = asyncio.get_running_loop().run_in_executor(
+                self._executor, self._score,
+                query, [keys[i] for i in missing], [head[i]["text"] for i in missing],
+            )
+            job.add_done_callback(self._log_job_error)
+            self._pending = job
+            try:
+                # shield: on timeout the batch keeps running and fills the cache
+                await asyncio.wait_for(asyncio.shield(job), timeout=self.budget)
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+                self._added_ms.append((time.perf_counter() - start) * 1000)
+                logger.debug("CrossEncoderReranker: budget exceeded, keeping first-stage order")
+                return ranked
+            except Exception:
+                self._added_ms.append((time.perf_counter() - start) * 1000)
+                return ranked
+
+            scores = [self._cache_get(key) for key in keys]
+            if any(score is None for score in scores):  # evicted meanwhile (tiny cache)
+                self._added_ms.append((time.perf_counter() - start) * 1000)
+                return ranked
+
+        order = sorted(range(len(head)), key=lambda i: scores[i], reverse=True)
+        reranked = [{**head[i], "cross_score": scores[i]} for i in order] + tail
+
+        self._added_ms.append((time.perf_counter() - start) * 1000)
+        return reranked
+
+    def _log_job_error(self, job: asyncio.Future) -> None:
+        if not job.cancelled() and job.exception() is not None:
+            self._errors += 1
+            logger.warning("CrossEncoderReranker: scoring failed → %s", job.exception())
+
+    # ---------------------------------------------------------
+    # Stats
+    # ---------------------------------------------------------
+    @staticmethod
+    def _percentile(samples, pct: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct))
+        return round(ordered[index], 3)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "calls": self._calls,
+            "pairs_scored": self._pairs_scored,
+            "cache_hits": self._cache_hits,
+            "cache_entries": len(self._cache),
+            "timeouts": self._timeouts,
+            "busy_skips": self._busy_skips,
+            "errors": self._errors,
+            "added_ms_p50": self._percentile(self._added_ms, 0.50),
+            "added_ms_p95": self._percentile(self._added_ms, 0.95),
+            "config": {
+                "top_n": self.top_n,
+                "budget_ms": self.budget * 1000,
+            },
+        }
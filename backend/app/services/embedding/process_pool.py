@@ -0,0 +1,94 @@
+# app/services/embedding/process_pool.py
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Worker-process side
+# ---------------------------------------------------------
+_worker_model = None
+
+
+def _init_worker(backend: Optional[str], threads: int) -> None:
+    """Runs once per worker process: pin thread counts, load the model."""
+    global _worker_model
+
+    # N workers x all-cores threads would oversubscribe the CPU
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    import torch
+    torch.set_num_threads(threads)
+
+    from app.utils.model_loder import load_model
+    _worker_model = load_model(backend)
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    vectors = _worker_model.encode(texts, batch_size=len(texts), convert_to_tensor=False)
+    # A contiguous float32 array pickles as one raw buffer (no per-float objects)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+# ---------------------------------------------------------
+# Parent-process side
+# ---------------------------------------------------------
+class EmbeddingProcessPool:
+    """
+    Drop-in replacement for the SentenceTransformer model returned by
+    get_embedding_model(): encode() fans texts out to worker processes,
+    each holding its own model, so encoding does not compete with the
+    API process for the GIL.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        backend: Optional[str] = None,
+        threads_per_worker: int = 1,
+        min_chunk_size: int = 8,
+    ) -> None:
+        self.workers = workers
+        self.min_chunk_size = max(1, min_chunk_size)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, threads_per_worker),
+        )
+
+    def warm_up(self) -> None:
+        """Start every worker and load its model up front."""
+        futures = [self._executor.submit(_encode_in_worker, ["warm up"]) for _ in range(self.workers)]
+        for fut in futures:
+            fut.result()
+        logger.info("EmbeddingProcessPool: %d workers ready", self.workers)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: Optional[int] = None, **kwargs) -> np.ndarray:
+        """
+        Same call shape as SentenceTransformer.encode. Large inputs
+        are split so all workers encode in parallel.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        n_chunks = max(1, min(self.workers, len(texts) // self.min_chunk_size))
+        chunk_size = -(-len(texts) // n_chunks)  # ceil division
+        futures = [
+            self._executor.submit(_encode_in_worker, texts[i:i + chunk_size])
+            for i in range(0, len(texts), chunk_size)
+        ]
+        vectors = np.concatenate([fut.result() for fut in futures])
+        return vectors[0] if single else vectors
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,58 @@
+# app/services/llm/http_client.py
+
+import threading
+
+import httpx
+
+from app.core.settings import settings
+
+# ---------------------------------------------------------
+# App-scoped HTTP client for the LLM server.
+#
+# Every LLMService instance shares it, so keep-alive
+# connections to Ollama are reused across calls instead of
+# paying TCP setup on each request.
+# ---------------------------------------------------------
+_async_client = None
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.LLM_CONNECT_TIMEOUT,
+        read=settings.LLM_READ_TIMEOUT,
+        write=settings.LLM_WRITE_TIMEOUT,
+        pool=settings.LLM_POOL_TIMEOUT,
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared, pooled async client."""
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = httpx.AsyncClient(
+                base_url=settings.LLM_BASE_URL,
+                limits=_limits(),
+                timeout=_timeout(),
+            )
+        return _async_client
+
+
+async def close_http_clients() -> None:
+    """Close the pool (called on app shutdown)."""
+    global _async_client
+    with _lock:
+        async_client = _async_client
+        _async_client = None
+
+    if async_client is not None:
+        await async_client.aclose()
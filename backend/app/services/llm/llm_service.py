@@ -1,18 +1,20 @@
 # app/services/llm/llm_service.py
 
 import json
-import httpx
+
+from app.core.settings import settings
+from app.services.llm.http_client import get_async_client
 
 
 class LLMService:
     def __init__(self, model_name="llama3.2:3b"):
-        self.base_url = "http://localhost:11434"
+        self.base_url = settings.LLM_BASE_URL
         self.model_name = model_name
 
     # ---------------------------------------------------------
-    # SYNC Reply (non-streaming, used for normal chat)
+    # ASYNC Reply (non-streaming, used for normal chat)
     # ---------------------------------------------------------
-    def generate_reply(self, context_items, query: str) -> str:
+    async def generate_reply(self, context_items, query: str) -> str:
 
         prompt = self.build_prompt(context_items, query)
 
@@ -22,7 +24,7 @@ class LLMService:
             "stream": False
         }
 
-        response = httpx.post(f"{self.base_url}/api/generate", json=payload, timeout=None)
+        response = await get_async_client().post("/api/generate", json=payload)
         data = response.json()
 
         return data.get("response", "").strip()
@@ -32,7 +34,6 @@ class LLMService:
     # ---------------------------------------------------------
     async def stream_reply(self, context_items, query):
         prompt = self.build_prompt(context_items, query)
-        url = "http://localhost:11434/api/generate"
 
         payload = {
             "model": self.model_name,
@@ -40,37 +41,37 @@ class LLMService:
             "stream": True
         }
 
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream("POST", url, json=payload) as response:
-                async for line in response.aiter_lines():
-                    
-                    # Skip empty lines
-                    if not line or not line.strip():
-                        continue
-
-                    # Attempt JSON parse safely
-                    try:
-                        data = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-
-                    # Handle errors from Ollama
-                    if "error" in data:
-                        yield f"[LLM ERROR] {data['error']}"
-                        continue
-
-                    # Stop when done
-                    if data.get("done"):
-                        break
-
-                    # Get streamed text safely
-                    chunk = data.get("response")
-                    if chunk:
-                        yield chunk
+        client = get_async_client()
+        async with client.stream("POST", "/api/generate", json=payload) as response:
+            async for line in response.aiter_lines():
+
+                # Skip empty lines
+                if not line or not line.strip():
+                    continue
+
+                # Attempt JSON parse safely
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                # Handle errors from Ollama
+                if "error" in data:
+                    yield f"[LLM ERROR] {data['error']}"
+                    continue
+
+                # Stop when done
+                if data.get("done"):
+                    break
+
+                # Get streamed text safely
+                chunk = data.get("response")
+                if chunk:
+                    yield chunk
     # ---------------------------------------------------------
     # Summarization API (used by MemoryWriter)
     # ---------------------------------------------------------
-    def summarize(self, text: str, max_tokens=60) -> str:
+    async def summarize(self, text: str, max_tokens=60) -> str:
 
         prompt = (
             "Summarize the following text in a short, clear way.\n"
@@ -83,7 +84,7 @@ class LLMService:
             "stream": False
         }
 
-        response = httpx.post(f"{self.base_url}/api/generate", json=payload, timeout=None)
+        response = await get_async_client().post("/api/generate", json=payload)
         data = response.json()
 
         return data.get("response", "").strip()
@@ -0,0 +1,340 @@
+# app/services/memory/consolidation.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.settings import settings
+from app.services.llm.llm_service import LLMService
+from app.services.memory.memory_engine import MemoryEngine
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = os.path.join(settings.DATA_DIR, "consolidation_state.json")
+
+
+class ConsolidationEngine:
+    """
+    Folds each user's old, low-importance memories into "compressed"
+    memories so per-user index size (and query latency) stays bounded.
+
+    Per user:
+    - pick candidates (older than CONSOLIDATION_MIN_AGE_DAYS, importance
+      <= CONSOLIDATION_MAX_IMPORTANCE, not already compressed)
+    - cluster them greedily by cosine distance of their stored embeddings
+    - summarize each cluster with LLMService.summarize
+    - one batched add of the compressed memories, then one batched delete
+
+    Runs are bounded (users / clusters per run) and resumable: the last
+    finished user is saved to a state file and the next run continues
+    after it. Compressed memories record their source_ids, so sources
+    left behind by an interrupted run are deleted on the next visit.
+    """
+
+    def __init__(self, memory_engine=None, llm=None, state_path: str = STATE_PATH) -> None:
+        self.memory_engine = memory_engine or MemoryEngine()
+        self.llm = llm or LLMService()
+        self.state_path = state_path
+
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    # ---------------------------------------------------------
+    # Resumable state
+    # ---------------------------------------------------------
+    def load_state(self) -> Dict[str, Any]:
+        if not os.path.exists(self.state_path):
+            return {"cursor": None, "last_run": None}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    # ---------------------------------------------------------
+    # Run over users
+    # ---------------------------------------------------------
+    async def run(
+        self,
+        dry_run: bool = False,
+        user_ids: Optional[List[str]] = None,
+        max_users: Optional[int] = None,
+        max_clusters: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Consolidate the next batch of users (or exactly `user_ids`).
+        dry_run makes no LLM calls and no writes; it returns the
+        clusters that would be compressed.
+        """
+        async with self._lock:
+            return await self._run(dry_run, user_ids, max_users, max_clusters)
+
+    async def _run(self, dry_run, user_ids, max_users, max_clusters) -> Dict[str, Any]:
+        max_users = max_users or settings.CONSOLIDATION_MAX_USERS_PER_RUN
+        budget = max_clusters or settings.CONSOLIDATION_MAX_CLUSTERS_PER_RUN
+        state = self.load_state()
+        resumable = user_ids is None
+
+        if resumable:
+            users = await self.memory_engine.list_user_ids(after=state.get("cursor"), limit=max_users)
+            if not users and state.get("cursor"):
+                # Reached the end of the user list: start over
+                users = await self.memory_engine.list_user_ids(after=None, limit=max_users)
+        else:
+            users = list(user_ids)[:max_users]
+
+        report: Dict[str, Any] = {
+            "dry_run": dry_run,
+            "started_at": time.time(),
+            "users_processed": 0,
+            "clusters": 0,
+            "memories_compressed": 0,
+            "clusters_skipped": 0,
+            "complete": True,
+            "users": [],
+        }
+
+        for user_id in users:
+            if budget <= 0:
+                report["complete"] = False
+                break
+
+            user_report = await self.consolidate_user(user_id, dry_run=dry_run, max_clusters=budget)
+            budget -= user_report["clusters"]
+
+            report["users"].append(user_report)
+            report["users_processed"] += 1
+            report["clusters"] += user_report["clusters"]
+            report["memories_compressed"] += user_report["memories_compressed"]
+            report["clusters_skipped"] += user_report["clusters_skipped"]
+
+            if user_report["truncated"]:
+                # Cluster budget ran out inside this user: revisit it next run
+                report["complete"] = False
+                break
+
+            if resumable and not dry_run:
+                state["cursor"] = user_id
+                self._save_state(state)
+
+        report["finished_at"] = time.time()
+
+        if not dry_run:
+            state["last_run"] = {k: v for k, v in report.items() if k != "users"}
+            self._save_state(state)
+
+        logger.info(
+            "Consolidation%s: %d users, %d clusters, %d memories compressed, %d clusters skipped",
+            " (dry run)" if dry_run else "",
+            report["users_processed"], report["clusters"], report["memories_compressed"],
+            report["clusters_skipped"],
+        )
+        return report
+
+    # ---------------------------------------------------------
+    # One user
+    # ---------------------------------------------------------
+    async def consolidate_user(self, user_id: str, dry_run: bool = False, max_clusters: int = None) -> Dict[str, Any]:
+        max_clusters = max_clusters or settings.CONSOLIDATION_MAX_CLUSTERS_PER_RUN
+        memories = await self.memory_engine.recall(user_id, limit=None, include_embeddings=True)
+
+        if not dry_run:
+            leftovers = await self._finish_interrupted(user_id, memories)
+            memories = [m for m in memories if m["id"] not in leftovers]
+
+        candidates = self._candidates(memories)
+        clusters = self._cluster(candidates)
+        truncated = len(clusters) > max_clusters
+        clusters = clusters[:max_clusters]
+
+        user_report: Dict[str, Any] = {
+            "user_id": user_id,
+            "memories": len(memories),
+            "candidates": len(candidates),
+            "clusters": len(clusters),
+            "memories_compressed": sum(len(c) for c in clusters),
+            "clusters_skipped": 0,
+            "truncated": truncated,
+        }
+
+        if dry_run:
+            user_report["preview"] = [
+                {
+                    "size": len(cluster),
+                    "ids": [m["id"] for m in cluster],
+                    "texts": [(m["text"] or "")[:80] for m in cluster],
+                }
+                for cluster in clusters
+            ]
+            return user_report
+
+        if not clusters:
+            return user_report
+
+        # Bounded fan-out: one run may hold up to CONSOLIDATION_MAX_CLUSTERS_PER_RUN clusters
+        slots = asyncio.Semaphore(max(1, settings.CONSOLIDATION_SUMMARY_CONCURRENCY))
+        summaries = await asyncio.gather(*(self._summarize(cluster, slots) for cluster in clusters))
+
+        items = []
+        source_ids: List[str] = []
+        for cluster, summary in zip(clusters, summaries):
+            if not summary:
+                continue  # keep the sources; retried on a later run
+            ids = [m["id"] for m in cluster]
+            created = [float(m["metadata"].get("created_at", 0) or 0) for m in cluster]
+            items.append({
+                "user_id": user_id,
+                "session_id": "consolidation",
+                "text": summary,
+                "memory_type": "compressed",
+                "metadata": {
+                    "importance": max(self._importance(m) for m in cluster),
+                    "source_count": len(ids),
+                    "source_ids": ",".join(ids),
+                    "source_created_min": min(created),
+                    "source_created_max": max(created),
+                },
+            })
+            source_ids.extend(ids)
+
+        # Add first, then delete: an interruption leaves duplicates
+        # (cleaned up by _finish_interrupted), never lost memories
+        await self.memory_engine.add_memories(items)
+        await self.memory_engine.delete_memories(user_id, source_ids)
+
+        user_report["clusters"] = len(items)
+        user_report["memories_compressed"] = len(source_ids)
+        user_report["clusters_skipped"] = len(clusters) - len(items)
+        if user_report["clusters_skipped"]:
+            logger.warning(
+                "Consolidation: %d of %d clusters of %s skipped (no summary), retried next run",
+                user_report["clusters_skipped"], len(clusters), user_id,
+            )
+        return user_report
+
+    async def _finish_interrupted(self, user_id: str, memories: List[Dict[str, Any]]) -> set:
+        """Delete sources that a compressed memory already replaced."""
+        present = {m["id"] for m in memories}
+        leftovers = set()
+        for mem in memories:
+            meta = mem["metadata"]
+            if meta.get("memory_type") != "compressed" or not meta.get("source_ids"):
+                continue
+            leftovers.update(sid for sid in meta["source_ids"].split(",") if sid in present)
+
+        if leftovers:
+            logger.info("Consolidation: removing %d leftover sources for %s", len(leftovers), user_id)
+            await self.memory_engine.delete_memories(user_id, sorted(leftovers))
+        return leftovers
+
+    # ---------------------------------------------------------
+    # Candidate selection + clustering
+    # ---------------------------------------------------------
+    @staticmethod
+    def _importance(mem: Dict[str, Any]) -> float:
+        try:
+            return float(mem["metadata"].get("importance", 0.4))
+        except (TypeError, ValueError):
+            return 0.4
+
+    def _candidates(self, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        cutoff = time.time() - settings.CONSOLIDATION_MIN_AGE_DAYS * 86400
+        out = []
+        for mem in memories:
+            meta = mem["metadata"]
+            if meta.get("memory_type") == "compressed" or mem.get("embedding") is None:
+                continue
+            try:
+                created_at = float(meta.get("created_at"))
+            except (TypeError, ValueError):
+                continue
+            if created_at <= cutoff and self._importance(mem) <= settings.CONSOLIDATION_MAX_IMPORTANCE:
+                out.append(mem)
+
+        out.sort(key=lambda m: float(m["metadata"]["created_at"]))
+        return out
+
+    def _cluster(self, candidates: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Greedy leader clustering: each unassigned memory (oldest first)
+        gathers the unassigned memories within
+        CONSOLIDATION_CLUSTER_MAX_DISTANCE of it. One matrix-vector
+        product per seed keeps memory O(n).
+        """
+        min_size = settings.CONSOLIDATION_MIN_CLUSTER_SIZE
+        max_size = settings.CONSOLIDATION_MAX_CLUSTER_SIZE
+        if len(candidates) < min_size:
+            return []
+
+        vectors = np.asarray([m["embedding"] for m in candidates], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        threshold = 1.0 - settings.CONSOLIDATION_CLUSTER_MAX_DISTANCE
+
+        assigned = np.zeros(len(candidates), dtype=bool)
+        clusters = []
+        for seed in range(len(candidates)):
+            if assigned[seed]:
+                continue
+
+            sims = vectors @ vectors[seed]
+            members = np.flatnonzero((sims >= threshold) & ~assigned)
+            if len(members) < min_size:
+                continue
+
+            members = members[np.argsort(-sims[members])][:max_size]
+            assigned[members] = True
+            clusters.append([candidates[i] for i in members])
+
+        return clusters
+
+    async def _summarize(self, cluster: List[Dict[str, Any]], slots: asyncio.Semaphore) -> Optional[str]:
+        text = "\n".join(f"- {m['text']}" for m in cluster)
+        try:
+            async with slots:
+                summary = await self.llm.summarize(text, max_tokens=80)
+        except Exception as e:
+            logger.warning("Consolidation: summarize failed → %s", e)
+            return None
+        return summary.strip() if summary else None
+
+    # ---------------------------------------------------------
+    # Periodic schedule
+    # ---------------------------------------------------------
+    def start_schedule(self, interval_minutes: float) -> None:
+        if self._task is None and interval_minutes > 0:
+            self._task = asyncio.create_task(self._loop(interval_minutes * 60), name="consolidation")
+            logger.info("Consolidation: scheduled every %s minutes", interval_minutes)
+
+    async def stop_schedule(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self, interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Consolidation: scheduled run failed")
+
+
+@lru_cache
+def get_consolidation_engine() -> ConsolidationEngine:
+    """Return the SINGLE consolidation engine (shared by scheduler, API and CLI)."""
+    return ConsolidationEngine()
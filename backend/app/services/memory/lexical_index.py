@@ -0,0 +1,292 @@
+# app/services/memory/lexical_index.py
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression: every
+    whitespace-separated word becomes a quoted phrase of its tokens
+    (so "LX-4471-B" matches as one unit), and words are OR-ed so BM25
+    ranks documents matching more / rarer words first.
+    """
+    phrases = []
+    for word in query.split():
+        tokens = _WORD.findall(word.lower())
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " OR ".join(dict.fromkeys(phrases))
+
+
+def user_key(user_id: str) -> str:
+    """
+    Single FTS token standing for user_id in the indexed user column
+    (raw ids would be split into several tokens by the tokenizer).
+    """
+    return "u" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:20]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> Dict[str, float]:
+    """RRF: score(d) = sum over rankings of 1 / (k + rank(d)), rank from 1."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class LexicalIndex:
+    """
+    SQLite FTS5 (BM25) index over memory text, kept in sync with the
+    vector store by MemoryEngine on every add / update / delete.
+
+    Called from MemoryEngine's worker threads, so it uses one
+    sqlite3 connection guarded by a lock (like the Chroma calls,
+    it never runs on the event loop).
+
+    The owner is an indexed FTS column (user_key token), so a search
+    matches `user:<key> AND (...)`: only the user's own documents are
+    scored by BM25, not every matching document in the corpus.
+
+    lexical_docs also keeps each memory's created_at under a
+    (user_id, created_at, memory_id) index: paged listing reads one
+    page of IDs from it instead of sorting the user's metadata.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_db()
+
+    def _init_db(self) -> None:
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS lexical_docs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    memory_id TEXT UNIQUE NOT NULL,
+                    user_id TEXT NOT NULL,
+                    created_at REAL
+                )
+            """)
+            doc_columns = [row[1] for row in self._conn.execute("PRAGMA table_info(lexical_docs)")]
+            if "created_at" not in doc_columns:
+                # Rows of an older index get their created_at lazily (see unordered)
+                self._conn.execute("ALTER TABLE lexical_docs ADD COLUMN created_at REAL")
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_lexical_docs_order
+                ON lexical_docs (user_id, created_at, memory_id)
+            """)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(lexical_fts)")]
+            if columns and "user" not in columns:
+                self._migrate_user_column()
+            else:
+                self._create_fts("lexical_fts")
+            self._conn.commit()
+
+    def _create_fts(self, name: str) -> None:
+        self._conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {name}
+            USING fts5(user, text, tokenize='unicode61 remove_diacritics 2')
+        """)
+
+    def _migrate_user_column(self) -> None:
+        """Rebuild an index created before the user column existed."""
+        logger.info("LexicalIndex: adding the user column to %s", self.db_path)
+        self._conn.create_function("user_key", 1, user_key, deterministic=True)
+        self._conn.execute("DROP TABLE IF EXISTS lexical_fts_new")
+        self._create_fts("lexical_fts_new")
+        self._conn.execute("""
+            INSERT INTO lexical_fts_new (rowid, user, text)
+            SELECT f.rowid, user_key(d.user_id), f.text
+            FROM lexical_fts f JOIN lexical_docs d ON d.id = f.rowid
+        """)
+        self._conn.execute("DROP TABLE lexical_fts")
+        self._conn.execute("ALTER TABLE lexical_fts_new RENAME TO lexical_fts")
+
+    # ---------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------
+    def add_many(self, rows: List[Tuple[str, str, str, float]]) -> None:
+        """rows: (memory_id, user_id, text, created_at). Existing ids are replaced."""
+        if not rows:
+            return
+
+        with self._lock:
+            cur = self._conn.cursor()
+            for memory_id, user_id, text, created_at in rows:
+                found = cur.execute(
+                    "SELECT id FROM lexical_docs WHERE memory_id = ?", (memory_id,)
+                ).fetchone()
+                if found:
+                    rowid = found[0]
+                    cur.execute(
+                        "UPDATE lexical_docs SET user_id = ?, created_at = ? WHERE id = ?",
+                        (user_id, created_at, rowid),
+                    )
+                    cur.execute("DELETE FROM lexical_fts WHERE rowid = ?", (rowid,))
+                else:
+                    cur.execute(
+                        "INSERT INTO lexical_docs (memory_id, user_id, created_at) VALUES (?, ?, ?)",
+                        (memory_id, user_id, created_at),
+                    )
+                    rowid = cur.lastrowid
+                cur.execute(
+                    "INSERT INTO lexical_fts (rowid, user, text) VALUES (?, ?, ?)",
+                    (rowid, user_key(user_id), text or ""),
+                )
+            self._conn.commit()
+
+    def update(self, memory_id: str, text: str) -> None:
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT id, user_id FROM lexical_docs WHERE memory_id = ?", (memory_id,)
+            ).fetchone()
+            if not found:
+                return
+            self._conn.execute("DELETE FROM lexical_fts WHERE rowid = ?", (found[0],))
+            self._conn.execute(
+                "INSERT INTO lexical_fts (rowid, user, text) VALUES (?, ?, ?)",
+                (found[0], user_key(found[1]), text or ""),
+            )
+            self._conn.commit()
+
+    def set_created_at(self, rows: List[Tuple[str, float]]) -> None:
+        """rows: (memory_id, created_at)."""
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE lexical_docs SET created_at = ? WHERE memory_id = ?",
+                [(created_at, memory_id) for memory_id, created_at in rows],
+            )
+            self._conn.commit()
+
+    def delete(self, memory_ids: List[str]) -> None:
+        if not memory_ids:
+            return
+
+        with self._lock:
+            cur = self._conn.cursor()
+            for memory_id in memory_ids:
+                found = cur.execute(
+                    "SELECT id FROM lexical_docs WHERE memory_id = ?", (memory_id,)
+                ).fetchone()
+                if found:
+                    cur.execute("DELETE FROM lexical_fts WHERE rowid = ?", (found[0],))
+                    cur.execute("DELETE FROM lexical_docs WHERE id = ?", (found[0],))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM lexical_fts")
+            self._conn.execute("DELETE FROM lexical_docs")
+            self._conn.commit()
+
+    # ---------------------------------------------------------
+    # Search
+    # ---------------------------------------------------------
+    def search(self, user_id: str, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        """Top-k (memory_id, bm25) for user_id, best first (lower bm25 = better)."""
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        # Restrict by the indexed user column inside MATCH; weight 0 keeps
+        # the user token out of the BM25 score
+        match = f'user:"{user_key(user_id)}" AND text:({match})'
+
+        with self._lock:
+            try:
+                rows = self._conn.execute("""
+                    SELECT d.memory_id, bm25(lexical_fts, 0.0, 1.0) AS score
+                    FROM lexical_fts
+                    JOIN lexical_docs d ON d.id = lexical_fts.rowid
+                    WHERE lexical_fts MATCH ? AND d.user_id = ?
+                    ORDER BY score
+                    LIMIT ?
+                """, (match, user_id, k)).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning("LexicalIndex: query %r failed: %s", match, e)
+                return []
+
+        return [(memory_id, float(score)) for memory_id, score in rows]
+
+    # ---------------------------------------------------------
+    # Ordered listing
+    # ---------------------------------------------------------
+    def page(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Tuple[float, str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Up to `limit` (memory_id, created_at) of user_id in
+        (created_at, memory_id) order, strictly after the keyset
+        cursor `after`. Rows without created_at must be filled in
+        first (unordered / set_created_at).
+        """
+        with self._lock:
+            if after is None:
+                rows = self._conn.execute("""
+                    SELECT memory_id, created_at FROM lexical_docs
+                    WHERE user_id = ?
+                    ORDER BY created_at, memory_id
+                    LIMIT ?
+                """, (user_id, limit)).fetchall()
+            else:
+                rows = self._conn.execute("""
+                    SELECT memory_id, created_at FROM lexical_docs
+                    WHERE user_id = ? AND (created_at, memory_id) > (?, ?)
+                    ORDER BY created_at, memory_id
+                    LIMIT ?
+                """, (user_id, float(after[0]), after[1], limit)).fetchall()
+        return [(memory_id, float(created_at)) for memory_id, created_at in rows]
+
+    def user_ids(self, after: Optional[str] = None, limit: int = 100) -> List[str]:
+        """Distinct indexed user_ids in sorted order, starting after `after`."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT DISTINCT user_id FROM lexical_docs
+                WHERE user_id > ?
+                ORDER BY user_id
+                LIMIT ?
+            """, (after or "", limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def unordered(self, user_id: str, limit: int) -> List[str]:
+        """Up to `limit` memory_ids of user_id indexed before created_at was kept."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT memory_id FROM lexical_docs WHERE user_id = ? AND created_at IS NULL LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def owner(self, memory_id: str) -> Optional[str]:
+        """user_id that memory_id belongs to (None if not indexed)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_id FROM lexical_docs WHERE memory_id = ?", (memory_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM lexical_docs").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
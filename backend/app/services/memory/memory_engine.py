@@ -1,8 +1,33 @@
+import asyncio
+import logging
 import time
 import uuid
-from typing import List, Dict, Any, Optional
-
-from app.core.service_loader import get_embedding_model, get_memory_collection
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.service_loader import (
+    find_collection,
+    find_user_collection,
+    get_chroma_client,
+    get_embedder,
+    get_lexical_index,
+    get_search_cache,
+    get_user_collection,
+    list_memory_collection_names,
+    MEMORY_COLLECTION,
+)
+from app.core.settings import settings
+from app.utils.token_counter import count_tokens_many, token_counter_id
+from app.services.memory.lexical_index import reciprocal_rank_fusion
+from app.services.memory.quota import forget_usage
+from app.services.memory.numpy_index import (
+    NumpyCollection,
+    get_numpy_index,
+    iter_numpy_indexes,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class MemoryEngine:
@@ -15,18 +40,87 @@ class MemoryEngine:
     - Created/updated timestamps
     - Safer search result parsing
     - Guaranteed return structure
+    - Async API: encode and Chroma calls run in worker threads
+      so they never block the event loop
+    - Optional per-user / hash-bucket collection partitioning
+      (settings.MEMORY_PARTITION_MODE)
+    - Optional in-process NumPy exact search for small users
+      (settings.MEMORY_INDEX_BACKEND), promoted to Chroma when they grow
+    - Hybrid search: an FTS5/BM25 index kept in sync on every write,
+      fused with vector hits by reciprocal-rank fusion
+    - Per-user search result cache, invalidated by a version
+      bump on every add / update / delete
     """
 
     def __init__(self) -> None:
-        self.model = get_embedding_model()
-        self.collection = get_memory_collection()
+        self.embedder = get_embedder()
+        self.lexical = get_lexical_index() if settings.LEXICAL_INDEX_ENABLED else None
+        self.search_cache = get_search_cache() if settings.SEARCH_CACHE_ENABLED else None
+
+    def _invalidate(self, user_id: Optional[str]) -> None:
+        """Make cached search results of user_id (all users if None) stale."""
+        if self.search_cache is None:
+            return
+        if user_id is None:
+            self.search_cache.bump_all()
+        else:
+            self.search_cache.bump(user_id)
+
+    # ---------------------------------------------------------
+    # Partition routing
+    # ---------------------------------------------------------
+    def _collection(self, user_id: str, create: bool = True):
+        """
+        user_id's collection. Read paths pass create=False and get None
+        when the user has no collection yet, so reads never leave empty
+        collections behind.
+        """
+        if settings.MEMORY_INDEX_BACKEND == "numpy":
+            index = get_numpy_index(user_id)
+            if index is not None:
+                return index
+        return get_user_collection(user_id) if create else find_user_collection(user_id)
+
+    def _user_where(self, user_id: str, collection=None) -> Optional[Dict[str, Any]]:
+        # A per-user collection / NumPy index only holds that user's memories
+        if isinstance(collection, NumpyCollection) or settings.MEMORY_PARTITION_MODE == "per_user":
+            return None
+        return {"user_id": user_id}
+
+    def _owner(self, memory_id: str) -> Optional[str]:
+        """Owning user of memory_id, from the lexical index's per-memory user_id."""
+        return self.lexical.owner(memory_id) if self.lexical is not None else None
+
+    def _locate(self, memory_id: str, user_id: Optional[str] = None):
+        """Find the collection holding memory_id (None if missing)."""
+        user_id = user_id or self._owner(memory_id)
+        if user_id is not None:
+            return self._collection(user_id, create=False)
+
+        if settings.MEMORY_PARTITION_MODE == "global" and settings.MEMORY_INDEX_BACKEND != "numpy":
+            return find_collection(MEMORY_COLLECTION)
+
+        # Unknown owner (lexical index disabled or not rebuilt): scan partitions
+        logger.warning("MemoryEngine: owner of %s unknown, scanning every partition", memory_id)
+        if settings.MEMORY_INDEX_BACKEND == "numpy":
+            for index in iter_numpy_indexes():
+                if memory_id in index:
+                    return index
+
+        for name in list_memory_collection_names():
+            col = find_collection(name)
+            if col is not None and col.get(ids=[memory_id], include=[]).get("ids"):
+                return col
+        return None
 
     # ---------------------------------------------------------
-    # Embedding helper
+    # Embedding helper (micro-batched across concurrent callers)
     # ---------------------------------------------------------
-    def embed(self, text: str) -> List[float]:
-        vec = self.model.encode(text, convert_to_tensor=False)
-        return vec.tolist() if hasattr(vec, "tolist") else vec
+    async def embed(self, text: str) -> List[float]:
+        return await self.embedder.embed(text)
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedder.embed_many(texts)
 
     # ---------------------------------------------------------
     # Generate unique memory ID (no collisions)
@@ -37,18 +131,131 @@ class MemoryEngine:
     # ---------------------------------------------------------
     # Add memory
     # ---------------------------------------------------------
-    def add_memory(
+    async def add_memory(
         self,
         user_id: str,
         session_id: str,
         text: str,
         memory_type: str = "fact",
         metadata: Optional[Dict[str, Any]] = None,
+        embedding: Optional[List[float]] = None,
     ) -> str:
+        """
+        Pass `embedding` if the vector of `text` is already known
+        to skip re-encoding it.
+        """
+        ids = await self.add_memories([{
+            "user_id": user_id,
+            "session_id": session_id,
+            "text": text,
+            "memory_type": memory_type,
+            "metadata": metadata,
+            "embedding": embedding,
+        }])
+        return ids[0]
+
+    # ---------------------------------------------------------
+    # Batch add (one encode call + one Chroma write per chunk)
+    # ---------------------------------------------------------
+    async def add_memories(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        Each item: user_id, session_id, text and optionally
+        memory_type, metadata, embedding.
+        Returns the new IDs in input order.
+        """
+        if not items:
+            return []
 
-        mem_id = self._generate_id()
         timestamp = time.time()
+        ids: List[str] = []
+        docs: List[str] = []
+        metas: List[Dict[str, Any]] = []
+        embeddings: List[Optional[List[float]]] = []
+
+        for item in items:
+            ids.append(self._generate_id())
+            docs.append(item["text"])
+            metas.append(self._build_metadata(
+                item["user_id"],
+                item["session_id"],
+                item.get("memory_type") or "fact",
+                item.get("metadata"),
+                timestamp,
+            ))
+            embeddings.append(item.get("embedding"))
+
+        # Batch-encode every text without a precomputed vector
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        if missing:
+            vectors = await self.embed_many([docs[i] for i in missing])
+            for i, vec in zip(missing, vectors):
+                embeddings[i] = vec
+
+        # Prompt cost of each text, so context building never re-tokenizes;
+        # token_counter tells tokenizer counts from estimates
+        token_counts = await asyncio.to_thread(count_tokens_many, docs)
+        counter = token_counter_id()
+        for meta, count in zip(metas, token_counts):
+            meta["token_count"] = count
+            meta["token_counter"] = counter
+
+        await asyncio.to_thread(self._write_batches, ids, docs, embeddings, metas)
+        return ids
+
+    # ---------------------------------------------------------
+    # Bulk load of complete records (snapshot import)
+    # ---------------------------------------------------------
+    async def import_memories(
+        self,
+        ids: List[str],
+        docs: List[str],
+        embeddings,
+        metas: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Write records that already carry their ID, metadata and vector
+        (no re-embedding). IDs that already exist are left untouched,
+        including their lexical index text.
+        """
+        if not ids:
+            return
 
+        keep = await asyncio.to_thread(self._missing_ids, ids, metas)
+        if len(keep) < len(ids):
+            ids = [ids[i] for i in keep]
+            docs = [docs[i] for i in keep]
+            embeddings = [embeddings[i] for i in keep]
+            metas = [metas[i] for i in keep]
+        if not ids:
+            return
+
+        await asyncio.to_thread(self._write_batches, ids, docs, embeddings, metas)
+        for user_id in {meta["user_id"] for meta in metas}:
+            forget_usage(user_id)
+
+    def _missing_ids(self, ids: List[str], metas: List[Dict[str, Any]]) -> List[int]:
+        """Positions of the ids not yet stored in their user's collection."""
+        by_user: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metas):
+            by_user.setdefault(meta["user_id"], []).append(i)
+
+        keep = []
+        for user_id, indexes in by_user.items():
+            collection = self._collection(user_id, create=False)
+            existing = set()
+            if collection is not None:
+                existing = set(collection.get(ids=[ids[i] for i in indexes], include=[]).get("ids") or [])
+            keep.extend(i for i in indexes if ids[i] not in existing)
+        return sorted(keep)
+
+    def _build_metadata(
+        self,
+        user_id: str,
+        session_id: str,
+        memory_type: str,
+        metadata: Optional[Dict[str, Any]],
+        timestamp: float,
+    ) -> Dict[str, Any]:
         base_meta: Dict[str, Any] = {
             "user_id": user_id,
             "session_id": session_id,
@@ -61,91 +268,439 @@ class MemoryEngine:
         if metadata:
             base_meta.update(metadata) # using if because update gives error if metadata is None
 
-        embedding = self.embed(text)
-
-        self.collection.add(
-            ids=[mem_id],
-            documents=[text],
-            embeddings=[embedding],
-            metadatas=[base_meta],
-        )
-
-        return mem_id
+        return base_meta
+
+    def _write_batches(self, ids, docs, embeddings, metas) -> None:
+        # Group by target partition / NumPy index (keeps input order inside each one)
+        groups: Dict[int, List[int]] = {}
+        targets: Dict[int, Any] = {}
+        for i, meta in enumerate(metas):
+            col = self._collection(meta["user_id"])
+            targets[id(col)] = col
+            groups.setdefault(id(col), []).append(i)
+
+        # Chroma rejects adds above its max batch size
+        chunk = min(settings.MEMORY_ADD_BATCH_SIZE, get_chroma_client().get_max_batch_size())
+        for key, indexes in groups.items():
+            col = targets[key]
+            for start in range(0, len(indexes), chunk):
+                part = indexes[start:start + chunk]
+                col.add(
+                    ids=[ids[i] for i in part],
+                    documents=[docs[i] for i in part],
+                    embeddings=[embeddings[i] for i in part],
+                    metadatas=[metas[i] for i in part],
+                )
+
+            if isinstance(col, NumpyCollection) and col.count() > settings.MEMORY_NUMPY_PROMOTE_THRESHOLD:
+                col.promote()
+
+        if self.lexical is not None:
+            self.lexical.add_many([
+                (mid, meta["user_id"], doc, float(meta.get("created_at") or 0))
+                for mid, doc, meta in zip(ids, docs, metas)
+            ])
+
+        for user_id in {meta["user_id"] for meta in metas}:
+            self._invalidate(user_id)
 
     # ---------------------------------------------------------
-    # Semantic search
+    # Semantic (+ lexical) search
     # ---------------------------------------------------------
-    def search_memory(
+    async def search_memory(
         self,
         user_id: str,
         query: str,
         k: int = 10,
+        query_embedding: Optional[List[float]] = None,
+        include_embeddings: bool = False,
     ) -> List[Dict[str, Any]]:
+        """
+        Vector top-k, fused with BM25 hits by reciprocal-rank fusion
+        when the lexical index is enabled. Output is in fused order.
+        Served from the search cache while user_id's memories are unchanged.
+        include_embeddings adds each hit's stored vector under "embedding".
+        """
+        if self.search_cache is None:
+            return await self._search(user_id, query, k, query_embedding, include_embeddings)
+
+        # Version is read before searching: a write that lands mid-search
+        # bumps it, so this result is stored under an already-stale key
+        key = self.search_cache.key(
+            user_id, self.search_cache.version(user_id), query, k, query_embedding,
+            embeddings=include_embeddings,
+        )
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
 
-        qvec = self.embed(query)
+        results = await self._search(user_id, query, k, query_embedding, include_embeddings)
+        self.search_cache.put(key, results)
+        return results
 
-        results = self.collection.query(
+    async def _search(
+        self,
+        user_id: str,
+        query: str,
+        k: int,
+        query_embedding: Optional[List[float]],
+        include_embeddings: bool = False,
+    ) -> List[Dict[str, Any]]:
+
+        qvec = query_embedding if query_embedding is not None else await self.embed(query)
+
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+
+        collection = self._collection(user_id, create=False)
+        if collection is None:
+            return []  # no memories stored for this user yet
+
+        vector_task = asyncio.to_thread(
+            collection.query,
             query_embeddings=[qvec],
             n_results=k,
-            where={"user_id": user_id},
-            include=["documents", "metadatas", "distances"],
+            where=self._user_where(user_id, collection),
+            include=include,
         )
 
+        if self.lexical is None:
+            results = await vector_task
+            lexical_hits = []
+        else:
+            results, lexical_hits = await asyncio.gather(
+                vector_task,
+                asyncio.to_thread(self.lexical.search, user_id, query, settings.LEXICAL_SEARCH_K),
+            )
+
         ids = (results.get("ids") or [[]])[0]
         docs = (results.get("documents") or [[]])[0]
         metas = (results.get("metadatas") or [[]])[0]
         dists = (results.get("distances") or [[]])[0]
+        embeddings = results.get("embeddings")
+        embeddings = embeddings[0] if embeddings is not None else [None] * len(ids)
 
         output = []
-        for mid, doc, meta, dist in zip(ids, docs, metas, dists): #zip iterates over multiple lists in parallel
-            output.append({
+        for mid, doc, meta, dist, emb in zip(ids, docs, metas, dists, embeddings): #zip iterates over multiple lists in parallel
+            hit = {
                 "id": mid,
                 "text": doc,
                 "metadata": meta or {},
                 "distance": float(dist),
-            })
+            }
+            if include_embeddings:
+                hit["embedding"] = emb
+            output.append(hit)
 
-        return output
+        if not lexical_hits:
+            return output
+
+        return await asyncio.to_thread(
+            self._fuse, collection, qvec, output, [mid for mid, _ in lexical_hits], k, include_embeddings
+        )
+
+    def _fuse(self, collection, qvec, vector_hits, lexical_ids, k, include_embeddings=False) -> List[Dict[str, Any]]:
+        scores = reciprocal_rank_fusion(
+            [[hit["id"] for hit in vector_hits], lexical_ids], k=settings.RRF_K
+        )
+        by_id = {hit["id"]: hit for hit in vector_hits}
+
+        # Lexical-only hits: load them and score their vectors against the query
+        missing = [mid for mid in lexical_ids if mid not in by_id]
+        if missing:
+            fetched = collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+            q = np.asarray(qvec, dtype=np.float32)
+            qnorm = float(np.linalg.norm(q)) or 1.0
+            for mid, doc, meta, emb in zip(
+                fetched.get("ids") or [],
+                fetched.get("documents") or [],
+                fetched.get("metadatas") or [],
+                fetched.get("embeddings") if fetched.get("embeddings") is not None else [],
+            ):
+                emb = np.asarray(emb, dtype=np.float32)
+                cos = float(emb @ q) / ((float(np.linalg.norm(emb)) or 1.0) * qnorm)
+                by_id[mid] = {"id": mid, "text": doc, "metadata": meta or {}, "distance": 1.0 - cos}
+                if include_embeddings:
+                    by_id[mid]["embedding"] = emb
+
+        fused = sorted(by_id, key=lambda mid: scores.get(mid, 0.0), reverse=True)[:k]
+        return [{**by_id[mid], "rrf_score": scores.get(mid, 0.0)} for mid in fused]
+
+    # ---------------------------------------------------------
+    # Nearest memory of one type (write-time dedup)
+    # ---------------------------------------------------------
+    async def find_similar(
+        self,
+        user_id: str,
+        embedding: List[float],
+        memory_type: str,
+        max_distance: float,
+    ) -> Optional[Dict[str, Any]]:
+        """Closest memory of memory_type within max_distance, or None."""
+        collection = self._collection(user_id, create=False)
+        if collection is None:
+            return None
+        user_where = self._user_where(user_id, collection)
+        type_where = {"memory_type": memory_type}
+        where = {"$and": [user_where, type_where]} if user_where else type_where
+
+        results = await asyncio.to_thread(
+            collection.query,
+            query_embeddings=[embedding],
+            n_results=1,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+
+        ids = (results.get("ids") or [[]])[0]
+        if not ids:
+            return None
+
+        distance = float(results["distances"][0][0])
+        if distance > max_distance:
+            return None
+
+        return {
+            "id": ids[0],
+            "text": results["documents"][0][0],
+            "metadata": results["metadatas"][0][0] or {},
+            "distance": distance,
+        }
 
     # ---------------------------------------------------------
     # Recall all memories for a user (no vector search)
     # ---------------------------------------------------------
-    def recall(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+    async def recall(
+        self,
+        user_id: str,
+        limit: Optional[int] = 100,
+        include_embeddings: bool = False,
+    ) -> List[Dict[str, Any]]:
         """
         Uses .get() instead of .query() = correct & reliable.
+        limit=None returns every memory; include_embeddings adds
+        each stored vector under "embedding" (for maintenance jobs).
         """
 
-        results = self.collection.get(
-            where={"user_id": user_id},
+        include = ["documents", "metadatas"]
+        if include_embeddings:
+            include.append("embeddings")
+
+        collection = self._collection(user_id, create=False)
+        if collection is None:
+            return []
+
+        results = await asyncio.to_thread(
+            collection.get,
+            where=self._user_where(user_id, collection),
             limit=limit,
-            include=["documents", "metadatas"],
+            include=include,
         )
 
         ids = results.get("ids") or []
         docs = results.get("documents") or []
         metas = results.get("metadatas") or []
+        embeddings = results.get("embeddings")
+        if embeddings is None:
+            embeddings = [None] * len(ids)
 
         output = []
-        for mid, doc, meta in zip(ids, docs, metas):
-            output.append({
+        for mid, doc, meta, emb in zip(ids, docs, metas, embeddings):
+            mem = {
                 "id": mid,
                 "text": doc,
                 "metadata": meta or {},
-            })
+            }
+            if include_embeddings:
+                mem["embedding"] = emb
+            output.append(mem)
 
         return output
 
+    # ---------------------------------------------------------
+    # Memory count per type (metadata only)
+    # ---------------------------------------------------------
+    async def count_by_type(self, user_id: str) -> Dict[str, int]:
+        """Number of user_id's memories per memory_type, without loading documents."""
+        collection = self._collection(user_id, create=False)
+        if collection is None:
+            return {}
+
+        results = await asyncio.to_thread(
+            collection.get, where=self._user_where(user_id, collection), include=["metadatas"]
+        )
+        counts: Dict[str, int] = {}
+        for meta in results.get("metadatas") or []:
+            mtype = (meta or {}).get("memory_type", "fact")
+            counts[mtype] = counts.get(mtype, 0) + 1
+        return counts
+
+    # ---------------------------------------------------------
+    # Paged recall (constant memory per page)
+    # ---------------------------------------------------------
+    async def recall_page(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[Tuple[float, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of a user's memories in (created_at, id) order, starting
+        after the keyset cursor `after` = (created_at, id) of the previous
+        page's last memory. Keyset paging stays stable when memories are
+        deleted between pages (consolidation, quota eviction).
+        Returns {"memories": [...], "next_cursor": (created_at, id) or None}.
+
+        Chroma cannot sort, so the page's IDs come from the lexical
+        index's (user_id, created_at, memory_id) index and only those
+        `limit` records are loaded. Without the lexical index, each page
+        falls back to reading the metadata of every memory at or after
+        the cursor.
+        """
+        collection = self._collection(user_id, create=False)
+        if collection is None:
+            return {"memories": [], "next_cursor": None}
+
+        if self.lexical is not None:
+            rows = await asyncio.to_thread(self._indexed_page, collection, user_id, limit, after)
+        else:
+            rows = await asyncio.to_thread(self._scanned_page, collection, user_id, limit, after)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not rows:
+            return {"memories": [], "next_cursor": None}
+
+        fetched = await asyncio.to_thread(
+            collection.get, ids=[mid for mid, _ in rows], include=["documents", "metadatas"]
+        )
+        by_id = {
+            mid: {"id": mid, "text": doc, "metadata": meta or {}}
+            for mid, doc, meta in zip(fetched.get("ids") or [], fetched.get("documents") or [], fetched.get("metadatas") or [])
+        }
+        memories = [by_id[mid] for mid, _ in rows if mid in by_id]  # skip rows deleted meanwhile
+
+        last_id, last_created = rows[-1]
+        return {
+            "memories": memories,
+            "next_cursor": (last_created, last_id) if has_more else None,
+        }
+
+    def _indexed_page(self, collection, user_id, limit, after) -> List[Tuple[str, float]]:
+        """limit + 1 (id, created_at) rows after the cursor, from the lexical index."""
+        # Rows indexed before created_at was kept are filled in once, from metadata
+        while True:
+            unordered = self.lexical.unordered(user_id, settings.MEMORY_ADD_BATCH_SIZE)
+            if not unordered:
+                break
+            fetched = collection.get(ids=unordered, include=["metadatas"])
+            created = {
+                mid: float((meta or {}).get("created_at") or 0)
+                for mid, meta in zip(fetched.get("ids") or [], fetched.get("metadatas") or [])
+            }
+            # IDs gone from the store sort first and are skipped when loaded
+            self.lexical.set_created_at([(mid, created.get(mid, 0.0)) for mid in unordered])
+
+        return self.lexical.page(user_id, limit + 1, after)
+
+    def _scanned_page(self, collection, user_id, limit, after) -> List[Tuple[str, float]]:
+        """limit + 1 (id, created_at) rows after the cursor, by sorting the metadata."""
+        where = self._user_where(user_id, collection)
+        if after is not None and after[0] > 0:
+            # Memories without created_at sort first (as 0), so they are
+            # only ever on pages before a positive cursor
+            since = {"created_at": {"$gte": after[0]}}
+            where = {"$and": [where, since]} if where else since
+
+        candidates = collection.get(where=where, include=["metadatas"])
+        rows = sorted(
+            (float((meta or {}).get("created_at") or 0), mid)
+            for mid, meta in zip(candidates.get("ids") or [], candidates.get("metadatas") or [])
+        )
+        if after is not None:
+            rows = [row for row in rows if row > (float(after[0]), after[1])]
+        return [(mid, created) for created, mid in rows[:limit + 1]]
+
+    async def iter_memories(self, user_id: str, page_size: int = 500, after: Optional[Tuple[float, str]] = None):
+        """Async generator over every memory of user_id in (created_at, id) order, one page at a time."""
+        while True:
+            page = await self.recall_page(user_id, limit=page_size, after=after)
+            for mem in page["memories"]:
+                yield mem
+            after = page["next_cursor"]
+            if after is None:
+                return
+
+    # ---------------------------------------------------------
+    # Users with stored memories
+    # ---------------------------------------------------------
+    async def list_user_ids(self, after: Optional[str] = None, limit: int = 100) -> List[str]:
+        """
+        Distinct user_ids that have memories, in sorted order, starting
+        after `after`. Read from the lexical index; without it, every
+        collection's metadata is scanned.
+        """
+        if self.lexical is not None:
+            return await asyncio.to_thread(self.lexical.user_ids, after, limit)
+        return await asyncio.to_thread(self._scan_user_ids, after, limit)
+
+    def _scan_user_ids(self, after: Optional[str], limit: int) -> List[str]:
+        users = set()
+        if settings.MEMORY_INDEX_BACKEND == "numpy":
+            users.update(index.user_id for index in iter_numpy_indexes() if index.count())
+
+        page_size = get_chroma_client().get_max_batch_size()
+        for name in list_memory_collection_names():
+            col = find_collection(name)
+            if col is None:
+                continue
+            offset = 0
+            while True:
+                page = col.get(limit=page_size, offset=offset, include=["metadatas"])
+                metas = page.get("metadatas") or []
+                if not metas:
+                    break
+                users.update((meta or {}).get("user_id") for meta in metas)
+                offset += len(metas)
+
+        users.discard(None)
+        return sorted(u for u in users if u > (after or ""))[:limit]
+
     # ---------------------------------------------------------
     # Update memory (text or metadata)
     # ---------------------------------------------------------
-    def update_memory(
+    async def update_memory(
         self,
         memory_id: str,
         new_text: Optional[str] = None,
         new_metadata: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
     ) -> None:
+        """
+        Pass user_id when known: with partitioning enabled it avoids
+        searching every collection for memory_id.
+        """
+        token_count = None
+        if new_text is not None:
+            # Tokenized in a worker thread (the first call may load the tokenizer)
+            token_count = (await asyncio.to_thread(count_tokens_many, [new_text]))[0]
+        await asyncio.to_thread(self._update_memory, memory_id, new_text, new_metadata, user_id, token_count)
 
-        existing = self.collection.get(ids=[memory_id])
+    def _update_memory(
+        self,
+        memory_id: str,
+        new_text: Optional[str],
+        new_metadata: Optional[Dict[str, Any]],
+        user_id: Optional[str],
+        token_count: Optional[int] = None,
+    ) -> None:
+
+        collection = self._locate(memory_id, user_id)
+        if collection is None:
+            return
+
+        existing = collection.get(ids=[memory_id])
         if not existing.get("ids"):
             return
 
@@ -157,6 +712,9 @@ class MemoryEngine:
         updated_meta = dict(old_meta)
         if new_metadata:
             updated_meta.update(new_metadata)
+        if token_count is not None:
+            updated_meta["token_count"] = token_count
+            updated_meta["token_counter"] = token_counter_id()
 
         # preserve created_at
         if "created_at" not in updated_meta:
@@ -164,14 +722,52 @@ class MemoryEngine:
 
         updated_meta["updated_at"] = time.time()  # new field
 
-        self.collection.update(
+        collection.update(
             ids=[memory_id],
             documents=[updated_doc],
             metadatas=[updated_meta],
         )
 
+        if self.lexical is not None and new_text is not None:
+            self.lexical.update(memory_id, new_text)
+        if self.lexical is not None and new_metadata and "created_at" in new_metadata:
+            self.lexical.set_created_at([(memory_id, float(updated_meta["created_at"] or 0))])
+
+        self._invalidate(old_meta.get("user_id", user_id))
+
     # ---------------------------------------------------------
     # Delete memory
     # ---------------------------------------------------------
-    def delete_memory(self, memory_id: str) -> None:
-        self.collection.delete(ids=[memory_id])
+    async def delete_memory(self, memory_id: str, user_id: Optional[str] = None) -> None:
+        await asyncio.to_thread(self._delete_memory, memory_id, user_id)
+
+    def _delete_memory(self, memory_id: str, user_id: Optional[str]) -> None:
+        user_id = user_id or self._owner(memory_id)
+        collection = self._locate(memory_id, user_id)
+        if collection is not None:
+            collection.delete(ids=[memory_id])
+
+        if self.lexical is not None:
+            self.lexical.delete([memory_id])
+
+        self._invalidate(user_id)
+        forget_usage(user_id)
+
+    # ---------------------------------------------------------
+    # Batch delete (one collection call)
+    # ---------------------------------------------------------
+    async def delete_memories(self, user_id: str, memory_ids: List[str]) -> None:
+        if not memory_ids:
+            return
+        await asyncio.to_thread(self._delete_memories, user_id, memory_ids)
+
+    def _delete_memories(self, user_id: str, memory_ids: List[str]) -> None:
+        collection = self._collection(user_id, create=False)
+        if collection is not None:
+            collection.delete(ids=list(memory_ids))
+
+        if self.lexical is not None:
+            self.lexical.delete(list(memory_ids))
+
+        self._invalidate(user_id)
+        forget_usage(user_id)
@@ -1,7 +1,16 @@
-import json
+import asyncio
 import logging
-import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any
+
+from app.core.settings import settings
+from app.services.memory.quota import get_quota_manager
+from app.utils.json_utils import parse_llm_json
+
+# Write-path counters (exposed on /metrics)
+write_stats: Dict[str, int] = {
+    "inserted": 0,
+    "merged": 0,
+}
 
 
 class MemoryWriteDecision:
@@ -22,6 +31,8 @@ class MemoryWriter:
     - Importance clamping
     - Automatic retry for bad LLM output
     - Clean fallback logic
+    - Semantic dedup: near-duplicates are merged into the
+      existing memory instead of stored again
     """
 
     ALLOWED_TYPES = {
@@ -33,9 +44,13 @@ class MemoryWriter:
         "irrelevant"
     }
 
+    # Messages longer than this are stored as a summary
+    SUMMARY_MIN_WORDS = 30
+
     def __init__(self, memory_engine, llm_service):
         self.memory_engine = memory_engine
         self.llm = llm_service
+        self.quota = get_quota_manager()
 
         self.noise_words = {
             "ok", "k", "kk", "lol", "yes", "no", "hmm", "thanks",
@@ -60,36 +75,10 @@ class MemoryWriter:
 
         return False
 
-    # ===============================================================
-    # Robust JSON parsing with extraction + retry + fallback
-    # ===============================================================
-    def _safe_parse_json(self, text: str) -> Optional[Dict[str, Any]]:
-        if not text:
-            return None
-
-        text = text.strip()
-
-        # Try direct JSON
-        try:
-            return json.loads(text)
-        except:
-            pass
-
-        # Try extracting JSON object from text
-        match = re.search(r"\{[\s\S]*\}", text)
-        if match:
-            candidate = match.group(0)
-            try:
-                return json.loads(candidate)
-            except:
-                return None
-
-        return None
-
     # ===============================================================
     # LLM Classification — JSON robust version
     # ===============================================================
-    def classify_and_score(self, text: str) -> Dict[str, Any]:
+    async def classify_and_score(self, text: str) -> Dict[str, Any]:
         prompt = f"""
 Classify the user's message into one of these types:
 - personal_info
@@ -112,8 +101,8 @@ Message:
 """
 
         # Try first attempt
-        response = self.llm.generate_reply([], prompt)
-        data = self._safe_parse_json(response)
+        response = await self.llm.generate_reply([], prompt)
+        data = parse_llm_json(response)
 
         # Retry with stronger prompt if bad JSON
         if data is None:
@@ -123,8 +112,8 @@ Return ONLY this JSON structure with no extra text:
 
 Message: \"{text}\"
 """
-            retry_response = self.llm.generate_reply([], retry_prompt)
-            data = self._safe_parse_json(retry_response)
+            retry_response = await self.llm.generate_reply([], retry_prompt)
+            data = parse_llm_json(retry_response)
 
         # Final fallback
         if data is None:
@@ -152,10 +141,10 @@ Message: \"{text}\"
     # ===============================================================
     # Summarization
     # ===============================================================
-    def summarize(self, text: str) -> str:
+    async def summarize(self, text: str) -> str:
         # Protect against LLM returning empty or None
         try:
-            summary = self.llm.summarize(text, max_tokens=40)
+            summary = await self.llm.summarize(text, max_tokens=40)
             return summary.strip() if summary else text[:200]
         except Exception:
             logging.warning("MemoryWriter: summarization failed → fallback to truncated text")
@@ -164,7 +153,11 @@ Message: \"{text}\"
     # ===============================================================
     # Main Decision Logic
     # ===============================================================
-    def decide(self, user_id: str, session_id: str, role: str, text: str):
+    async def decide(self, user_id: str, session_id: str, role: str, text: str, analysis=None):
+        """
+        If a MessageAnalysis is given, its type/importance/summary are
+        used directly and no classification LLM call is made.
+        """
         if role != "user":
             return MemoryWriteDecision("ignore", "assistant/system messages ignored")
 
@@ -172,16 +165,23 @@ Message: \"{text}\"
             return MemoryWriteDecision("ignore", "noise/too uninformative")
 
         # Classification (type + importance)
-        result = self.classify_and_score(text)
-        mem_type = result["type"]
-        importance = result["importance"]
+        if analysis is not None:
+            mem_type = analysis.memory_type
+            importance = analysis.importance
+        else:
+            result = await self.classify_and_score(text)
+            mem_type = result["type"]
+            importance = result["importance"]
 
         if mem_type == "irrelevant":
             return MemoryWriteDecision("ignore", "classified irrelevant")
 
         # Summarize long messages
-        if len(text.split()) > 30:
-            summary = self.summarize(text)
+        if len(text.split()) > self.SUMMARY_MIN_WORDS:
+            if analysis is not None and analysis.summary:
+                summary = analysis.summary
+            else:
+                summary = await self.summarize(text)
             return MemoryWriteDecision(
                 action="compress_store",
                 reason="long message summarized",
@@ -201,20 +201,119 @@ Message: \"{text}\"
     # ===============================================================
     # Execute Write
     # ===============================================================
-    def execute(self, decision: MemoryWriteDecision, user_id, session_id, text):
-        if decision.action == "ignore":
-            return None
+    async def execute(self, decision: MemoryWriteDecision, user_id, session_id, text, embedding=None):
+        """
+        `embedding` is the precomputed vector of `text`; it is only
+        reused when the original text (not a summary) is stored.
+        """
+        ids = await self.execute_many(user_id, session_id, [(decision, text, embedding)])
+        return ids[0] if ids else None
 
-        content = decision.summary if decision.action == "compress_store" else text
+    # ===============================================================
+    # Execute several writes with one batched add
+    # ===============================================================
+    async def execute_many(self, user_id, session_id, writes):
+        """
+        writes: list of (decision, text, embedding-or-None).
+        Ignored decisions are skipped; returns the stored memory IDs
+        in input order (the existing ID for merged duplicates).
+        """
+        items = []
+        for decision, text, embedding in writes:
+            if decision.action == "ignore":
+                continue
+
+            if decision.action == "compress_store":
+                content = decision.summary
+                embedding = None  # the summary needs its own vector
+            else:
+                content = text
+
+            items.append({
+                "user_id": user_id,
+                "session_id": session_id,
+                "text": content,
+                "memory_type": decision.memory_type,
+                "metadata": {"importance": decision.importance},
+                "embedding": embedding,
+            })
+
+        if not items:
+            return []
 
         try:
-            return self.memory_engine.add_memory(
-                user_id=user_id,
-                session_id=session_id,
-                text=content,
-                memory_type=decision.memory_type,
-                metadata={"importance": decision.importance}
-            )
+            if not settings.MEMORY_DEDUP_ENABLED:
+                ids = await self.memory_engine.add_memories(items)
+                write_stats["inserted"] += len(ids)
+                await self.quota.record_inserts(user_id, [item["memory_type"] for item in items])
+                return ids
+            return await self._dedup_and_write(user_id, items)
         except Exception as e:
             logging.error(f"MemoryWriter: Failed to write memory → {e}")
-            return None
+            return []
+
+    # ===============================================================
+    # Semantic dedup: merge near-duplicates, insert the rest
+    # ===============================================================
+    async def _dedup_and_write(self, user_id, items):
+        # The duplicate check needs every vector up front
+        missing = [i for i, item in enumerate(items) if item["embedding"] is None]
+        if missing:
+            vectors = await self.memory_engine.embed_many([items[i]["text"] for i in missing])
+            for i, vec in zip(missing, vectors):
+                items[i]["embedding"] = vec
+
+        matches = await asyncio.gather(*(
+            self.memory_engine.find_similar(
+                user_id,
+                item["embedding"],
+                item["memory_type"],
+                settings.MEMORY_DEDUP_MAX_DISTANCE,
+            )
+            for item in items
+        ))
+
+        ids = [None] * len(items)
+        inserts = []
+        for i, (item, match) in enumerate(zip(items, matches)):
+            if match is None:
+                inserts.append(i)
+                continue
+
+            await self._merge(user_id, match, item)
+            ids[i] = match["id"]
+
+        if inserts:
+            new_ids = await self.memory_engine.add_memories([items[i] for i in inserts])
+            for i, mid in zip(inserts, new_ids):
+                ids[i] = mid
+
+        write_stats["merged"] += len(items) - len(inserts)
+        write_stats["inserted"] += len(inserts)
+
+        await self.quota.record_inserts(user_id, [items[i]["memory_type"] for i in inserts])
+        return ids
+
+    async def _merge(self, user_id, existing, item):
+        """Reinforce the existing memory: bump importance (updated_at is set by update_memory)."""
+        meta = existing["metadata"]
+        try:
+            old_importance = float(meta.get("importance", 0.4))
+        except (TypeError, ValueError):
+            old_importance = 0.4
+        new_importance = item["metadata"].get("importance") or 0.0
+
+        importance = min(1.0, max(old_importance, new_importance) + settings.MEMORY_DEDUP_IMPORTANCE_BOOST)
+
+        await self.memory_engine.update_memory(
+            existing["id"],
+            new_metadata={
+                "importance": importance,
+                "merge_count": int(meta.get("merge_count", 0)) + 1,
+            },
+            user_id=user_id,
+        )
+        logging.debug(
+            f"MemoryWriter: merged into {existing['id']} "
+            f"(distance={existing['distance']:.3f}, importance={importance:.2f})"
+        )
@@ -0,0 +1,645 @@
+# app/services/memory/numpy_index.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking (single process only)
+    fcntl = None
+
+from app.core.service_loader import find_user_collection, get_chroma_client, get_user_collection
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.path.join(settings.DATA_DIR, "vector_index")
+
+VECTORS_FILE = "vectors.f32"  # generation 0; rewrites go to vectors.<gen>.f32
+META_FILE = "meta.json"
+PROMOTED_MARKER = "promoted"
+LOCK_FILE = "lock"
+LOG_MIN_ROWS = 256  # writes are logged until the log outgrows max(this, row count)
+
+
+# ---------------------------------------------------------
+# Chroma-style `where` filter evaluation
+# ---------------------------------------------------------
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+def matches_where(meta: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    if not where:
+        return True
+
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(meta, sub) for sub in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(meta, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, operand in cond.items():
+                if not _OPERATORS[op](value, operand):
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+class NumpyCollection:
+    """
+    Exact-search memory index for ONE user, exposing the subset of the
+    Chroma Collection API that MemoryEngine uses (add / upsert / query /
+    get / update / delete / count), so it can stand in for a collection.
+
+    - Vectors: contiguous float32 matrix, memory-mapped from vectors.f32
+    - Metadata: meta.json snapshot (ids, documents, metadatas) plus an
+      append-only meta.<epoch>.log of the adds made since that snapshot
+    - Top-k: one matmul + argpartition (cosine distance, like Chroma)
+
+    meta.json and its log are the commit point: the snapshot names the
+    vector file and the log, and only their rows count. add() appends
+    vectors, then one log line (orphan rows and a torn last line left by
+    a crash are dropped on load); metadata-only updates are logged the
+    same way. The log is folded into a new snapshot once it holds as
+    many rows as the index, so these writes cost O(batch) amortized.
+    Vector updates and delete() write a new vector file generation and
+    switch to it in the snapshot rename.
+
+    Every call holds an flock on the index directory (shared for reads,
+    exclusive for writes), so CLIs can write while the server runs: a
+    handle reloads when another process changed the files, and forwards
+    to the user's Chroma collection once any process promoted the user.
+    """
+
+    def __init__(self, user_id: str, path: str) -> None:
+        self.user_id = user_id
+        self.path = path
+        self.promoted = False
+        self._lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self._lock_depth = 0
+
+        self._reset()
+        with self._locked(exclusive=False):
+            pass  # first load (and crash recovery) under the directory lock
+
+    def _reset(self) -> None:
+        self._ids: List[str] = []
+        self._docs: List[Optional[str]] = []
+        self._metas: List[Dict[str, Any]] = []
+        self._row: Dict[str, int] = {}
+        self._dim = 0
+        self._generation = 0
+        self._epoch = 0
+        self._log_rows = 0
+        self._stamp = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._norm_buf = np.zeros(0, dtype=np.float32)
+        self._norms = self._norm_buf
+
+    # ---------------------------------------------------------
+    # Cross-process locking
+    # ---------------------------------------------------------
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Thread lock + directory flock; picks up changes made by other processes."""
+        with self._lock:
+            outer = self._lock_depth == 0
+            if outer:
+                self._flock(exclusive)
+            self._lock_depth += 1
+            try:
+                if outer:
+                    self._sync()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if outer and self._lock_fd is not None and fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _flock(self, exclusive: bool) -> None:
+        if fcntl is None:
+            return
+        if self._lock_fd is None:
+            if not exclusive and not os.path.isdir(self.path):
+                return  # nothing stored yet; reads create nothing
+            os.makedirs(self.path, exist_ok=True)
+            self._lock_fd = os.open(os.path.join(self.path, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _disk_stamp(self):
+        stamp = []
+        for path in (self._meta_path, self._log_path):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                stamp.append(None)
+                continue
+            stamp.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _sync(self) -> None:
+        if self.promoted:
+            return
+        if os.path.exists(os.path.join(self.path, PROMOTED_MARKER)):
+            self._reset()
+            self.promoted = True  # promoted by another process
+            return
+        if self._stamp is None or self._disk_stamp() != self._stamp:
+            self._load()
+
+    # ---------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------
+    def _vectors_file(self, generation: int) -> str:
+        name = VECTORS_FILE if generation == 0 else f"vectors.{generation}.f32"
+        return os.path.join(self.path, name)
+
+    @property
+    def _vectors_path(self) -> str:
+        return self._vectors_file(self._generation)
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, META_FILE)
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.path, f"meta.{self._epoch}.log")
+
+    def _load(self) -> None:
+        self._reset()
+        if not os.path.exists(self._meta_path):
+            self._stamp = self._disk_stamp()
+            return
+
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self._ids = meta["ids"]
+        self._docs = meta["documents"]
+        self._metas = meta["metadatas"]
+        self._dim = meta["dim"]
+        self._generation = meta.get("generation", 0)
+        self._epoch = meta.get("epoch", 0)
+        self._row = {mid: i for i, mid in enumerate(self._ids)}
+        self._replay_log()
+        self._recover_files()
+        self._map_vectors()
+        self._stamp = self._disk_stamp()
+
+    def _replay_log(self) -> None:
+        if not os.path.exists(self._log_path):
+            return
+
+        good = 0
+        with open(self._log_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last line: its add never committed
+                entry = json.loads(line)
+                for mid, doc, meta in zip(entry["ids"], entry["documents"], entry["metadatas"]):
+                    row = self._row.get(mid)
+                    if row is None:
+                        self._row[mid] = len(self._ids)
+                        self._ids.append(mid)
+                        self._docs.append(doc)
+                        self._metas.append(meta)
+                    else:
+                        self._docs[row] = doc
+                        self._metas[row] = meta
+                self._log_rows += len(entry["ids"])
+                good += len(line)
+
+        if good < os.path.getsize(self._log_path):
+            with open(self._log_path, "r+b") as f:
+                f.truncate(good)
+
+    def _recover_files(self) -> None:
+        """Undo what a crash between a vector / log write and the snapshot left behind."""
+        keep = {self._vectors_path, self._log_path}
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            stale_vectors = name.startswith("vectors.")
+            stale_meta = name.startswith("meta.") and name != META_FILE
+            if (stale_vectors or stale_meta) and path not in keep:
+                os.remove(path)  # uncommitted generation, old log or .tmp file
+
+        current = self._vectors_path
+        expected = len(self._ids) * self._dim * 4
+        if os.path.exists(current) and os.path.getsize(current) > expected:
+            logger.warning(
+                "NumpyIndex: truncating %d orphan bytes for user %s",
+                os.path.getsize(current) - expected, self.user_id,
+            )
+            with open(current, "r+b") as f:
+                f.truncate(expected)
+
+    def _map_vectors(self, new_rows: Optional[np.ndarray] = None) -> None:
+        """Re-map the vector file; new_rows (just appended) extend the norms instead of recomputing them."""
+        if not self._ids:
+            self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+        else:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r",
+                shape=(len(self._ids), self._dim),
+            )
+
+        n = len(self._ids)
+        if new_rows is None:
+            self._norm_buf = np.linalg.norm(self._vectors, axis=1).astype(np.float32) if n else np.zeros(0, np.float32)
+        else:
+            start = n - len(new_rows)
+            if len(self._norm_buf) < n:
+                # Grow by doubling so appends stay amortized O(batch)
+                buf = np.empty(max(n, 2 * len(self._norm_buf)), dtype=np.float32)
+                buf[:start] = self._norm_buf[:start]
+                self._norm_buf = buf
+            self._norm_buf[start:n] = np.linalg.norm(new_rows, axis=1)
+        self._norms = self._norm_buf[:n]
+
+    def _save_meta(self) -> None:
+        """Write a full snapshot; it starts a new, empty log."""
+        old_log = self._log_path
+        self._epoch += 1
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "user_id": self.user_id,
+                "dim": self._dim,
+                "generation": self._generation,
+                "epoch": self._epoch,
+                "ids": self._ids,
+                "documents": self._docs,
+                "metadatas": self._metas,
+            }, f)
+        os.replace(tmp, self._meta_path)
+        self._log_rows = 0
+        if os.path.exists(old_log):
+            os.remove(old_log)
+
+    def _append_meta(self, ids, documents, metadatas) -> None:
+        """
+        Commit added / re-written rows (full documents and metadatas):
+        one log line, or a snapshot once the log is as long as it.
+        """
+        if not os.path.exists(self._meta_path) or self._log_rows >= max(len(self._ids), LOG_MIN_ROWS):
+            self._save_meta()
+            return
+
+        line = json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas})
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        self._log_rows += len(ids)
+
+    def _commit_vectors(self, matrix: np.ndarray) -> None:
+        """Write `matrix` as the next generation and commit it with the meta."""
+        old_path = self._vectors_path
+        self._generation += 1
+        np.ascontiguousarray(matrix, dtype=np.float32).tofile(self._vectors_path)
+
+        self._save_meta()
+        self._vectors = np.zeros((0, self._dim), dtype=np.float32)  # release the old mmap
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+    # ---------------------------------------------------------
+    # After promotion: forward to the user's Chroma collection
+    # ---------------------------------------------------------
+    def _ann_where(self, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # Callers pass no user filter to a NumPy index; shared collections need one
+        if settings.MEMORY_PARTITION_MODE == "per_user":
+            return where or None
+        own = {"user_id": self.user_id}
+        return {"$and": [own, where]} if where else own
+
+    # ---------------------------------------------------------
+    # Chroma-compatible API
+    # ---------------------------------------------------------
+    def count(self) -> int:
+        with self._locked(exclusive=False):
+            if self.promoted:
+                return len(self.get(include=[])["ids"])
+            return len(self._ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        with self._locked(exclusive=False):
+            if self.promoted:
+                return bool(self.get(ids=[memory_id], include=[])["ids"])
+            return memory_id in self._row
+
+    def add(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        with self._locked(exclusive=True):
+            if self.promoted:
+                # Lost a race with promote(): write straight to Chroma
+                get_user_collection(self.user_id).add(
+                    ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+                )
+                return
+
+            new = [i for i, mid in enumerate(ids) if mid not in self._row]
+            if not new:
+                return
+
+            matrix = np.asarray([embeddings[i] for i in new], dtype=np.float32)
+            if not self._dim:
+                self._dim = matrix.shape[1]
+
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(matrix).tobytes())
+
+            new_ids = [ids[i] for i in new]
+            new_docs = [documents[i] if documents is not None else None for i in new]
+            new_metas = [dict(metadatas[i]) if metadatas is not None else {} for i in new]
+            for mid, doc, meta in zip(new_ids, new_docs, new_metas):
+                self._row[mid] = len(self._ids)
+                self._ids.append(mid)
+                self._docs.append(doc)
+                self._metas.append(meta)
+
+            self._append_meta(new_ids, new_docs, new_metas)
+            self._map_vectors(new_rows=matrix)
+            self._stamp = self._disk_stamp()
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        with self._locked(exclusive=True):
+            if self.promoted:
+                get_user_collection(self.user_id).upsert(
+                    ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+                )
+                return
+
+            existing = [i for i, mid in enumerate(ids) if mid in self._row]
+            if existing:
+                self.update(
+                    ids=[ids[i] for i in existing],
+                    embeddings=[embeddings[i] for i in existing],
+                    documents=[documents[i] for i in existing] if documents is not None else None,
+                    metadatas=[metadatas[i] for i in existing] if metadatas is not None else None,
+                )
+            self.add(ids, embeddings, documents, metadatas)
+
+    def update(self, ids, documents=None, metadatas=None, embeddings=None) -> None:
+        with self._locked(exclusive=True):
+            if self.promoted:
+                fields = {"documents": documents, "metadatas": metadatas, "embeddings": embeddings}
+                get_user_collection(self.user_id).update(
+                    ids=ids, **{k: v for k, v in fields.items() if v is not None}
+                )
+                return
+
+            rows = [(i, self._row[mid]) for i, mid in enumerate(ids) if mid in self._row]
+            if not rows:
+                return
+
+            for i, row in rows:
+                if documents is not None:
+                    self._docs[row] = documents[i]
+                if metadatas is not None:
+                    self._metas[row] = dict(metadatas[i])
+
+            if embeddings is not None:
+                matrix = np.array(self._vectors, dtype=np.float32)
+                for i, row in rows:
+                    matrix[row] = np.asarray(embeddings[i], dtype=np.float32)
+                self._commit_vectors(matrix)
+                self._map_vectors()
+            else:
+                # Text / metadata only: logged like an add, replayed over the row
+                changed = [row for _, row in rows]
+                self._append_meta(
+                    [self._ids[r] for r in changed],
+                    [self._docs[r] for r in changed],
+                    [self._metas[r] for r in changed],
+                )
+            self._stamp = self._disk_stamp()
+
+    def delete(self, ids=None, where=None) -> None:
+        with self._locked(exclusive=True):
+            if self.promoted:
+                if ids is not None or where is not None:
+                    get_user_collection(self.user_id).delete(
+                        ids=ids, where=self._ann_where(where) if where is not None else None
+                    )
+                return
+
+            drop = set()
+            if ids is not None:
+                drop |= {self._row[mid] for mid in ids if mid in self._row}
+            if where is not None:
+                drop |= {row for row, meta in enumerate(self._metas) if matches_where(meta, where)}
+            if not drop:
+                return
+
+            keep = [row for row in range(len(self._ids)) if row not in drop]
+            matrix = np.asarray(self._vectors)[keep] if keep else np.zeros((0, self._dim), np.float32)
+
+            self._ids = [self._ids[r] for r in keep]
+            self._docs = [self._docs[r] for r in keep]
+            self._metas = [self._metas[r] for r in keep]
+            self._row = {mid: i for i, mid in enumerate(self._ids)}
+
+            self._commit_vectors(matrix)
+            self._map_vectors()
+            self._stamp = self._disk_stamp()
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("metadatas", "documents")):
+        with self._locked(exclusive=False):
+            if self.promoted:
+                return get_user_collection(self.user_id).get(
+                    ids=ids, where=self._ann_where(where), limit=limit, offset=offset, include=list(include)
+                )
+
+            if ids is not None:
+                rows = [self._row[mid] for mid in ids if mid in self._row]
+            else:
+                rows = range(len(self._ids))
+            if where:
+                rows = [r for r in rows if matches_where(self._metas[r], where)]
+            rows = rows[offset or 0:]  # slices the range itself: no per-page list of every row
+            if limit is not None:
+                rows = rows[:limit]
+
+            return self._result(rows, include)
+
+    def query(self, query_embeddings, n_results=10, where=None,
+              include=("metadatas", "documents", "distances")):
+        with self._locked(exclusive=False):
+            if self.promoted:
+                return get_user_collection(self.user_id).query(
+                    query_embeddings=query_embeddings, n_results=n_results,
+                    where=self._ann_where(where), include=list(include),
+                )
+
+            out = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+            candidates = None
+            if where:
+                candidates = np.fromiter(
+                    (r for r, meta in enumerate(self._metas) if matches_where(meta, where)),
+                    dtype=np.int64,
+                )
+
+            for qvec in query_embeddings:
+                rows, dists = self._top_k(np.asarray(qvec, dtype=np.float32), n_results, candidates)
+                res = self._result(rows, include)
+                for key in ("ids", "documents", "metadatas", "embeddings"):
+                    out[key].append(res.get(key))
+                out["distances"].append(dists)
+
+            return {k: v for k, v in out.items() if k == "ids" or k in include}
+
+    # ---------------------------------------------------------
+    # Exact top-k
+    # ---------------------------------------------------------
+    def _top_k(self, qvec: np.ndarray, k: int, candidates: Optional[np.ndarray]):
+        if not self._ids or (candidates is not None and not len(candidates)):
+            return [], []
+
+        matrix = self._vectors if candidates is None else self._vectors[candidates]
+        norms = self._norms if candidates is None else self._norms[candidates]
+
+        qnorm = float(np.linalg.norm(qvec)) or 1.0
+        sims = (matrix @ qvec) / (np.maximum(norms, 1e-12) * qnorm)
+
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+
+        rows = top if candidates is None else candidates[top]
+        return rows.tolist(), (1.0 - sims[top]).tolist()
+
+    def _result(self, rows, include) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"ids": [self._ids[r] for r in rows]}
+        if "documents" in include:
+            result["documents"] = [self._docs[r] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [dict(self._metas[r]) for r in rows]
+        if "embeddings" in include:
+            result["embeddings"] = np.array(self._vectors[list(rows)], dtype=np.float32)
+        return result
+
+    # ---------------------------------------------------------
+    # Promotion to the ANN (Chroma) index
+    # ---------------------------------------------------------
+    def promote(self) -> int:
+        """Move every memory into the user's Chroma collection."""
+        with self._locked(exclusive=True):
+            if self.promoted:
+                return 0
+
+            collection = get_user_collection(self.user_id)
+            chunk = min(settings.MEMORY_ADD_BATCH_SIZE, get_chroma_client().get_max_batch_size())
+            for start in range(0, len(self._ids), chunk):
+                end = start + chunk
+                collection.upsert(
+                    ids=self._ids[start:end],
+                    documents=self._docs[start:end],
+                    metadatas=self._metas[start:end],
+                    embeddings=np.array(self._vectors[start:end], dtype=np.float32),
+                )
+
+            moved = len(self._ids)
+            self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+            # Marker first: other processes switch to Chroma on their next call.
+            # The lock file stays, so waiters keep locking the same file.
+            _mark_promoted(self.user_id)
+            for name in os.listdir(self.path):
+                if name not in (LOCK_FILE, PROMOTED_MARKER):
+                    os.remove(os.path.join(self.path, name))
+            self._reset()
+            self.promoted = True
+
+        logger.info("NumpyIndex: promoted user %s to ANN index (%d memories)", self.user_id, moved)
+        return moved
+
+
+# ---------------------------------------------------------
+# Registry
+# ---------------------------------------------------------
+def _user_dir(user_id: str) -> str:
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:24]
+    return os.path.join(INDEX_DIR, digest)
+
+
+def _mark_promoted(user_id: str) -> None:
+    path = _user_dir(user_id)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, PROMOTED_MARKER), "w", encoding="utf-8") as f:
+        f.write(user_id)
+
+
+# One open instance per user for the life of the process (other
+# processes are kept consistent by the directory flock). Not evicted (each user's index is bounded by
+# MEMORY_NUMPY_PROMOTE_THRESHOLD).
+_open_indexes: Dict[str, NumpyCollection] = {}
+_open_lock = threading.Lock()
+
+
+def _resolve(user_id: str) -> Optional[NumpyCollection]:
+    index = _open_indexes.get(user_id)
+    if index is not None:
+        return index
+
+    path = _user_dir(user_id)
+    if os.path.exists(os.path.join(path, PROMOTED_MARKER)):
+        return None
+
+    with _open_lock:
+        index = _open_indexes.get(user_id)
+        if index is not None:
+            return index
+
+        # Users that already have Chroma memories stay on the ANN index
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            where = None if settings.MEMORY_PARTITION_MODE == "per_user" else {"user_id": user_id}
+            collection = find_user_collection(user_id)
+            existing = collection.get(where=where, limit=1, include=[]) if collection else {}
+            if existing.get("ids"):
+                _mark_promoted(user_id)
+                return None
+
+        index = _open_indexes[user_id] = NumpyCollection(user_id, path)
+        return index
+
+
+def get_numpy_index(user_id: str) -> Optional[NumpyCollection]:
+    """Return user_id's exact-search index, or None once promoted to ANN."""
+    index = _resolve(user_id)
+    if index is None or index.promoted:
+        return None
+    return index
+
+
+def iter_numpy_indexes() -> Iterator[NumpyCollection]:
+    """Every user currently served from the NumPy index."""
+    if not os.path.isdir(INDEX_DIR):
+        return
+    for name in sorted(os.listdir(INDEX_DIR)):
+        meta_path = os.path.join(INDEX_DIR, name, META_FILE)
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path, "r", encoding="utf-8") as f:
+            user_id = json.load(f).get("user_id")
+        index = get_numpy_index(user_id) if user_id else None
+        if index is not None:
+            yield index
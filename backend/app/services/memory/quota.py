@@ -0,0 +1,155 @@
+# app/services/memory/quota.py
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import List, Optional
+
+from app.core.memory_audit_store import MemoryAuditStore
+from app.core.re_ranking import retention_score
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-user memory_type counts, shared process-wide and LRU-bounded
+# (MEMORY_QUOTA_TRACKED_USERS). MemoryEngine's delete / import paths
+# call forget_usage, so a user's next insert re-reads the store.
+_usage_counts: "OrderedDict[str, Counter]" = OrderedDict()
+
+
+def forget_usage(user_id: Optional[str] = None) -> None:
+    """Drop the cached counts of user_id (every user if None)."""
+    if user_id is None:
+        _usage_counts.clear()
+    else:
+        _usage_counts.pop(user_id, None)
+
+
+def _remember_usage(user_id: str, counts: Counter) -> None:
+    _usage_counts[user_id] = counts
+    _usage_counts.move_to_end(user_id)
+    while len(_usage_counts) > max(1, settings.MEMORY_QUOTA_TRACKED_USERS):
+        _usage_counts.popitem(last=False)
+
+
+class QuotaManager:
+    """
+    Per-user and per-type memory quotas (MEMORY_QUOTA_PER_USER,
+    MEMORY_QUOTA_PER_TYPE).
+
+    Inserts are counted in memory, so the store is only read when a
+    user may have crossed a quota. Enforcement evicts the memories with
+    the lowest retention_score (re_rank's recency / importance / type
+    terms) down to quota - MEMORY_EVICTION_BATCH_SIZE, deletes them in
+    batches and records each one in the audit table.
+    """
+
+    def __init__(self, memory_engine):
+        self.memory_engine = memory_engine
+        self.audit = MemoryAuditStore()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.MEMORY_QUOTA_PER_USER or settings.MEMORY_QUOTA_PER_TYPE)
+
+    # ---------------------------------------------------------
+    # Usage
+    # ---------------------------------------------------------
+    async def usage(self, user_id: str) -> Counter:
+        """Memory count per memory_type for user_id (read from the store's metadata)."""
+        return Counter(await self.memory_engine.count_by_type(user_id))
+
+    def over_quota(self, counts: Counter) -> bool:
+        user_quota = settings.MEMORY_QUOTA_PER_USER
+        if user_quota and sum(counts.values()) > user_quota:
+            return True
+        return any(
+            cap and counts.get(mtype, 0) > cap
+            for mtype, cap in settings.MEMORY_QUOTA_PER_TYPE.items()
+        )
+
+    # ---------------------------------------------------------
+    # Write hook (called after memories are inserted)
+    # ---------------------------------------------------------
+    async def record_inserts(self, user_id: str, memory_types: List[str]) -> None:
+        if not self.enabled or not memory_types:
+            return
+
+        try:
+            counts = _usage_counts.get(user_id)
+            if counts is None:
+                counts = await self.usage(user_id)
+            else:
+                counts.update(memory_types)
+            _remember_usage(user_id, counts)
+
+            if self.over_quota(counts):
+                await self.enforce(user_id)
+        except Exception as e:
+            logger.warning(f"QuotaManager: enforcement failed for {user_id} → {e}")
+
+    # ---------------------------------------------------------
+    # Eviction
+    # ---------------------------------------------------------
+    async def enforce(self, user_id: str) -> List[str]:
+        """Evict lowest-value memories until user_id is within quota."""
+        async with self._lock:
+            memories = await self.memory_engine.recall(user_id, limit=None)
+            victims = self._select_victims(memories)
+
+            batch = max(1, settings.MEMORY_EVICTION_BATCH_SIZE)
+            for start in range(0, len(victims), batch):
+                part = victims[start:start + batch]
+                await self.memory_engine.delete_memories(user_id, [mem["id"] for mem, _, _ in part])
+                await self.audit.log_evictions(user_id, [
+                    (mem["id"], mem["metadata"].get("memory_type", "fact"), score, reason, mem["text"])
+                    for mem, score, reason in part
+                ])
+
+            evicted = {mem["id"] for mem, _, _ in victims}
+            _remember_usage(user_id, Counter(
+                m["metadata"].get("memory_type", "fact") for m in memories if m["id"] not in evicted
+            ))
+
+        if victims:
+            logger.info(f"QuotaManager: evicted {len(victims)} memories for {user_id}")
+        return [mem["id"] for mem, _, _ in victims]
+
+    def _select_victims(self, memories):
+        """(memory, retention_score, reason) to evict, lowest score first."""
+        batch = settings.MEMORY_EVICTION_BATCH_SIZE
+        scored = sorted(
+            ((mem, retention_score(mem["metadata"])) for mem in memories),
+            key=lambda pair: pair[1],
+        )
+
+        victims = []
+        chosen = set()
+
+        # Per-type quotas first
+        for mtype, cap in settings.MEMORY_QUOTA_PER_TYPE.items():
+            of_type = [(m, s) for m, s in scored if m["metadata"].get("memory_type", "fact") == mtype]
+            if not cap or len(of_type) <= cap:
+                continue
+            for mem, score in of_type[:len(of_type) - max(0, cap - batch)]:
+                victims.append((mem, score, f"type_quota:{mtype}"))
+                chosen.add(mem["id"])
+
+        # Then the overall per-user quota
+        user_quota = settings.MEMORY_QUOTA_PER_USER
+        remaining = [(m, s) for m, s in scored if m["id"] not in chosen]
+        if user_quota and len(remaining) > user_quota:
+            for mem, score in remaining[:len(remaining) - max(0, user_quota - batch)]:
+                victims.append((mem, score, "user_quota"))
+
+        return victims
+
+
+@lru_cache
+def get_quota_manager() -> QuotaManager:
+    """Return the SINGLE quota manager (shared by MemoryWriter and the admin API)."""
+    from app.services.memory.memory_engine import MemoryEngine
+
+    return QuotaManager(MemoryEngine())
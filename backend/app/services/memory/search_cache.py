@@ -0,0 +1,226 @@
+# app/services/memory/search_cache.py
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.embedding.cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+RETIRED_STAMP = "retired.stamp"
+STAMP_MAX_IDLE_SECONDS = 3600  # untouched PID stamps are folded into RETIRED_STAMP
+
+
+class SearchResultCache:
+    """
+    Per-user cache of search_memory results.
+
+    Key = (user_id, user's version, k, embeddings included?, normalized
+    query text — or the query embedding when there is no text).
+    MemoryEngine bumps a user's version on every add / update / delete,
+    so entries written before a change can never be served after it;
+    they just age out of the LRU.
+
+    Versions live in this process only. Other processes writing memories
+    (the consolidate / snapshot / migrate_partitions CLIs, other server
+    workers) are picked up through stamp_dir: every bump touches this
+    process's stamp file, and get() drops everything when another
+    process's stamp has moved (checked at most every
+    stamp_check_seconds). ttl_seconds caps an entry's age in any case.
+
+    A stamp is only ever removed after folding its mtime into
+    retired.stamp (close() at shutdown; idle stamps of exited or crashed
+    processes during the periodic scan), so the directory stays bounded
+    without hiding a write from processes that have not checked yet.
+    Per-user versions are capped at max_versions users: past that they
+    restart under a new epoch, which invalidates every entry.
+
+    - Bounded LRU (max_entries)
+    - Thread-safe: versions are bumped from MemoryEngine's worker threads
+    - Hit/miss statistics
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: float = 0,
+        stamp_dir: Optional[str] = None,
+        stamp_check_seconds: float = 1.0,
+        max_versions: int = 100_000,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_versions = max(1, max_versions)
+        self.ttl = ttl_seconds
+        self.stamp_dir = stamp_dir
+        self.stamp_check = stamp_check_seconds
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0  # bumped when the affected user is unknown
+        self._lock = threading.Lock()
+
+        self._own_stamp = None
+        self._foreign_stamp = 0
+        self._next_stamp_check = 0.0
+        if stamp_dir:
+            os.makedirs(stamp_dir, exist_ok=True)
+            self._own_stamp = os.path.join(stamp_dir, f"{os.getpid()}.stamp")
+            self._foreign_stamp = self._latest_foreign_stamp()
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    # ---------------------------------------------------------
+    # Versions
+    # ---------------------------------------------------------
+    def version(self, user_id: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> None:
+        with self._lock:
+            if user_id not in self._versions and len(self._versions) >= self.max_versions:
+                # Forgetting versions could repeat one a cached entry still has:
+                # start over under a new epoch instead
+                self._versions.clear()
+                self._entries.clear()
+                self._epoch += 1
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._invalidations += 1
+        self._touch_stamp()
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._invalidations += 1
+        self._touch_stamp()
+
+    # ---------------------------------------------------------
+    # Cross-process invalidation (stamp files)
+    # ---------------------------------------------------------
+    def _touch_stamp(self) -> None:
+        if self._own_stamp is None:
+            return
+        try:
+            with open(self._own_stamp, "a"):
+                pass
+            os.utime(self._own_stamp)
+        except OSError as e:
+            logger.warning("SearchResultCache: cannot touch %s → %s", self._own_stamp, e)
+
+    def _latest_foreign_stamp(self, prune: bool = False) -> int:
+        latest = 0
+        idle_before = time.time_ns() - STAMP_MAX_IDLE_SECONDS * 1_000_000_000
+        try:
+            with os.scandir(self.stamp_dir) as entries:
+                for entry in entries:
+                    if entry.path == self._own_stamp or not entry.name.endswith(".stamp"):
+                        continue
+                    mtime = entry.stat().st_mtime_ns
+                    latest = max(latest, mtime)
+                    if prune and entry.name != RETIRED_STAMP and mtime < idle_before:
+                        self._retire(entry.path)
+        except OSError:
+            pass
+        return latest
+
+    def _retire(self, path: str) -> None:
+        """Remove a stamp file, keeping its mtime in retired.stamp if newer."""
+        retired = os.path.join(self.stamp_dir, RETIRED_STAMP)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            try:
+                newer = os.stat(retired).st_mtime_ns < mtime
+            except FileNotFoundError:
+                open(retired, "a").close()
+                newer = True
+            if newer:
+                os.utime(retired, ns=(mtime, mtime))
+            os.remove(path)
+        except OSError as e:
+            logger.warning("SearchResultCache: cannot retire %s → %s", path, e)
+
+    def close(self) -> None:
+        """Retire this process's stamp (at shutdown)."""
+        if self._own_stamp is not None and os.path.exists(self._own_stamp):
+            self._retire(self._own_stamp)
+
+    def _check_foreign_writes(self) -> None:
+        """Drop every entry if another process wrote memories since the last check."""
+        if self._own_stamp is None:
+            return
+        now = time.monotonic()
+        if now < self._next_stamp_check:
+            return
+        self._next_stamp_check = now + self.stamp_check
+
+        latest = self._latest_foreign_stamp(prune=True)
+        if latest > self._foreign_stamp:
+            self._foreign_stamp = latest
+            with self._lock:
+                self._epoch += 1
+                self._invalidations += 1
+                self._entries.clear()
+                self._versions.clear()  # a new epoch needs no old versions
+
+    # ---------------------------------------------------------
+    # Entries
+    # ---------------------------------------------------------
+    @staticmethod
+    def key(
+        user_id: str,
+        version: Tuple[int, int],
+        query: str,
+        k: int,
+        query_embedding: Optional[Sequence[float]] = None,
+        embeddings: bool = False,
+    ) -> Tuple:
+        text = EmbeddingCache.normalize(query or "").lower()
+        if text or query_embedding is None:
+            digest = "t:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+        else:
+            raw = ",".join(f"{x:.6f}" for x in query_embedding)
+            digest = "e:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return user_id, version, k, embeddings, digest
+
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        self._check_foreign_writes()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return list(entry[1])
+
+    def put(self, key: Tuple, results: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # ---------------------------------------------------------
+    # Stats
+    # ---------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        total = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "tracked_users": len(self._versions),
+            "hits": self._hits,
+            "misses": self._misses,
+            "invalidations": self._invalidations,
+            "hit_rate": round(self._hits / total, 4) if total else 0.0,
+        }
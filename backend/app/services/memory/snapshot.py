@@ -0,0 +1,241 @@
+# app/services/memory/snapshot.py
+
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.service_loader import get_collection, list_memory_collection_names
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Snapshot layout (one directory):
+#   manifest.json         count, dim, dtype, model, compression
+#   vectors.npy           (N, dim) float16 / float32, row i ↔ line i
+#   memories.jsonl.zst    {"id", "text", "metadata"} per line
+#                         (.jsonl.gz when zstandard is not installed)
+# ---------------------------------------------------------
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+DTYPES = ("float16", "float32")
+
+try:
+    import zstandard
+except ImportError:  # optional: fall back to gzip
+    zstandard = None
+
+
+def _open_jsonl_writer(directory: str, compression: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd snapshots need the 'zstandard' package: pip install zstandard")
+        raw = open(os.path.join(directory, "memories.jsonl.zst"), "wb")
+        stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8"), "memories.jsonl.zst"
+    return gzip.open(os.path.join(directory, "memories.jsonl.gz"), "wt", encoding="utf-8"), "memories.jsonl.gz"
+
+
+def _open_jsonl_reader(path: str):
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("This snapshot is zstd-compressed: pip install zstandard")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _sources():
+    """(label, collection-like) for every place memories are stored."""
+    sources = [(name, get_collection(name)) for name in list_memory_collection_names()]
+    if settings.MEMORY_INDEX_BACKEND == "numpy":
+        from app.services.memory.numpy_index import iter_numpy_indexes
+
+        sources += [(f"numpy:{index.user_id}", index) for index in iter_numpy_indexes()]
+    return sources
+
+
+def _report(rows: int, elapsed: float, directory: str) -> Dict[str, Any]:
+    size = sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else None,
+        "bytes": size,
+        "mb_per_s": round(size / elapsed / 1e6, 2) if elapsed else None,
+    }
+
+
+# ---------------------------------------------------------
+# Export
+# ---------------------------------------------------------
+async def export_snapshot(
+    directory: str,
+    dtype: str = "float16",
+    page_size: int = 1000,
+    compression: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Stream every memory into `directory`, one page in memory at a time.
+
+    Each source's IDs are listed first and then fetched page by page,
+    so memories deleted while exporting are simply missing (offset
+    paging would shift and skip rows) and memories added meanwhile are
+    left out. Vectors go to a temporary raw file; vectors.npy is built
+    from it at the end, sized by the rows actually written.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    compression = compression or ("zstd" if zstandard is not None else "gzip")
+
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+
+    sources = await asyncio.to_thread(_sources)
+
+    raw_path = os.path.join(directory, VECTORS_FILE + ".tmp")
+    dim = 0
+    written = 0
+    writer, metadata_file = _open_jsonl_writer(directory, compression)
+    try:
+        with open(raw_path, "wb") as raw:
+            for label, source in sources:
+                listed = await asyncio.to_thread(source.get, include=[])
+                source_ids = listed.get("ids") or []
+
+                for offset in range(0, len(source_ids), page_size):
+                    page = await asyncio.to_thread(
+                        source.get,
+                        ids=source_ids[offset:offset + page_size],
+                        include=["documents", "metadatas", "embeddings"],
+                    )
+                    ids = page.get("ids") or []
+                    if not ids:
+                        continue
+
+                    block = np.asarray(page["embeddings"], dtype=dtype)
+                    dim = dim or block.shape[1]
+                    raw.write(np.ascontiguousarray(block).tobytes())
+                    for mid, doc, meta in zip(ids, page["documents"], page["metadatas"]):
+                        writer.write(json.dumps({"id": mid, "text": doc, "metadata": meta or {}}) + "\n")
+                    written += len(ids)
+
+                logger.info("Snapshot export: %s done (%d rows so far)", label, written)
+
+        writer.close()
+        await asyncio.to_thread(_build_vectors_file, directory, raw_path, dtype, written, dim, page_size)
+    finally:
+        writer.close()
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.time(),
+        "count": written,
+        "dim": int(dim),
+        "dtype": dtype,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "metadata_file": metadata_file,
+        "compression": compression,
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    report = _report(written, time.perf_counter() - start, directory)
+    logger.info("Snapshot export: %s", report)
+    return {"directory": directory, **manifest, **report}
+
+
+def _build_vectors_file(directory: str, raw_path: str, dtype: str, rows: int, dim: int, chunk: int) -> None:
+    """Copy the raw vector rows into vectors.npy (rows x dim), chunk by chunk."""
+    vectors = np.lib.format.open_memmap(
+        os.path.join(directory, VECTORS_FILE), mode="w+", dtype=dtype, shape=(rows, dim),
+    )
+    if rows:
+        source = np.memmap(raw_path, dtype=dtype, mode="r", shape=(rows, dim))
+        for start in range(0, rows, chunk):
+            vectors[start:start + chunk] = source[start:start + chunk]
+        del source
+    vectors.flush()
+    del vectors
+
+
+# ---------------------------------------------------------
+# Import
+# ---------------------------------------------------------
+async def import_snapshot(
+    directory: str,
+    memory_engine=None,
+    batch_size: int = 1000,
+    allow_model_mismatch: bool = False,
+) -> Dict[str, Any]:
+    """
+    Bulk-load a snapshot through MemoryEngine.import_memories in
+    batches (stored vectors are reused, nothing is re-embedded).
+    Records are routed by their user_id under the current partition
+    mode / index backend. Existing IDs are skipped, so re-running an
+    interrupted import is safe.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')}")
+    if manifest["embedding_model"] != settings.EMBEDDING_MODEL and not allow_model_mismatch:
+        raise ValueError(
+            f"Snapshot vectors come from '{manifest['embedding_model']}', "
+            f"but EMBEDDING_MODEL is '{settings.EMBEDDING_MODEL}'"
+        )
+
+    if memory_engine is None:
+        from app.services.memory.memory_engine import MemoryEngine
+        memory_engine = MemoryEngine()
+
+    count = manifest["count"]
+    start = time.perf_counter()
+    loaded = 0
+
+    if count:
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        reader = _open_jsonl_reader(os.path.join(directory, manifest["metadata_file"]))
+        try:
+            batch: List[Dict[str, Any]] = []
+            for line in reader:
+                if loaded + len(batch) >= count:
+                    break
+                batch.append(json.loads(line))
+                if len(batch) == batch_size:
+                    await _import_batch(memory_engine, vectors, loaded, batch)
+                    loaded += len(batch)
+                    batch = []
+            if batch:
+                await _import_batch(memory_engine, vectors, loaded, batch)
+                loaded += len(batch)
+        finally:
+            reader.close()
+            del vectors
+
+    report = _report(loaded, time.perf_counter() - start, directory)
+    logger.info("Snapshot import: %s", report)
+    return {"directory": directory, "manifest": manifest, **report}
+
+
+async def _import_batch(memory_engine, vectors, row, records) -> None:
+    block = np.asarray(vectors[row:row + len(records)], dtype=np.float32)
+    await memory_engine.import_memories(
+        ids=[r["id"] for r in records],
+        docs=[r["text"] for r in records],
+        embeddings=block,
+        metas=[r["metadata"] for r in records],
+    )
@@ -0,0 +1,161 @@
+import logging
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from app.services.llm.llm_service import LLMService
+from app.services.memory.memory_writer import MemoryWriter
+from app.utils.json_utils import parse_llm_json
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------
+# Combined schema: profile fields + memory decision
+# ---------------------------------------------------
+class MessageAnalysis(BaseModel):
+    # Profile fields (same as ExtractedProfile)
+    name: Optional[str] = None
+    preferences: List[str] = Field(default_factory=list)
+    goals: List[str] = Field(default_factory=list)
+    facts: List[str] = Field(default_factory=list)
+    personal_info: List[str] = Field(default_factory=list)
+
+    # Memory classification
+    memory_type: str = "fact"
+    importance: float = 0.4
+
+    # Only requested for long messages
+    summary: Optional[str] = None
+
+    class Config:
+        extra = "ignore"
+
+    @field_validator("memory_type", mode="before")
+    @classmethod
+    def _validate_type(cls, value):
+        if value not in MemoryWriter.ALLOWED_TYPES:
+            logger.warning("MessageAnalyzer: invalid memory type %r → 'fact'", value)
+            return "fact"
+        return value
+
+    @field_validator("importance", mode="before")
+    @classmethod
+    def _clamp_importance(cls, value):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return 0.4
+        return max(0.0, min(value, 1.0))
+
+    @field_validator("preferences", "goals", "facts", "personal_info", mode="before")
+    @classmethod
+    def _coerce_list(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [value]
+        return value
+
+
+class MessageAnalyzer:
+    """
+    Runs ONE LLM call per user message that returns everything
+    ProfileExtractor and MemoryWriter need:
+    - profile fields (name, preferences, goals, facts, personal_info)
+    - memory type + importance
+    - a summary (only for long messages)
+    """
+
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.llm = llm_service or LLMService()
+
+    # ============================================================
+    # Main API
+    # ============================================================
+    async def analyze(self, message: str) -> MessageAnalysis:
+        """
+        Never raises on bad LLM output: falls back to an empty
+        profile update and the default ('fact', 0.4) classification.
+        """
+        needs_summary = len(message.split()) > MemoryWriter.SUMMARY_MIN_WORDS
+
+        system_prompt = (
+            "You are an information extraction model. "
+            "You MUST return only valid JSON. No explanations, no text outside JSON. "
+            "Follow the schema exactly."
+        )
+
+        try:
+            raw_response = await self.llm.generate_reply(
+                [{"role": "system", "content": system_prompt}],
+                self._build_prompt(message, needs_summary)
+            )
+        except Exception as e:
+            logger.error("MessageAnalyzer: LLM call failed → %s", e)
+            return MessageAnalysis()
+
+        data = parse_llm_json(raw_response)
+        if not isinstance(data, dict):
+            logger.warning("MessageAnalyzer: Invalid JSON returned → fallback defaults.")
+            return MessageAnalysis()
+
+        try:
+            analysis = MessageAnalysis(**data)
+        except ValidationError as e:
+            logger.warning("MessageAnalyzer: Schema validation error: %s", e)
+            return MessageAnalysis()
+
+        if not needs_summary:
+            analysis.summary = None
+        elif analysis.summary:
+            analysis.summary = analysis.summary.strip() or None
+
+        return analysis
+
+    # ============================================================
+    # Prompt Builder
+    # ============================================================
+    def _build_prompt(self, message: str, needs_summary: bool) -> str:
+        summary_rule = (
+            '8. "summary": a short, clear summary of the message (max 2 sentences).'
+            if needs_summary else
+            '8. "summary": always null.'
+        )
+
+        return f"""
+Analyse the USER's message. Do two things at once:
+(A) extract personal information about the USER,
+(B) classify the message for long-term memory.
+
+STRICT RULES:
+1. Do NOT infer or invent anything. Only extract what the user explicitly says.
+2. "name": ONLY if the user says "I am <name>", "I'm <name>",
+   "My name is <name>" or "Call me <name>". Otherwise null.
+3. "preferences": things the USER likes ("I like football" → ["football"]).
+   Do NOT extract preferences of OTHER people.
+4. "goals": USER goals ("I want to learn AI", "My goal is to get a job").
+5. "facts": USER facts ("I have a sister named Jiya", "I study in class 12").
+6. "personal_info": biographical details (family, location, age, background)
+   ONLY if explicitly stated.
+7. "memory_type": one of personal_info, preference, goal, task, fact, irrelevant.
+   "importance": a score between 0.0 and 1.0.
+{summary_rule}
+
+RETURN STRICT JSON with EXACT keys:
+{{
+  "name": null or string,
+  "preferences": list of strings,
+  "goals": list of strings,
+  "facts": list of strings,
+  "personal_info": list of strings,
+  "memory_type": "...",
+  "importance": 0.0,
+  "summary": null or string
+}}
+
+NO explanations. NO extra text. ONLY JSON.
+
+User message:
+\"\"\"{message}\"\"\"
+""".strip()
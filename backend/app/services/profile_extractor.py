@@ -1,4 +1,3 @@
-import json
 import logging
 from typing import List, Optional
 
@@ -6,6 +5,7 @@ from pydantic import BaseModel, ValidationError, Field
 
 from app.services.llm.llm_service import LLMService
 from app.core.user_profile_store import UserProfileStore
+from app.utils.json_utils import parse_llm_json
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +44,7 @@ class ProfileExtractor:
     # ============================================================
     # Main API
     # ============================================================
-    def extract_and_update(self, user_id: str, message: str):
+    async def extract_and_update(self, user_id: str, message: str):
         """
         Main entrypoint for profile extraction.
         """
@@ -57,7 +57,7 @@ class ProfileExtractor:
 
         user_prompt = self._build_prompt(message)
 
-        raw_response = self.llm.generate_reply(
+        raw_response = await self.llm.generate_reply(
             [{"role": "system", "content": system_prompt}],
             user_prompt
         )
@@ -75,6 +75,20 @@ class ProfileExtractor:
             logger.warning("ProfileExtractor: Schema validation error: %s", e)
             return None
 
+        return await self.apply_extracted(user_id, extracted)
+
+    async def update_from_analysis(self, user_id: str, analysis):
+        """
+        Apply the profile part of a combined MessageAnalysis
+        (no extra LLM call).
+        """
+        extracted = ExtractedProfile(**analysis.model_dump())
+        return await self.apply_extracted(user_id, extracted)
+
+    # ============================================================
+    # Merge extracted fields into the stored profile
+    # ============================================================
+    async def apply_extracted(self, user_id: str, extracted: ExtractedProfile):
         # If the extractor returned nothing useful, skip update
         if not (
             extracted.name or
@@ -85,10 +99,8 @@ class ProfileExtractor:
         ):
             return None
 
-
-
         # Load profile
-        profile = self.store.load_profile(user_id) or {}
+        profile = await self.store.load_profile(user_id) or {}
 
         # Apply updates
         self._update_name(profile, extracted)
@@ -101,7 +113,7 @@ class ProfileExtractor:
         self._enforce_limits(profile)
 
         # Save
-        self.store.save_profile(user_id, profile)
+        await self.store.save_profile(user_id, profile)
 
         logger.info("ProfileExtractor: Updated profile for user %s", user_id)
         return profile
@@ -163,38 +175,7 @@ User message:
     # JSON Extraction
     # ============================================================
     def _parse_llm_json(self, raw: str) -> Optional[dict]:
-        if not raw:
-            return None
-        raw = raw.strip()
-
-        # Try direct JSON
-        try:
-            return json.loads(raw)
-        except:
-            pass
-
-        # Extract JSON from code blocks anywhere
-        if "```" in raw:
-            parts = raw.split("```")
-            for part in parts:
-                part = part.strip()
-                if part.startswith("{") and part.endswith("}"):
-                    try:
-                        return json.loads(part)
-                    except:
-                        pass
-
-        # Extract first {...} block
-        start = raw.find("{")
-        end = raw.rfind("}")
-        if start != -1 and end != -1:
-            subset = raw[start:end + 1]
-            try:
-                return json.loads(subset)
-            except:
-                return None
-
-        return None
+        return parse_llm_json(raw)
 
     # ============================================================
     # Helpers
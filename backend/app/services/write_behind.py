@@ -0,0 +1,166 @@
+# app/services/write_behind.py
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+
+class WriteBehindQueue:
+    """
+    In-process write-behind worker for work that is not needed
+    to answer the current turn (profile extraction, memory writes).
+
+    - Bounded asyncio.Queue (submit() waits when full = backpressure)
+    - Fixed number of worker tasks
+    - Retries with exponential backoff
+    - Jobs with the same key never run concurrently (key defaults to the
+      job name, e.g. "analyze:{user_id}"), so per-user read-modify-write
+      jobs cannot interleave
+    - Graceful drain on shutdown; jobs submitted after it run inline
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        workers: int = 2,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        self.maxsize = maxsize
+        self.num_workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._accepting = False
+        self._closed = False
+        # key -> [lock, holders + waiters]; removed when no job uses it
+        self._key_locks: Dict[str, list] = {}
+
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "retried": 0,
+            "failed": 0,
+        }
+
+    # ---------------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------------
+    async def start(self) -> None:
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._accepting = True
+        self._closed = False
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"write-behind-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info("WriteBehindQueue: started %d workers", self.num_workers)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting jobs, finish queued ones, then stop workers."""
+        self._closed = True
+        if not self._workers:
+            return
+
+        self._accepting = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "WriteBehindQueue: drain timed out, %d jobs dropped",
+                self._queue.qsize(),
+            )
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ---------------------------------------------------------
+    # Submit a job (a zero-arg coroutine function)
+    # ---------------------------------------------------------
+    async def submit(self, name: str, job: JobFactory, key: Optional[str] = None) -> None:
+        key = key or name
+        if not self._workers and not self._closed:
+            await self.start()
+
+        if not self._accepting:
+            logger.warning("WriteBehindQueue: shutting down, running %s inline", name)
+            await self._run_serialized(name, key, job)
+            return
+
+        await self._queue.put((name, key, job))
+        self.stats["submitted"] += 1
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    # ---------------------------------------------------------
+    # Worker loop
+    # ---------------------------------------------------------
+    async def _worker(self, index: int) -> None:
+        while True:
+            name, key, job = await self._queue.get()
+            try:
+                await self._run_serialized(name, key, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_serialized(self, name: str, key: str, job: JobFactory) -> None:
+        entry = self._key_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(name, job)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._key_locks[key]
+
+    async def _run(self, name: str, job: JobFactory) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await job()
+                self.stats["completed"] += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.stats["failed"] += 1
+                    logger.error(
+                        "WriteBehindQueue: job %s failed after %d attempts → %s",
+                        name, attempt + 1, e,
+                    )
+                    return
+
+                self.stats["retried"] += 1
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning(
+                    "WriteBehindQueue: job %s failed (%s), retrying in %.2fs",
+                    name, e, delay,
+                )
+                await asyncio.sleep(delay)
+
+
+@lru_cache
+def get_write_behind_queue() -> WriteBehindQueue:
+    """Return the SINGLE app-wide write-behind queue."""
+    return WriteBehindQueue(
+        maxsize=settings.WRITE_BEHIND_QUEUE_SIZE,
+        workers=settings.WRITE_BEHIND_WORKERS,
+        max_retries=settings.WRITE_BEHIND_MAX_RETRIES,
+        retry_backoff=settings.WRITE_BEHIND_RETRY_BACKOFF,
+    )
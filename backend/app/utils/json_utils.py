@@ -0,0 +1,43 @@
+import json
+from typing import Optional
+
+
+def parse_llm_json(raw: str) -> Optional[dict]:
+    """
+    Extract a JSON object from raw LLM output.
+    Handles plain JSON, ``` code fences and JSON embedded in text.
+    """
+    if not raw:
+        return None
+    raw = raw.strip()
+
+    # Try direct JSON
+    try:
+        return json.loads(raw)
+    except:
+        pass
+
+    # Extract JSON from code blocks anywhere
+    if "```" in raw:
+        parts = raw.split("```")
+        for part in parts:
+            part = part.strip()
+            if part.startswith("json"):
+                part = part[4:].strip()
+            if part.startswith("{") and part.endswith("}"):
+                try:
+                    return json.loads(part)
+                except:
+                    pass
+
+    # Extract first {...} block
+    start = raw.find("{")
+    end = raw.rfind("}")
+    if start != -1 and end != -1:
+        subset = raw[start:end + 1]
+        try:
+            return json.loads(subset)
+        except:
+            return None
+
+    return None
@@ -1,17 +1,59 @@
 from sentence_transformers import SentenceTransformer
 import torch
+from app.core.settings import settings
 
 model = None
 
-def get_model():
-    global model
-    if model is None:
-        print("Loading embedding model...")
+# Embedding backends selectable with settings.EMBEDDING_BACKEND.
+# All load the same model, so vectors stay compatible with the
+# existing Chroma collection.
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def embedding_model_id(backend=None):
+    """Identifier of the model + backend (used to key cached vectors)."""
+    return f"{settings.EMBEDDING_MODEL}:{backend or settings.EMBEDDING_BACKEND}"
+
+
+def load_model(backend=None):
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown EMBEDDING_BACKEND '{backend}', expected one of {EMBEDDING_BACKENDS}"
+        )
 
+    if backend == "torch":
         device = "cuda" if torch.cuda.is_available() else "cpu"
+        loaded = SentenceTransformer(settings.EMBEDDING_MODEL, device=device)
+        print(f"Embedding model loaded on: {device} (torch)")
+        return loaded
 
-        model = SentenceTransformer("all-MiniLM-L6-v2", device=device)
+    # ONNX Runtime backends (CPU)
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    if backend == "onnx-int8":
+        model_kwargs["file_name"] = settings.EMBEDDING_ONNX_INT8_FILE
 
-        print(f"Embedding model loaded on: {device}")
+    try:
+        loaded = SentenceTransformer(
+            settings.EMBEDDING_MODEL,
+            device="cpu",
+            backend="onnx",
+            model_kwargs=model_kwargs,
+        )
+    except ImportError as e:
+        raise RuntimeError(
+            "The ONNX embedding backends need ONNX Runtime: "
+            "pip install 'sentence-transformers[onnx]'"
+        ) from e
+
+    print(f"Embedding model loaded on: cpu ({backend})")
+    return loaded
+
+
+def get_model():
+    global model
+    if model is None:
+        print("Loading embedding model...")
+        model = load_model()
 
     return model
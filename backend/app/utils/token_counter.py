@@ -0,0 +1,104 @@
+import logging
+import math
+import threading
+from typing import List, Optional
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_tokenizer = None
+_loaded = False
+_load_lock = threading.Lock()
+_loader: Optional[threading.Thread] = None
+_loader_lock = threading.Lock()
+
+# token_counter value of counts made without the tokenizer
+ESTIMATE_COUNTER = "chars/4"
+
+
+def get_tokenizer():
+    """
+    Tokenizer of the serving LLM (settings.PROMPT_TOKENIZER, a Hugging
+    Face repo id). Returns None if it cannot be loaded; counts then
+    fall back to a ~4 characters per token estimate.
+
+    The first call downloads / reads the tokenizer: run it off the
+    event loop (main.startup_event warms it with asyncio.to_thread).
+    """
+    global _tokenizer, _loaded
+    if _loaded:
+        return _tokenizer
+
+    with _load_lock:
+        if not _loaded:
+            try:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(settings.PROMPT_TOKENIZER)
+            except Exception as e:
+                logger.warning(
+                    f"Tokenizer '{settings.PROMPT_TOKENIZER}' unavailable ({e}) → estimating 4 chars/token"
+                )
+            _loaded = True
+    return _tokenizer
+
+
+def _loaded_tokenizer():
+    """
+    Non-blocking get_tokenizer for the request path: until the tokenizer
+    is loaded, returns None (estimate) and loads it in a background thread.
+    """
+    global _loader
+    if _loaded:
+        return _tokenizer
+
+    with _loader_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=get_tokenizer, name="tokenizer-load", daemon=True)
+            _loader.start()
+    return None
+
+
+def token_counter_id() -> str:
+    """
+    What count_tokens counts with right now: settings.PROMPT_TOKENIZER,
+    or ESTIMATE_COUNTER until it is loaded (or if it cannot be). Stored
+    next to persisted counts, so an estimate is never reused as a
+    tokenizer count (nor a count from a different tokenizer).
+    """
+    return settings.PROMPT_TOKENIZER if _loaded_tokenizer() is not None else ESTIMATE_COUNTER
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens `text` costs in the prompt (never blocks on loading)."""
+    if not text:
+        return 0
+    tokenizer = _loaded_tokenizer()
+    if tokenizer is None:
+        return math.ceil(len(text) / 4)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_tokens_many(texts: List[str]) -> List[int]:
+    """count_tokens for a batch (one tokenizer call). Call off the event loop."""
+    if not texts:
+        return []
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [math.ceil(len(t or "") / 4) for t in texts]
+    encoded = tokenizer([t or "" for t in texts], add_special_tokens=False)["input_ids"]
+    return [len(ids) for ids in encoded]
+
+
+def truncate_lines(text: str, max_tokens: int) -> str:
+    """Keep whole lines of `text` from the top while they fit max_tokens."""
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = count_tokens(line) + 1  # + newline
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
@@ -0,0 +1,142 @@
+"""
+Encode latency, throughput and RSS of each embedding backend
+(torch / onnx / onnx-int8), plus a parity check: every backend's
+vectors must agree with torch's (cosine >= --min-cosine) so they can
+share the existing Chroma collection.
+
+Each backend runs in its own subprocess so RSS is measured in isolation.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embedding_backends
+    python -m benchmarks.bench_embedding_backends --backends torch onnx-int8
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SAMPLE_TEXTS = [
+    "My name is Riya and I live in Pune.",
+    "I like football and playing the guitar.",
+    "I want to learn machine learning this year.",
+    "Remind me to call the dentist on Friday.",
+    "My sister Jiya studies in class 12.",
+    "The order id for my laptop is LX-4471-B.",
+    "I'm vegan and allergic to peanuts.",
+    "What is the capital of Australia?",
+]
+
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ---------------------------------------------------------
+# Worker: load one backend, time it, dump its vectors
+# ---------------------------------------------------------
+def run_worker(backend, out_dir, repeats):
+    from app.utils.model_loder import load_model
+
+    start = time.perf_counter()
+    model = load_model(backend)
+    load_s = time.perf_counter() - start
+
+    model.encode(SAMPLE_TEXTS, convert_to_tensor=False)  # warm-up
+
+    single = []
+    for _ in range(repeats):
+        for text in SAMPLE_TEXTS:
+            t0 = time.perf_counter()
+            model.encode(text, convert_to_tensor=False)
+            single.append((time.perf_counter() - t0) * 1000)
+    single.sort()
+
+    batch_texts = SAMPLE_TEXTS * 16
+    t0 = time.perf_counter()
+    model.encode(batch_texts, batch_size=32, convert_to_tensor=False)
+    batch_s = time.perf_counter() - t0
+
+    vectors = np.asarray(model.encode(SAMPLE_TEXTS, convert_to_tensor=False), dtype=np.float32)
+    np.save(os.path.join(out_dir, f"{backend}.npy"), vectors)
+
+    result = {
+        "backend": backend,
+        "load_s": load_s,
+        "single_p50_ms": single[len(single) // 2],
+        "single_p95_ms": single[int(len(single) * 0.95) - 1],
+        "batch_texts_per_s": len(batch_texts) / batch_s,
+        "rss_mb": rss_mb(),
+    }
+    with open(os.path.join(out_dir, f"{backend}.json"), "w") as f:
+        json.dump(result, f)
+
+
+# ---------------------------------------------------------
+# Driver
+# ---------------------------------------------------------
+def cosine_rows(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.out_dir, args.repeats)
+        return
+
+    backends = list(dict.fromkeys(["torch"] + args.backends))  # torch = reference
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        results = {}
+        for backend in backends:
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedding_backends",
+                 "--worker", backend, "--out-dir", out_dir, "--repeats", str(args.repeats)],
+                check=True,
+            )
+            with open(os.path.join(out_dir, f"{backend}.json")) as f:
+                results[backend] = json.load(f)
+            results[backend]["vectors"] = np.load(os.path.join(out_dir, f"{backend}.npy"))
+
+    reference = results["torch"]["vectors"]
+
+    print(f"\n{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'batch/s':>9} {'RSS MB':>8} {'min cos':>8}")
+    failed = []
+    for backend in backends:
+        r = results[backend]
+        cos = cosine_rows(reference, r["vectors"])
+        if cos.min() < args.min_cosine:
+            failed.append(backend)
+        print(
+            f"{backend:<10} {r['load_s']:>7.2f} {r['single_p50_ms']:>8.2f} "
+            f"{r['single_p95_ms']:>8.2f} {r['batch_texts_per_s']:>9.1f} "
+            f"{r['rss_mb']:>8.0f} {cos.min():>8.4f}"
+        )
+
+    if failed:
+        print(f"\nPARITY FAILED (cosine < {args.min_cosine}): {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\nParity OK: all backends agree with torch (cosine >= {args.min_cosine})")
+
+
+if __name__ == "__main__":
+    main()
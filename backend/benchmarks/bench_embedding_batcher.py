@@ -0,0 +1,97 @@
+"""
+Embedding throughput at 1/8/64 concurrent callers: one encode() per
+call (old MemoryEngine.embed) vs the micro-batching EmbeddingBatcher.
+
+With --workers N the batcher encodes through an EmbeddingProcessPool
+of N processes (EMBEDDING_WORKERS mode) to check scaling with cores.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embedding_batcher --requests 512
+    python -m benchmarks.bench_embedding_batcher --workers 4
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.services.embedding.batcher import EmbeddingBatcher
+from app.services.embedding.process_pool import EmbeddingProcessPool
+from app.utils.model_loder import get_model
+
+
+def make_texts(n):
+    return [f"I like topic number {i} and want to learn more about it" for i in range(n)]
+
+
+async def run_clients(embed, texts, concurrency):
+    queue = list(texts)
+
+    async def client():
+        while queue:
+            await embed(queue.pop())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def bench(total, concurrency_levels, max_batch_size, max_wait_ms, workers):
+    model = get_model()
+    texts = make_texts(total)
+
+    def encode_one(text):
+        return model.encode(text, convert_to_tensor=False)
+
+    encoder = model
+    if workers:
+        encoder = EmbeddingProcessPool(workers=workers)
+        encoder.warm_up()
+
+    def encode_many(batch):
+        return encoder.encode(batch, batch_size=len(batch), convert_to_tensor=False)
+
+    # Warm-up
+    encode_many(texts[:8])
+
+    print(f"{'callers':>8} {'per-call texts/s':>18} {'batched texts/s':>17} "
+          f"{'avg batch':>10} {'wait p95 ms':>12}")
+
+    for concurrency in concurrency_levels:
+        baseline = await run_clients(
+            lambda t: asyncio.to_thread(encode_one, t), texts, concurrency
+        )
+
+        batcher = EmbeddingBatcher(
+            encode_fn=encode_many,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_inflight=max(1, workers),
+        )
+        batched = await run_clients(batcher.embed, texts, concurrency)
+        stats = batcher.stats()
+
+        print(
+            f"{concurrency:>8} {total / baseline:>18.1f} {total / batched:>17.1f} "
+            f"{stats['avg_batch_size']:>10.2f} {stats['queue_wait_ms_p95']:>12.2f}"
+        )
+
+    if workers:
+        encoder.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(bench(
+        args.requests, args.concurrency, args.max_batch_size, args.max_wait_ms, args.workers
+    ))
+
+
+if __name__ == "__main__":
+    main()
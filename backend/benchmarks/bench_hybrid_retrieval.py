@@ -0,0 +1,136 @@
+"""
+Recall of vector-only vs hybrid (vector + FTS5/BM25, RRF-fused)
+retrieval at several candidate counts k.
+
+The synthetic corpus mixes everyday filler memories with "needle"
+memories built around exact tokens (names, order ids, product codes).
+Each query mentions a needle's token in otherwise vague wording, which
+is where pure semantic search struggles. The table shows recall@k of
+the needle; the last line reports the smallest k at which hybrid
+matches vector-only recall at --baseline-k (the old k=20 over-fetch).
+
+Usage (from backend/):
+    python -m benchmarks.bench_hybrid_retrieval
+    python -m benchmarks.bench_hybrid_retrieval --filler 2000 --k 3 5 10 20
+"""
+
+import argparse
+import random
+import tempfile
+
+import numpy as np
+
+from app.services.memory.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from app.services.memory.numpy_index import NumpyCollection
+from app.utils.model_loder import get_model
+
+FILLER_TEMPLATES = [
+    "I had {food} for dinner and it was {adj}.",
+    "My {relation} is visiting next {day}.",
+    "I want to get better at {skill} this year.",
+    "Remind me to buy {item} on {day}.",
+    "The meeting about {topic} went {adj}.",
+    "I ordered a new {item} last week.",
+    "My {relation} recommended a book about {topic}.",
+]
+WORDS = {
+    "food": ["pasta", "biryani", "tacos", "ramen", "salad", "pizza"],
+    "adj": ["great", "okay", "terrible", "surprising", "boring"],
+    "relation": ["sister", "brother", "friend", "manager", "cousin"],
+    "day": ["Monday", "Friday", "weekend", "month"],
+    "skill": ["guitar", "python", "cooking", "running", "chess"],
+    "item": ["laptop", "phone", "charger", "backpack", "headphones"],
+    "topic": ["budgets", "hiring", "history", "climate", "design"],
+}
+NEEDLES = [
+    ("My order id for the laptop is {code}.", "Any update on {code}?"),
+    ("The warranty number on my phone is {code}.", "Which device is {code} for?"),
+    ("My friend {name} lives in Lisbon.", "Where does {name} live?"),
+    ("I booked flight {code} for the conference.", "What's {code}?"),
+    ("My cousin {name} studies medicine.", "What does {name} do?"),
+]
+NAMES = ["Riya", "Aarav", "Jiya", "Tomasz", "Ngozi", "Keoni", "Sven", "Ayesha", "Mateo", "Yuki"]
+
+
+def make_corpus(rng, n_filler, n_needles):
+    docs = []
+    for _ in range(n_filler):
+        tpl = rng.choice(FILLER_TEMPLATES)
+        docs.append(tpl.format(**{k: rng.choice(v) for k, v in WORDS.items()}))
+
+    queries = []
+    for i in range(n_needles):
+        doc_tpl, query_tpl = rng.choice(NEEDLES)
+        code = f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}-{rng.randrange(1000, 9999)}"
+        name = f"{rng.choice(NAMES)}{i}"
+        docs.append(doc_tpl.format(code=code, name=name))
+        queries.append((len(docs) - 1, query_tpl.format(code=code, name=name)))
+    return docs, queries
+
+
+def recall_at(rankings, gold, k):
+    return sum(1 for ranking, g in zip(rankings, gold) if g in ranking[:k]) / len(gold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filler", type=int, default=500)
+    parser.add_argument("--needles", type=int, default=100)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10, 20])
+    parser.add_argument("--baseline-k", type=int, default=20)
+    parser.add_argument("--lexical-k", type=int, default=20)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    docs, queries = make_corpus(rng, args.filler, args.needles)
+    ids = [f"m-{i}" for i in range(len(docs))]
+    gold = [ids[i] for i, _ in queries]
+
+    model = get_model()
+    doc_vecs = np.asarray(model.encode(docs, batch_size=64, convert_to_tensor=False), dtype=np.float32)
+    query_vecs = np.asarray(
+        model.encode([q for _, q in queries], batch_size=64, convert_to_tensor=False), dtype=np.float32
+    )
+
+    max_k = max(args.k + [args.baseline_k])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = NumpyCollection("bench", f"{tmp}/numpy")
+        vectors.add(ids=ids, embeddings=doc_vecs, documents=docs,
+                    metadatas=[{"user_id": "bench"} for _ in ids])
+        lexical = LexicalIndex(f"{tmp}/lexical.db")
+        lexical.add_many([(mid, "bench", doc, 0.0) for mid, doc in zip(ids, docs)])
+
+        vector_rankings = []
+        hybrid_rankings = []
+        for qvec, (_, query) in zip(query_vecs, queries):
+            vector_ids = vectors.query(query_embeddings=[qvec], n_results=max_k, include=[])["ids"][0]
+            lexical_ids = [mid for mid, _ in lexical.search("bench", query, args.lexical_k)]
+
+            vector_rankings.append(vector_ids)
+            hybrid_rankings.append(
+                sorted_fused(vector_ids, lexical_ids, args.rrf_k)
+            )
+        lexical.close()
+
+    print(f"{len(docs)} memories, {len(queries)} exact-token queries\n")
+    print(f"{'k':>4} {'vector recall':>14} {'hybrid recall':>14}")
+    for k in sorted(args.k):
+        print(f"{k:>4} {recall_at(vector_rankings, gold, k):>14.3f} {recall_at(hybrid_rankings, gold, k):>14.3f}")
+
+    target = recall_at(vector_rankings, gold, args.baseline_k)
+    needed = next(
+        (k for k in range(1, max_k + 1) if recall_at(hybrid_rankings, gold, k) >= target), None
+    )
+    print(f"\nVector-only recall@{args.baseline_k} = {target:.3f}; "
+          f"hybrid reaches it at k = {needed}")
+
+
+def sorted_fused(vector_ids, lexical_ids, rrf_k):
+    scores = reciprocal_rank_fusion([vector_ids, lexical_ids], k=rrf_k)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+if __name__ == "__main__":
+    main()
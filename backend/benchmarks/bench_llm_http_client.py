@@ -0,0 +1,110 @@
+"""
+Per-call HTTP overhead of LLMService: new connection per call vs the
+shared, pooled client.
+
+Runs against a local stub of Ollama's /api/generate so only connection
+and request overhead is measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_http_client --calls 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ---------------------------------------------------------
+# Stub Ollama server (HTTP/1.1 so keep-alive is honoured)
+# ---------------------------------------------------------
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps({"response": "ok", "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<34} mean={statistics.mean(samples) * 1000:7.3f}ms "
+        f"p50={p50 * 1000:7.3f}ms p95={p95 * 1000:7.3f}ms"
+    )
+
+
+# ---------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------
+async def bench(calls, base_url):
+    import httpx
+    from app.services.llm.http_client import close_http_clients, get_async_client
+
+    payload = {"model": "stub", "prompt": "hi", "stream": False}
+
+    # Before: a fresh client (and TCP connection) for every call
+    before = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=None) as client:
+            response = await client.post(f"{base_url}/api/generate", json=payload)
+            response.json()
+        before.append(time.perf_counter() - start)
+
+    # After: the shared pool used by every LLMService
+    client = get_async_client()
+    after = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = await client.post("/api/generate", json=payload)
+        response.json()
+        after.append(time.perf_counter() - start)
+
+    report("before (AsyncClient per call)", before)
+    report("after  (pooled AsyncClient)", after)
+
+    await close_http_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Must be set before app.core.settings is imported
+    os.environ["LLM_BASE_URL"] = base_url
+
+    print(f"Stub server at {base_url}, {args.calls} calls per variant\n")
+    asyncio.run(bench(args.calls, base_url))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-user top-k latency: NumPy exact-search index vs a Chroma collection
+with a user_id where-filter, at a few typical per-user memory counts.
+
+Also reports recall@k of Chroma's HNSW against the exact NumPy result.
+
+Usage (from backend/):
+    python -m benchmarks.bench_numpy_index
+    python -m benchmarks.bench_numpy_index --sizes 100 500 2000 --queries 500
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from app.services.memory.numpy_index import NumpyCollection
+
+DIM = 384
+
+
+def unit_vectors(rng, n):
+    vecs = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def timed(fn, queries):
+    samples = []
+    results = []
+    for qvec in queries:
+        start = time.perf_counter()
+        results.append(fn(qvec))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return results, statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    include = ["documents", "metadatas", "distances"]
+
+    print(f"{'memories':>9} {'chroma mean':>12} {'chroma p95':>11} "
+          f"{'numpy mean':>11} {'numpy p95':>10} {'hnsw recall':>12}")
+
+    for size in args.sizes:
+        vecs = unit_vectors(rng, size)
+        ids = [f"m-{i}" for i in range(size)]
+        docs = [f"memory {i}" for i in range(size)]
+        metas = [{"user_id": "u1", "created_at": time.time()} for _ in range(size)]
+        queries = unit_vectors(rng, args.queries)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            client = chromadb.PersistentClient(path=f"{tmp}/chroma")
+            col = client.get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+            col.add(ids=ids, embeddings=vecs, documents=docs, metadatas=metas)
+
+            index = NumpyCollection("u1", f"{tmp}/numpy")
+            index.add(ids=ids, embeddings=vecs, documents=docs, metadatas=metas)
+
+            chroma_res, c_mean, c_p95 = timed(
+                lambda q: col.query(query_embeddings=[q], n_results=args.k,
+                                    where={"user_id": "u1"}, include=include)["ids"][0],
+                queries,
+            )
+            numpy_res, n_mean, n_p95 = timed(
+                lambda q: index.query(query_embeddings=[q], n_results=args.k, include=include)["ids"][0],
+                queries,
+            )
+
+        recall = statistics.mean(
+            len(set(c) & set(n)) / len(n) for c, n in zip(chroma_res, numpy_res)
+        )
+        print(f"{size:>9} {c_mean:>12.2f} {c_p95:>11.2f} {n_mean:>11.2f} {n_p95:>10.2f} {recall:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
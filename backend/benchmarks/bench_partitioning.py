@@ -0,0 +1,115 @@
+"""
+Query latency of the memory partitioning modes at 1k / 10k / 100k users.
+
+Loads synthetic unit vectors (--per-user memories per user) into a
+temporary Chroma store once per mode and user count, then times
+per-user top-k queries the same way MemoryEngine.search_memory runs them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_partitioning
+    python -m benchmarks.bench_partitioning --users 1000 10000 --per-user 20
+
+The 100k-user per_user run creates 100k collections; expect it to take
+a long time and a lot of disk.
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from app.core.service_loader import memory_collection_name
+
+DIM = 384
+
+
+def unit_vectors(rng, n):
+    vecs = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def load(client, mode, buckets, users, per_user, rng):
+    handles = {}
+    pending = {}
+
+    for u in range(users):
+        user_id = f"user-{u}"
+        name = memory_collection_name(user_id, mode=mode, buckets=buckets)
+        batch = pending.setdefault(name, {"ids": [], "embeddings": [], "metadatas": [], "documents": []})
+        vecs = unit_vectors(rng, per_user)
+        for j in range(per_user):
+            batch["ids"].append(f"{user_id}-{j}")
+            batch["embeddings"].append(vecs[j])
+            batch["metadatas"].append({"user_id": user_id, "created_at": time.time()})
+            batch["documents"].append(f"memory {j} of {user_id}")
+
+        # Flush large batches
+        if len(batch["ids"]) >= 5000:
+            _flush(client, handles, name, batch)
+            pending[name] = {"ids": [], "embeddings": [], "metadatas": [], "documents": []}
+
+    for name, batch in pending.items():
+        if batch["ids"]:
+            _flush(client, handles, name, batch)
+    return handles
+
+
+def _flush(client, handles, name, batch):
+    if name not in handles:
+        handles[name] = client.get_or_create_collection(name, metadata={"hnsw:space": "cosine"})
+    max_batch = client.get_max_batch_size()
+    for start in range(0, len(batch["ids"]), max_batch):
+        handles[name].add(**{key: values[start:start + max_batch] for key, values in batch.items()})
+
+
+def query_latency(handles, mode, buckets, users, queries, k, rng, np_rng):
+    samples = []
+    for _ in range(queries):
+        user_id = f"user-{rng.randrange(users)}"
+        col = handles[memory_collection_name(user_id, mode=mode, buckets=buckets)]
+        where = None if mode == "per_user" else {"user_id": user_id}
+        qvec = unit_vectors(np_rng, 1)[0]
+
+        start = time.perf_counter()
+        col.query(query_embeddings=[qvec], n_results=k, where=where,
+                  include=["documents", "metadatas", "distances"])
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", default=["global", "hashed", "per_user"])
+    parser.add_argument("--buckets", type=int, default=64)
+    parser.add_argument("--per-user", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'mode':<9} {'load s':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for users in args.users:
+        for mode in args.modes:
+            rng = random.Random(42)
+            np_rng = np.random.default_rng(42)
+            with tempfile.TemporaryDirectory() as tmp:
+                client = chromadb.PersistentClient(path=tmp)
+
+                start = time.perf_counter()
+                handles = load(client, mode, args.buckets, users, args.per_user, np_rng)
+                load_s = time.perf_counter() - start
+
+                mean, p50, p95 = query_latency(
+                    handles, mode, args.buckets, users, args.queries, args.k, rng, np_rng
+                )
+                print(f"{users:>8} {mode:<9} {load_s:>8.1f} {mean:>8.2f} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()